@@ -0,0 +1,100 @@
+"""
+Benchmark: request-path overhead of building a chain per request vs. the
+prebuilt chains handed out by modules.chain_registry.
+
+The model is replaced by an instant fake chat model and the response cache is
+disabled for the request comparison, so the numbers are the LangChain graph
+construction and invocation overhead only. The last line shows the build cost
+when the response cache is on (the prompt is fingerprinted on every build).
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_chain_registry --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ["LLM_CACHE_ENABLED"] = "0"
+
+import itertools
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from modules import base_chains
+
+base_chains.llm_with_alternatives = GenericFakeChatModel(
+    messages=itertools.cycle([AIMessage(content="experience:\n  - title: Engineer\n")])
+)
+
+from modules.base_chains import BaseChain
+from modules.cache import MemoryLRUCache, TieredCache
+from modules.chain_registry import ChainRegistry
+from modules.llm_cache import LLMResponseCache
+from modules.utils import clean_yaml_parser
+from features.resumes.prompts import edit_resume_section_prompt
+
+INPUTS = {
+    "section_title": "experience",
+    "section_yaml": "experience:\n  - title: Developer\n",
+    "prompt": "Make it more concise",
+}
+
+
+async def _run(label: str, call, total: int):
+    latencies = []
+    for _ in range(total):
+        start = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<26} mean={statistics.mean(latencies):8.1f}us  "
+        f"p50={statistics.median(latencies):8.1f}us  p99={p99:8.1f}us"
+    )
+
+
+async def main(total: int):
+    base_chain = BaseChain(output_parser=clean_yaml_parser, cache=None)
+    registry = ChainRegistry(base_chain)
+    prebuilt = registry.register(
+        "bench.edit_section", edit_resume_section_prompt, inputs=INPUTS.keys()
+    )
+
+    async def per_request():
+        chain = base_chain.build_chain(edit_resume_section_prompt)
+        await chain.ainvoke(INPUTS)
+
+    async def registry_lookup():
+        await prebuilt.ainvoke(INPUTS)
+
+    # Warm up imports and pydantic schema caches
+    await per_request()
+    await registry_lookup()
+
+    print(f"{total} sequential requests")
+    await _run("build_chain per request", per_request, total)
+    await _run("prebuilt (registry)", registry_lookup, total)
+
+    # With the response cache on, every build also fingerprints the prompt
+    cached_base_chain = BaseChain(
+        output_parser=clean_yaml_parser, cache=LLMResponseCache(TieredCache(MemoryLRUCache()))
+    )
+    for label, chain_source in (("build_chain alone", base_chain), ("build_chain + cache", cached_base_chain)):
+        build_only = []
+        for _ in range(total):
+            start = time.perf_counter()
+            chain_source.build_chain(edit_resume_section_prompt)
+            build_only.append((time.perf_counter() - start) * 1_000_000)
+        print(f"{label:<26} mean={statistics.mean(build_only):8.1f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
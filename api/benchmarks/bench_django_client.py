@@ -0,0 +1,103 @@
+"""
+Benchmark: per-request httpx.AsyncClient vs. the shared Django client pool.
+
+Starts a tiny local stub that mimics the Django verify endpoint, then times
+N calls made the old way (a new AsyncClient per call) and the new way
+(modules.http_client's pooled, keep-alive client).
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_django_client --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_stub_server(port: int) -> uvicorn.Server:
+    stub = FastAPI()
+
+    @stub.get("/accounts/verify-and-check-limits/")
+    async def verify():
+        return {"user_id": 1, "remaining_uses": 10}
+
+    server = uvicorn.Server(
+        uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _per_request_client(base_url: str):
+    async with httpx.AsyncClient() as client:
+        await client.get(f"{base_url}/accounts/verify-and-check-limits/")
+
+
+async def _shared_client(client: httpx.AsyncClient):
+    await client.get("/accounts/verify-and-check-limits/")
+
+
+async def _run(label: str, call, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<22} total={elapsed:6.2f}s  rps={total / elapsed:8.1f}  "
+        f"mean={statistics.mean(latencies):6.2f}ms  p50={statistics.median(latencies):6.2f}ms  "
+        f"p99={p99:6.2f}ms"
+    )
+
+
+async def main(total: int, concurrency: int):
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = _start_stub_server(port)
+
+    # Point the shared client at the stub before it is created
+    os.environ["DJANGO_API_URL"] = base_url
+    from modules import http_client
+
+    http_client.DJANGO_API_URL = base_url
+    client = await http_client.open_django_client()
+
+    print(f"{total} requests, concurrency={concurrency}")
+    await _run("per-request client", lambda: _per_request_client(base_url), total, concurrency)
+    await _run("shared pooled client", lambda: _shared_client(client), total, concurrency)
+
+    await http_client.close_django_client()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,144 @@
+"""
+Benchmark: features.scraper.ranking (NumPy BM25 over a documents x resume-terms
+matrix) against a plain-Python BM25 loop over the same tokens.
+
+Synthetic postings are scored against a sample resume by both; the scores must
+agree to 1e-9 or the benchmark exits non-zero. Tokenizing is timed separately
+since both scorers share it.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_job_ranking --sizes 1000,10000 --repeat 5
+"""
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from features.scraper.ranking import (
+    JOB_RANK_B,
+    JOB_RANK_K1,
+    JOB_RANK_TITLE_WEIGHT,
+    bm25_scores,
+    rank_jobs,
+    resume_query_terms,
+    tokenize,
+)
+
+SAMPLE_RESUME = {
+    "job_search_keywords": "Backend Engineer, Python Developer, Django, FastAPI, Remote",
+    "resume": {
+        "skills": [
+            {"name": "Backend", "keywords": ["Python", "Django", "FastAPI", "PostgreSQL", "Redis"]},
+            {"name": "DevOps", "keywords": ["Docker", "Kubernetes", "AWS", "CI/CD"]},
+        ],
+        "experience": [
+            {
+                "title": "Senior Backend Engineer",
+                "description": "Built REST APIs and async workers serving 2M requests a day.",
+                "technologies": ["Python", "FastAPI", "Celery", "PostgreSQL"],
+            },
+            {
+                "title": "Software Developer",
+                "description": "Maintained Django services and migrated them to Kubernetes.",
+                "technologies": ["Django", "Docker", "AWS"],
+            },
+        ],
+    },
+}
+
+TITLES = [
+    "Backend Engineer", "Senior Python Developer", "Frontend Developer", "Data Scientist",
+    "DevOps Engineer", "Product Manager", "Full Stack Engineer", "QA Analyst", "Sales Executive",
+    "Machine Learning Engineer", "Django Developer", "Site Reliability Engineer", "iOS Developer",
+]
+WORDS = (
+    "python django fastapi flask react typescript node.js java spring kotlin go rust c++ c# .net "
+    "docker kubernetes aws gcp azure terraform postgresql mysql redis kafka spark airflow sql "
+    "team customers product growth experience years building scalable systems collaborate "
+    "remote hybrid office benefits salary equity mentoring ownership agile delivery quality "
+    "design testing monitoring security performance reliability communication stakeholders"
+).split()
+
+
+def generate_jobs(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"job-{index}",
+            "title": rng.choice(TITLES),
+            "company": f"Company {rng.randrange(count // 4 + 1)}",
+            "description": " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 400))),
+        }
+        for index in range(count)
+    ]
+
+
+def reference_bm25(titles, bodies, query, k1=JOB_RANK_K1, b=JOB_RANK_B, title_weight=JOB_RANK_TITLE_WEIGHT):
+    """Term-at-a-time BM25 in plain Python, the straightforward version of bm25_scores."""
+    tfs, lengths = [], []
+    for title, body in zip(titles, bodies):
+        title_counts, body_counts = Counter(title), Counter(body)
+        tfs.append({term: title_weight * title_counts[term] + body_counts[term] for term in query})
+        lengths.append(title_weight * len(title) + len(body))
+    average_length = sum(lengths) / len(lengths) or 1.0
+    idf = {}
+    for term in query:
+        df = sum(1 for tf in tfs if tf[term])
+        idf[term] = math.log1p((len(tfs) - df + 0.5) / (df + 0.5))
+    scores = []
+    for tf, length in zip(tfs, lengths):
+        norm = k1 * (1.0 - b + b * length / average_length)
+        score = 0.0
+        for term, weight in query.items():
+            if tf[term]:
+                score += weight * idf[term] * tf[term] * (k1 + 1.0) / (tf[term] + norm)
+        scores.append(score)
+    return scores
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(sizes, repeat) -> int:
+    query = resume_query_terms(SAMPLE_RESUME)
+    print(f"{len(query)} weighted resume terms\n")
+    print(f"{'postings':>9} {'tokenize ms':>12} {'python ms':>10} {'numpy ms':>9} {'speedup':>8} {'rank_jobs ms':>13}")
+    failed = False
+    for size in sizes:
+        jobs = generate_jobs(size)
+        titles = [tokenize(job["title"]) for job in jobs]
+        bodies = [tokenize(f"{job['company']} {job['description']}") for job in jobs]
+
+        expected = np.asarray(reference_bm25(titles, bodies, query))
+        actual = bm25_scores(titles, bodies, query)
+        if not np.allclose(actual, expected, rtol=0, atol=1e-9):
+            print(f"{size:>9}  scores differ (max error {np.abs(actual - expected).max():.3g})")
+            failed = True
+            continue
+
+        tokenizing = _time(lambda: [tokenize(f"{job['company']} {job['description']}") for job in jobs], repeat)
+        python = _time(lambda: reference_bm25(titles, bodies, query), max(1, repeat // 5))
+        vectorized = _time(lambda: bm25_scores(titles, bodies, query), repeat)
+        end_to_end = _time(lambda: rank_jobs(jobs, query), repeat)
+        print(f"{size:>9} {tokenizing:>12.1f} {python:>10.1f} {vectorized:>9.1f} "
+              f"{python / vectorized:>7.1f}x {end_to_end:>13.1f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated posting counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(main([int(size) for size in args.sizes.split(",")], args.repeat))
@@ -0,0 +1,683 @@
+"""
+Benchmark: offline load test of every AI service route.
+
+Starts the FastAPI app in a subprocess with ``llm_with_alternatives`` replaced
+by a fake chat model (configurable time to first token, streaming speed and
+canned outputs from benchmarks/fixtures/load_test) and ``scrape_jobs`` by a
+fake scraper, plus a stub Django in another subprocess that answers the
+verify, save, task and token-usage endpoints. No Gemini quota, job board or
+database is touched.
+
+Each route is driven closed-loop at every concurrency level; the report has
+throughput and p50/p99 latency (and time to first byte for streams) per
+route and level, and for routes that enqueue a generation job the end-to-end
+job time as seen by the stub's task updates. The JSON report carries the
+settings it ran with, so two runs can be compared with --compare.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_load --concurrency 1 8 32 --requests 100
+    python -m benchmarks.bench_load --routes resumes-v2 websites --llm-latency 1.5 --llm-tokens-per-second 80
+    python -m benchmarks.bench_load --output bench_output/after.json --compare bench_output/before.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+FIXTURES = Path(__file__).parent / "fixtures" / "load_test"
+JWT_SECRET = "load-test-secret"
+INTERNAL_TOKEN = "load-test-internal"
+SAMPLE_RESUME = (
+    "Jane Doe, Berlin. jane.doe@example.com, +1 555 0100.\n"
+    "Experience: Senior Backend Engineer at Acme Corp (2021-present), Python, FastAPI, PostgreSQL, Docker. "
+    "Software Engineer at Globex (2017-2021), ETL pipelines in Python and SQL.\n"
+    "Education: MSc Computer Science, TU Berlin.\nSkills: Python, FastAPI, SQL, Docker, Kubernetes."
+)
+SAMPLE_JOB = "Backend Engineer: Python, FastAPI, PostgreSQL, Terraform and GraphQL; 5+ years building APIs."
+
+# First match on the rendered prompt picks the canned output
+CANNED_OUTPUTS = [
+    (r"building ONE section", "website_section.txt"),
+    (r"planning a personal portfolio website", "website_plan.txt"),
+    (r"editing a specific section of a personal portfolio website", "website_block.yaml"),
+    (r"personal portfolio website", "website.txt"),
+    (r"Resume Evaluator", "ats_result.md"),
+    (r"editing a section of a", "document_section.yaml"),
+    (r"creating a (cover|recommendation|motivation) letter", "document.yaml"),
+    (r"editing a specific section of a structured YAML", "resume_section.yaml"),
+    (r"", "resume.yaml"),
+]
+
+
+# --- fake LLM and scraper (app process) ---
+
+@lru_cache(maxsize=None)
+def canned_output(fixtures: str, name: str) -> str:
+    return (Path(fixtures) / name).read_text()
+
+
+def _build_fake_model(args):
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        """Answers with a canned output after a configurable delay, streaming it in chunks."""
+
+        fixtures: str
+        latency: float = 0.5
+        tokens_per_second: float = 150.0
+        chunk_chars: int = 24
+        jitter: float = 0.1
+
+        @property
+        def _llm_type(self) -> str:
+            return "load-test-fake"
+
+        def _reply(self, messages) -> Tuple[str, int]:
+            prompt = "\n".join(str(message.content) for message in messages)
+            name = next(name for pattern, name in CANNED_OUTPUTS if re.search(pattern, prompt))
+            return canned_output(self.fixtures, name), len(prompt) // 4
+
+        def _scaled(self, seconds: float) -> float:
+            return max(0.0, seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+        def _chunk_delay(self) -> float:
+            # ~4 characters per token
+            return self._scaled(self.chunk_chars / 4 / self.tokens_per_second)
+
+        def _total_delay(self, text: str) -> float:
+            return self._scaled(self.latency + len(text) / 4 / self.tokens_per_second)
+
+        @staticmethod
+        def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+            return {
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+
+        def _result(self, text: str, prompt_tokens: int) -> ChatResult:
+            message = AIMessage(content=text, usage_metadata=self._usage(prompt_tokens, len(text) // 4))
+            return ChatResult(generations=[ChatGeneration(message=message)])
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            text, prompt_tokens = self._reply(messages)
+            time.sleep(self._total_delay(text))
+            return self._result(text, prompt_tokens)
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            text, prompt_tokens = self._reply(messages)
+            await asyncio.sleep(self._total_delay(text))
+            return self._result(text, prompt_tokens)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+            text, prompt_tokens = self._reply(messages)
+            time.sleep(self._scaled(self.latency))
+            for index in range(0, len(text), self.chunk_chars):
+                if index:
+                    time.sleep(self._chunk_delay())
+                yield self._chunk(text[index:index + self.chunk_chars], prompt_tokens if not index else 0)
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+            text, prompt_tokens = self._reply(messages)
+            await asyncio.sleep(self._scaled(self.latency))
+            for index in range(0, len(text), self.chunk_chars):
+                if index:
+                    await asyncio.sleep(self._chunk_delay())
+                yield self._chunk(text[index:index + self.chunk_chars], prompt_tokens if not index else 0)
+
+        def _chunk(self, text: str, prompt_tokens: int) -> ChatGenerationChunk:
+            # Usage deltas per chunk, as the Gemini client reports them
+            return ChatGenerationChunk(
+                message=AIMessageChunk(content=text, usage_metadata=self._usage(prompt_tokens, len(text) // 4))
+            )
+
+    return FakeChatModel(
+        fixtures=str(args.fixtures),
+        latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        chunk_chars=args.llm_chunk_chars,
+        jitter=args.llm_jitter,
+    )
+
+
+def _fake_scrape_jobs(latency: float):
+    def scrape_jobs(site_name=None, results_wanted=None, search_term=None, **kwargs):
+        import pandas as pd
+
+        time.sleep(latency)
+        site = site_name[0] if isinstance(site_name, list) else (site_name or "indeed")
+        titles = ["Backend Engineer", "Python Developer", "Data Engineer", "Site Reliability Engineer", "Frontend Developer"]
+        rows = []
+        for index in range(results_wanted or 20):
+            title = titles[index % len(titles)]
+            rows.append({
+                "id": f"{site}-{index}",
+                "site": site,
+                "job_url": f"https://jobs.example.com/{site}/{index}",
+                "title": f"{title} ({search_term or 'any'})",
+                "company": f"Company {index % 7}",
+                "location": "Berlin, Germany",
+                "is_remote": index % 3 == 0,
+                "description": f"{title} working with Python, FastAPI, PostgreSQL and Docker. Posting {index}.",
+            })
+        return pd.DataFrame(rows)
+
+    return scrape_jobs
+
+
+def serve_app(args):
+    workdir = Path(args.workdir)
+    os.environ.update({
+        "GOOGLE_API_KEY": "load-test",
+        "DJANGO_API_URL": f"http://127.0.0.1:{args.django_port}",
+        "JWT_SECRET_KEY": JWT_SECRET,
+        "INTERNAL_API_KEY": INTERNAL_TOKEN,
+        "LLM_CACHE_ENABLED": "1" if args.llm_cache else "0",
+        "LLM_CACHE_SQLITE_PATH": str(workdir / "llm_cache.sqlite3"),
+        "FILE_TEXT_CACHE_SQLITE_PATH": str(workdir / "extracted_text.sqlite3"),
+        "SCRAPE_CACHE_SQLITE_PATH": str(workdir / "scrape_cache.sqlite3"),
+        "JOB_QUEUE_PATH": str(workdir / "job_queue.sqlite3"),
+        "JOB_INDEX_PATH": str(workdir / "job_index.sqlite3"),
+        "JOB_POLL_INTERVAL": "0.1",
+    })
+    os.chdir(workdir)  # yaml_parsing_errors.log and other relative files land here
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    # The fakes must be in place before the feature modules build their chains
+    from modules import base_chains, llm
+
+    fake = _build_fake_model(args)
+    llm.llm_with_alternatives = base_chains.llm_with_alternatives = fake
+    llm.llm_secondary_key = base_chains.llm_secondary_key = None
+
+    import features.scraper.utils as scraper_utils
+
+    scraper_utils.scrape_jobs = _fake_scrape_jobs(args.scrape_latency)
+
+    import uvicorn
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.app_port, log_level="warning")
+
+
+# --- stub Django (django process) ---
+
+def serve_django(args):
+    import jwt
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    stub = FastAPI()
+    tasks: Dict[str, dict] = {}
+    counters = {"resumes": 0, "documents": 0, "usage_records": 0}
+
+    async def delay():
+        if args.django_latency:
+            await asyncio.sleep(args.django_latency)
+
+    def user_id(request: Request) -> int:
+        token = request.headers.get("authorization", "").partition(" ")[2]
+        try:
+            return int(jwt.decode(token, JWT_SECRET, algorithms=["HS256"])["user_id"])
+        except Exception:
+            return 1
+
+    @stub.get("/accounts/verify-and-check-limits/")
+    async def verify(request: Request, feature: str = "resume_generation"):
+        await delay()
+        return {"user_id": user_id(request), "feature": feature, "limit": -1, "remaining_uses": 1_000_000}
+
+    @stub.post("/api/create-task/")
+    async def create_task():
+        await delay()
+        task_id = str(uuid.uuid4())
+        tasks[task_id] = {"created": time.time(), "finished": None, "status": "PENDING", "kind": None}
+        return JSONResponse({"task_id": task_id}, status_code=201)
+
+    @stub.post("/api/update-task/")
+    async def update_task(request: Request):
+        await delay()
+        body = await request.json()
+        task = tasks.get(body.get("task_id"))
+        if task is None:
+            return JSONResponse({"error": "Task not found"}, status_code=404)
+        if body.get("status") in ("SUCCESS", "FAILURE"):
+            result = body.get("result") or {}
+            task.update(
+                status=body["status"],
+                finished=time.time(),
+                kind="website_generation" if "website" in result else "resume_generation",
+            )
+        return {"message": "Task updated"}
+
+    @stub.post("/api/resumes/")
+    async def save_resume(request: Request):
+        await delay()
+        counters["resumes"] += 1
+        return JSONResponse({"id": counters["resumes"], **(await request.json())}, status_code=201)
+
+    @stub.post("/api/resumes/document/create/")
+    async def save_document(request: Request):
+        await delay()
+        counters["documents"] += 1
+        return JSONResponse({"document_id": str(uuid.uuid4()), **(await request.json())}, status_code=201)
+
+    @stub.post("/api/usage/tokens/")
+    async def token_usage(request: Request):
+        records = (await request.json()).get("records", [])
+        counters["usage_records"] += len(records)
+        return {"recorded": len(records), "skipped": 0}
+
+    @stub.get("/_bench/tasks")
+    async def task_report(since: float = 0):
+        return {"tasks": [task for task in tasks.values() if task["created"] >= since], "counters": counters}
+
+    uvicorn.run(stub, host="127.0.0.1", port=args.django_port, log_level="warning")
+
+
+# --- load generator (parent process) ---
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    body: Callable[[int], dict]  # request number -> httpx request kwargs
+    method: str = "POST"
+    stream: bool = False
+    enqueues_job: bool = False
+
+
+def _unique(index: int, args) -> str:
+    # Distinct inputs by default, so the response cache and call coalescing do not short-circuit the LLM
+    return "" if args.identical else f" (request {index})"
+
+
+def _scenarios(args) -> List[Scenario]:
+    def u(index):
+        return _unique(index, args)
+
+    def ats_form(index, jobs=None):
+        form = {"description": SAMPLE_JOB + u(index), "targetLanguage": "en", "targetRole": "Backend Engineer"}
+        if jobs:
+            form = {"jobs": jobs, "targetLanguage": "en"}
+        return {"data": {"resume_text": SAMPLE_RESUME, "formData": json.dumps(form)}}
+
+    section = {"sectionTitle": "experience", "sectionData": {"experience": [{"title": "Engineer"}]}}
+    resume_request = {"language": "en", "job_description": SAMPLE_JOB}
+    block = {"block_name": "hero", "current_html": "<section id='hero'></section>", "current_css": "#hero {}",
+             "current_js": "", "artifacts": []}
+    search = {"location": "Berlin", "country": "germany", "keywords": ["python", "fastapi"]}
+
+    return [
+        Scenario("resumes-v2/edit_section", "/resumes-v2/edit_section",
+                 lambda i: {"json": {**section, "prompt": "Make it concise" + u(i)}}),
+        Scenario("resumes-v2/edit_section/stream", "/resumes-v2/edit_section/stream",
+                 lambda i: {"json": {**section, "prompt": "Make it concise" + u(i)}}, stream=True),
+        Scenario("resumes-v2/create_resume", "/resumes-v2/create_resume",
+                 lambda i: {"json": {**resume_request, "input_text": SAMPLE_RESUME + u(i)}}),
+        Scenario("resumes-v2/create_resume/stream", "/resumes-v2/create_resume/stream",
+                 lambda i: {"json": {**resume_request, "input_text": SAMPLE_RESUME + u(i)}}, stream=True),
+        Scenario("resumes-v2/ats_checker_and_generate", "/resumes-v2/ats_checker_and_generate",
+                 lambda i: ats_form(i), enqueues_job=True),
+        Scenario("resumes-v2/ats_checker_and_generate/stream", "/resumes-v2/ats_checker_and_generate/stream",
+                 lambda i: ats_form(i), stream=True, enqueues_job=True),
+        Scenario("resumes-v2/ats_checker_batch", "/resumes-v2/ats_checker_batch",
+                 lambda i: ats_form(i, [{"id": n, "description": SAMPLE_JOB + u(i * 10 + n)} for n in range(5)])),
+        Scenario("documents/generate", "/documents/generate",
+                 lambda i: {"json": {"resume_id": 1, "document_type": "cover_letter", "language": "en",
+                                        "other_info": {"about_candidate": SAMPLE_RESUME + u(i)}}}),
+        Scenario("documents/edit_section", "/documents/edit_section",
+                 lambda i: {"json": {"document_type": "cover_letter", "section_data": {"body": ["Hello"]},
+                                        "prompt": "Warmer tone" + u(i)}}),
+        Scenario("websites/edit_section", "/websites/edit_section/",
+                 lambda i: {"json": {**block, "prompt": "Center it" + u(i)}}),
+        Scenario("websites/create_resume_website", "/websites/create_resume_website/",
+                 lambda i: {"json": {"resume": SAMPLE_RESUME + u(i), "preferences": "minimal, dark", "resumeId": 1}},
+                 enqueues_job=True),
+        Scenario("resumes/ats_checker/invoke", "/resumes/ats_checker/invoke",
+                 lambda i: {"json": {"input": {"input_text": SAMPLE_RESUME + u(i), "job_description": SAMPLE_JOB,
+                                                  "language": "en", "user_input_role": "Backend Engineer"}}}),
+        Scenario("resumes/genereate_from_input/invoke", "/resumes/genereate_from_input/invoke",
+                 lambda i: {"json": {"input": {"input_text": SAMPLE_RESUME + u(i), "language": "en",
+                                                  "ats_result": ""}}}),
+        Scenario("resumes/edit_block/invoke", "/resumes/edit_block/invoke",
+                 lambda i: {"json": {"input": {"current_name": "hero", "current_html": "<section></section>",
+                                                  "current_css": "", "current_js": "", "artifacts": [],
+                                                  "prompt": "Center it" + u(i)}}}),
+        Scenario("scraper/scrape-jobs", "/scraper/scrape-jobs/",
+                 lambda i: {"json": {**search, "search_term": "python developer" + u(i)}}),
+        Scenario("scraper/scrape-jobs/stream", "/scraper/scrape-jobs/stream",
+                 lambda i: {"json": {**search, "search_term": "python developer" + u(i)}}, stream=True),
+        Scenario("scraper/jobs/search", "/scraper/jobs/search",
+                 lambda i: {"json": {**search, "search_term": "python developer" + u(i), "limit": 20}}),
+    ]
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+@dataclass
+class RunStats:
+    latencies: List[float] = field(default_factory=list)
+    first_bytes: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+
+def _tokens(users: int) -> List[str]:
+    import jwt
+
+    now = int(time.time())
+    return [
+        "Bearer " + jwt.encode(
+            {"token_type": "access", "user_id": user, "exp": now + 24 * 3600, "iat": now}, JWT_SECRET, algorithm="HS256"
+        )
+        for user in range(1, users + 1)
+    ]
+
+
+async def _one(client: httpx.AsyncClient, scenario: Scenario, index: int, tokens: List[str], stats: RunStats):
+    kwargs = scenario.body(index)
+    headers = {"Authorization": tokens[index % len(tokens)]}
+    started = time.perf_counter()
+    status = "exception"
+    try:
+        if scenario.stream:
+            async with client.stream(scenario.method, scenario.path, headers=headers, **kwargs) as response:
+                status = str(response.status_code)
+                first = None
+                tail = b""
+                async for chunk in response.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - started
+                    tail = (tail + chunk)[-4096:]
+                    if b"event: error" in tail:
+                        status = "stream-error"
+                if first is not None:
+                    stats.first_bytes.append(first)
+        else:
+            response = await client.request(scenario.method, scenario.path, headers=headers, **kwargs)
+            status = str(response.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    stats.latencies.append(time.perf_counter() - started)
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    if not status.startswith("2"):
+        stats.errors += 1
+
+
+async def _drive(base_url: str, scenario: Scenario, concurrency: int, numbers: Iterator[int], total: int,
+                 tokens: List[str], timeout: float) -> tuple:
+    stats = RunStats()
+    # Request numbers keep counting across runs, so a later level does not replay (and hit caches for) earlier inputs
+    counter = iter([next(numbers) for _ in range(total)])
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def worker():
+            for index in counter:
+                await _one(client, scenario, index, tokens, stats)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return stats, elapsed
+
+
+async def _job_times(django_url: str, since: float, expected: int, timeout: float) -> dict:
+    """Waits for the jobs enqueued since ``since`` to finish and returns their end-to-end times."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=django_url) as client:
+        while True:
+            tasks = (await client.get("/_bench/tasks", params={"since": since})).json()["tasks"]
+            finished = [task for task in tasks if task["finished"]]
+            if len(finished) >= min(expected, len(tasks)) or time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.25)
+    durations = [task["finished"] - task["created"] for task in finished if task["status"] == "SUCCESS"]
+    return {
+        "jobs_created": len(tasks),
+        "jobs_succeeded": len(durations),
+        "jobs_failed": sum(task["status"] == "FAILURE" for task in finished),
+        "jobs_unfinished": len(tasks) - len(finished),
+        "job_p50_ms": _ms(_percentile(durations, 0.5)),
+        "job_p99_ms": _ms(_percentile(durations, 0.99)),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _spawn(mode: str, extra: List[str], log_path: Path) -> subprocess.Popen:
+    command = [sys.executable, "-m", "benchmarks.bench_load", mode, *extra]
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(command, cwd=Path(__file__).resolve().parent.parent, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout}s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _settings(args) -> dict:
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "identical_inputs": args.identical,
+        "llm_latency": args.llm_latency,
+        "llm_tokens_per_second": args.llm_tokens_per_second,
+        "llm_chunk_chars": args.llm_chunk_chars,
+        "llm_jitter": args.llm_jitter,
+        "llm_cache": args.llm_cache,
+        "scrape_latency": args.scrape_latency,
+        "django_latency": args.django_latency,
+        # Limits that shape the results, as the app process sees them
+        "env": {key: os.environ[key] for key in sorted(os.environ) if key.startswith(("LLM_", "JOB_", "ATS_", "WEBSITE_", "SCRAPE_"))},
+    }
+
+
+def _render_table(results: List[dict]) -> str:
+    lines = [
+        "| route | conc | req | err | rps | p50 ms | p99 ms | ttfb p50 | ttfb p99 | job p50 | job p99 |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for row in results:
+        cells = [row["route"], row["concurrency"], row["requests"], row["errors"], row["rps"], row["p50_ms"],
+                 row["p99_ms"], row.get("ttfb_p50_ms"), row.get("ttfb_p99_ms"), row.get("job_p50_ms"), row.get("job_p99_ms")]
+        lines.append("| " + " | ".join("-" if cell is None else str(cell) for cell in cells) + " |")
+    return "\n".join(lines)
+
+
+def _render_comparison(results: List[dict], baseline: dict) -> str:
+    before = {(row["route"], row["concurrency"]): row for row in baseline.get("results", [])}
+    lines = ["| route | conc | rps before | rps after | p99 before | p99 after | p99 change |", "|---|---:|---:|---:|---:|---:|---:|"]
+    for row in results:
+        old = before.get((row["route"], row["concurrency"]))
+        if old is None:
+            continue
+        change = f"{(row['p99_ms'] / old['p99_ms'] - 1) * 100:+.1f}%" if old.get("p99_ms") and row.get("p99_ms") else "-"
+        lines.append(
+            f"| {row['route']} | {row['concurrency']} | {old['rps']} | {row['rps']} | {old['p99_ms']} | {row['p99_ms']} | {change} |"
+        )
+    return "\n".join(lines)
+
+
+async def run_load(args, app_url: str, django_url: str) -> List[dict]:
+    tokens = _tokens(args.users)
+    scenarios = [
+        scenario for scenario in _scenarios(args)
+        if not args.routes or any(scenario.name.startswith(prefix) for prefix in args.routes)
+    ]
+    numbers = itertools.count()
+    results = []
+    for scenario in scenarios:
+        # Warm up imports, pools and the first-request paths
+        await _drive(app_url, scenario, 1, numbers, args.warmup, tokens, args.timeout)
+        for concurrency in args.concurrency:
+            since = time.time()
+            stats, elapsed = await _drive(app_url, scenario, concurrency, numbers, args.requests, tokens, args.timeout)
+            row = {
+                "route": scenario.name,
+                "concurrency": concurrency,
+                "requests": args.requests,
+                "errors": stats.errors,
+                "statuses": stats.statuses,
+                "duration_s": round(elapsed, 3),
+                "rps": round(args.requests / elapsed, 2),
+                "mean_ms": _ms(statistics.mean(stats.latencies)),
+                "p50_ms": _ms(_percentile(stats.latencies, 0.5)),
+                "p99_ms": _ms(_percentile(stats.latencies, 0.99)),
+            }
+            if scenario.stream:
+                row["ttfb_p50_ms"] = _ms(_percentile(stats.first_bytes, 0.5))
+                row["ttfb_p99_ms"] = _ms(_percentile(stats.first_bytes, 0.99))
+            if scenario.enqueues_job:
+                row.update(await _job_times(django_url, since, args.requests, args.job_timeout))
+            print(
+                f"{scenario.name:<44} c={concurrency:<4} rps={row['rps']:8.2f}  p50={row['p50_ms']:9.1f}ms  "
+                f"p99={row['p99_ms']:9.1f}ms  errors={stats.errors}",
+                flush=True,
+            )
+            results.append(row)
+    return results
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    app_port, django_port = _free_port(), _free_port()
+    forwarded = [
+        "--app-port", str(app_port), "--django-port", str(django_port), "--workdir", workdir,
+        "--fixtures", str(args.fixtures), "--llm-latency", str(args.llm_latency),
+        "--llm-tokens-per-second", str(args.llm_tokens_per_second), "--llm-chunk-chars", str(args.llm_chunk_chars),
+        "--llm-jitter", str(args.llm_jitter), "--scrape-latency", str(args.scrape_latency),
+        "--django-latency", str(args.django_latency), *(["--llm-cache"] if args.llm_cache else []),
+    ]
+    app_url, django_url = f"http://127.0.0.1:{app_port}", f"http://127.0.0.1:{django_port}"
+
+    print(f"app and stub Django logs: {workdir}", flush=True)
+    django = _spawn("--serve-django", forwarded, Path(workdir) / "django.log")
+    app = None
+    try:
+        _wait_ready(f"{django_url}/_bench/tasks", django)
+        started = time.perf_counter()
+        app = _spawn("--serve-app", forwarded, Path(workdir) / "app.log")
+        _wait_ready(f"{app_url}/metrics", app)
+        startup = time.perf_counter() - started
+        print(f"app ready in {startup:.1f}s; {args.requests} requests per route and concurrency level", flush=True)
+
+        results = asyncio.run(run_load(args, app_url, django_url))
+    finally:
+        for process in (app, django):
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = {
+        "benchmark": "bench_load",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "app_startup_s": round(startup, 2),
+        "settings": _settings(args),
+        "results": results,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    table = _render_table(results)
+    sections = [f"# Load test {report['created_at']} ({report['git_commit']})", table]
+    if args.compare:
+        sections += [f"## Compared with {args.compare}", _render_comparison(results, json.loads(Path(args.compare).read_text()))]
+    output.with_suffix(".md").write_text("\n\n".join(sections) + "\n")
+    print("\n" + "\n\n".join(sections[1:]))
+    print(f"\nReport written to {output} and {output.with_suffix('.md')}")
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50, help="requests per route and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--routes", nargs="*", default=None, help="route name prefixes, e.g. resumes-v2 scraper")
+    parser.add_argument("--users", type=int, default=20, help="distinct users the requests are spread over")
+    parser.add_argument("--warmup", type=int, default=2, help="sequential requests per route before measuring")
+    parser.add_argument("--identical", action="store_true", help="send identical bodies (measures cache and coalescing)")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout (seconds)")
+    parser.add_argument("--job-timeout", type=float, default=300, help="wait for enqueued jobs this long (seconds)")
+    parser.add_argument("--output", default="bench_output/load_report.json")
+    parser.add_argument("--compare", default=None, help="previous JSON report to compare against")
+    parser.add_argument("--fixtures", default=str(FIXTURES), help="directory with the canned LLM outputs")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds to the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=150)
+    parser.add_argument("--llm-chunk-chars", type=int, default=24, help="characters per streamed chunk")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="relative random variation of every delay")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    parser.add_argument("--scrape-latency", type=float, default=0.3, help="seconds per fake job board scrape")
+    parser.add_argument("--django-latency", type=float, default=0.0, help="seconds added to every stub Django call")
+    # Internal: the app and stub Django subprocesses
+    parser.add_argument("--serve-app", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--serve-django", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--app-port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--django-port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    args = _parser().parse_args()
+    if args.serve_app:
+        serve_app(args)
+    elif args.serve_django:
+        serve_django(args)
+    else:
+        main(args)
@@ -0,0 +1,185 @@
+"""
+Benchmark: features.websites.utils.parse_custom_format (single-pass marker
+index) against the previous regex parser, which re-searched the whole CSS and
+JS for every section found in the HTML.
+
+Both parsers are first run over the fixture corpus in
+benchmarks/fixtures/website_format/ and over the synthetic sites, and must
+return identical output (or raise the same error). Exits non-zero when they
+differ.
+
+Usage (from the api/ directory):
+    python -m benchmarks.bench_parse_custom_format --sizes 50,100,200 --repeat 20
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from features.websites.utils import parse_custom_format
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "website_format")
+
+
+def legacy_parse_custom_format(site_text):
+    """The regex parser parse_custom_format replaced, kept as the reference."""
+    html_match = re.search(r"===HTML===\s*(.*?)\s*===CSS===", site_text, re.DOTALL)
+    css_match = re.search(r"===CSS===\s*(.*?)\s*===JS===", site_text, re.DOTALL)
+    js_match = re.search(r"===JS===\s*(.*)", site_text, re.DOTALL)
+
+    if not html_match or not css_match or not js_match:
+        missing = []
+        if not html_match: missing.append("HTML")
+        if not css_match: missing.append("CSS")
+        if not js_match: missing.append("JS")
+        raise ValueError(f"Parsing failed: Missing required sections: {', '.join(missing)}")
+
+    html = html_match.group(1)
+    css = css_match.group(1)
+    js = js_match.group(1)
+
+    head_match = re.search(r"<head>(.*?)</head>", html, re.DOTALL)
+    head_content = head_match.group(1).strip() if head_match else ""
+
+    global_html_match = re.search(
+        r"<!--\s*BEGIN global\s*-->\s*(?:<!--\s*DESCRIPTION:\s*(.*?)\s*-->\s*)?(.*?)<!--\s*END global\s*-->",
+        html,
+        re.DOTALL,
+    )
+    global_description = (
+        global_html_match.group(1).strip()
+        if global_html_match and global_html_match.group(1)
+        else ""
+    )
+    global_html = global_html_match.group(2).strip() if global_html_match else ""
+
+    global_css = re.search(
+        r"/\*\s*BEGIN global\s*\*/(.*?)/\*\s*END global\s*\*/", css, re.DOTALL
+    )
+    global_js = re.search(r"//\s*BEGIN global\s*(.*?)//\s*END global", js, re.DOTALL)
+
+    result = {
+        "head": head_content,
+        "global": {
+            "name": "global",
+            "html": global_html,
+            "css": global_css.group(1).strip() if global_css else "",
+            "js": global_js.group(1).strip() if global_js else "",
+            "feedback": global_description,
+        },
+        "code_bloks": [],
+    }
+
+    section_pattern = re.compile(
+        r"<!--\s*BEGIN SECTION:\s*([\w_]+)\s*-->\s*"
+        r"(?:<!--\s*DESCRIPTION:\s*(.*?)\s*-->\s*)?"
+        r"(.*?)"
+        r"<!--\s*END SECTION:\s*\1\s*-->",
+        re.DOTALL,
+    )
+
+    for match in section_pattern.finditer(html):
+        name = match.group(1)
+        description = match.group(2).strip() if match.group(2) else ""
+        html_content = match.group(3).strip()
+
+        css_section = re.search(
+            rf"/\*\s*BEGIN SECTION:\s*{re.escape(name)}\s*\*/(.*?)/\*\s*END SECTION:\s*{re.escape(name)}\s*\*/",
+            css,
+            re.DOTALL,
+        )
+        js_section = re.search(
+            rf"//\s*BEGIN SECTION:\s*{re.escape(name)}\s*(.*?)//\s*END SECTION:\s*{re.escape(name)}",
+            js,
+            re.DOTALL,
+        )
+
+        result["code_bloks"].append({
+            "name": name,
+            "feedback": description,
+            "html": html_content,
+            "css": css_section.group(1).strip() if css_section else "",
+            "js": js_section.group(1).strip() if js_section else "",
+        })
+
+    return result
+
+
+def generate_site(target_kb: int) -> str:
+    """A generated-looking site of about ``target_kb`` KB, split over a realistic number of sections."""
+    sections = max(6, target_kb // 8)
+    per_section = target_kb * 1024 // sections // 3
+    html_line = '  <div class="card"><h3>Project title</h3><p>Built a data pipeline processing 2M events/day.</p></div>\n'
+    css_line = "  .card:hover { transform: translateY(-4px); box-shadow: 0 8px 24px rgba(0, 0, 0, .12); }\n"
+    js_line = "  document.querySelectorAll('.card').forEach((el, i) => el.style.setProperty('--i', i));\n"
+
+    def body(line):
+        return line * max(1, per_section // len(line))
+
+    names = [f"section_{index}" for index in range(sections)]
+    html = ["<!DOCTYPE html>\n<html>\n<head>\n<title>Site</title>\n</head>\n<body>\n",
+            "<!-- BEGIN global -->\n<!-- DESCRIPTION: loader -->\n<div id=\"loader\"></div>\n<!-- END global -->\n"]
+    css = ["/* BEGIN global */\n:root { --accent: #0af; }\n/* END global */\n"]
+    js = ["// BEGIN global\nconst isEditor = false;\n// END global\n"]
+    for name in names:
+        html.append(f"<!-- BEGIN SECTION: {name} -->\n<!-- DESCRIPTION: {name} -->\n"
+                    f"<section id=\"{name}\">\n{body(html_line)}</section>\n<!-- END SECTION: {name} -->\n")
+        css.append(f"/* BEGIN SECTION: {name} */\n{body(css_line)}/* END SECTION: {name} */\n")
+        js.append(f"// BEGIN SECTION: {name}\n(() => {{\n{body(js_line)}}})();\n// END SECTION: {name}\n")
+    html.append("</body>\n</html>")
+    return f"===HTML===\n{''.join(html)}\n===CSS===\n{''.join(css)}\n===JS===\n{''.join(js)}"
+
+
+def _outcome(parser, text):
+    try:
+        return parser(text)
+    except ValueError as e:
+        return f"ValueError: {e}"
+
+
+def _time(parser, text, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parser(text)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(sizes, repeat) -> int:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            corpus.append((f"fixture:{os.path.basename(path)}", f.read()))
+    sites = [(f"generated:{size}KB", generate_site(size)) for size in sizes]
+
+    mismatches = 0
+    for name, text in corpus + sites:
+        same = _outcome(parse_custom_format, text) == _outcome(legacy_parse_custom_format, text)
+        mismatches += not same
+        print(f"{'same   ' if same else 'DIFFERS'}  {name}")
+    if mismatches:
+        print(f"\n{mismatches} inputs parse differently")
+        return 1
+
+    print(f"\n{'site':<18} {'size':>8} {'sections':>9} {'regex ms':>10} {'index ms':>10} {'speedup':>8}")
+    for name, text in sites:
+        sections = len(parse_custom_format(text)["code_bloks"])
+        legacy = _time(legacy_parse_custom_format, text, repeat)
+        current = _time(parse_custom_format, text, repeat)
+        print(f"{name:<18} {len(text) / 1024:>6.0f}KB {sections:>9} {legacy:>10.2f} {current:>10.2f} "
+              f"{legacy / current:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="50,100,200", help="generated site sizes in KB")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(main([int(size) for size in args.sizes.split(",")], args.repeat))
@@ -0,0 +1,231 @@
+"""
+Benchmark: AI service startup cost per feature set.
+
+Imports ``main`` in a fresh interpreter (``python -X importtime``) for every
+configuration, i.e. an ENABLED_FEATURES value, optionally with
+FEATURE_LOADING=lazy, and reports the import wall time, the resident memory
+once the app is built, the number of loaded modules and where the import time
+goes (self time summed per top-level package, slowest modules by cumulative
+time). For lazy configurations it also reports the time the deferred feature
+imports take, which the first requests pay instead.
+
+Usage (from the api/ directory):
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup --configs all scraper resumes,documents all:lazy --repeat 5
+    python -m benchmarks.profile_startup --output bench_output/startup_after.json --compare bench_output/startup_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+API_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_CONFIGS = ["all", "creator", "scraper", "resumes", "documents", "websites", "all:lazy"]
+
+# Runs in the child: everything it prints on stdout is one JSON line
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+import_s = time.perf_counter() - started
+
+def memory():
+    values = {}
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    values[key] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        values["VmHWM"] = values["VmRSS"] = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return values
+
+result = {"import_s": import_s, "modules": len(sys.modules), "rss": memory()["VmRSS"]}
+routers = main.feature_routers
+if len(routers.loaded) < len(routers.features):
+    started = time.perf_counter()
+    routers.load_all(main.app)
+    result["deferred_s"] = time.perf_counter() - started
+    result["rss_all_loaded"] = memory()["VmRSS"]
+    result["modules_all_loaded"] = len(sys.modules)
+print(json.dumps(result))
+"""
+
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, nesting depth) for every ``-X importtime`` line."""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def run_once(config: str, workdir: str) -> dict:
+    features, _, loading = config.partition(":")
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(API_DIR),
+        "ENABLED_FEATURES": features,
+        "FEATURE_LOADING": loading or "eager",
+        "LLM_CACHE_ENABLED": "0",
+        "JOB_WORKER_EMBEDDED": "0",
+    }
+    env.setdefault("GOOGLE_API_KEY", "benchmark")
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    process_s = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"{config}: import failed\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    # Interpreter start to a built app; the probe's deferred feature loads are not part of it
+    result["process_s"] = process_s - result.get("deferred_s", 0.0)
+    result["importtime"] = parse_importtime(completed.stderr)
+    return result
+
+
+def summarize(config: str, runs: List[dict], top: int) -> dict:
+    # The breakdown comes from the run with the median import time
+    runs = sorted(runs, key=lambda run: run["import_s"])
+    median_run = runs[len(runs) // 2]
+    by_package: Dict[str, int] = defaultdict(int)
+    for module, self_us, _, _ in median_run["importtime"]:
+        by_package[module.split(".")[0]] += self_us
+    slowest = sorted(median_run["importtime"], key=lambda entry: entry[2], reverse=True)
+
+    summary = {
+        "config": config,
+        "runs": len(runs),
+        "import_s": round(statistics.median(run["import_s"] for run in runs), 3),
+        "process_s": round(statistics.median(run["process_s"] for run in runs), 3),
+        "rss_mb": round(statistics.median(run["rss"] for run in runs) / 2**20, 1),
+        "modules": median_run["modules"],
+        "packages": [
+            {"package": package, "self_s": round(us / 1e6, 3)}
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "slowest_modules": [
+            {"module": module, "cumulative_s": round(cumulative / 1e6, 3), "self_s": round(self_us / 1e6, 3), "depth": depth}
+            for module, self_us, cumulative, depth in slowest[:top]
+        ],
+    }
+    if "deferred_s" in median_run:
+        summary["deferred_s"] = round(statistics.median(run["deferred_s"] for run in runs), 3)
+        summary["rss_all_loaded_mb"] = round(statistics.median(run["rss_all_loaded"] for run in runs) / 2**20, 1)
+    return summary
+
+
+def _render_table(summaries: List[dict], baseline: Optional[dict]) -> str:
+    lines = [
+        "| config | import (s) | process (s) | vs all | RSS (MB) | modules | deferred to first requests (s) |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for summary in summaries:
+        ratio = f"{summary['import_s'] / baseline['import_s']:.0%}" if baseline else "-"
+        deferred = (
+            f"{summary['deferred_s']:.2f} (RSS {summary['rss_all_loaded_mb']:.0f} MB)" if "deferred_s" in summary else "-"
+        )
+        lines.append(
+            f"| {summary['config']} | {summary['import_s']:.2f} | {summary['process_s']:.2f} | {ratio} "
+            f"| {summary['rss_mb']:.0f} | {summary['modules']} | {deferred} |"
+        )
+    return "\n".join(lines)
+
+
+def _render_breakdown(summary: dict) -> str:
+    lines = [f"### {summary['config']}", "", "| package | self (s) |", "|---|---:|"]
+    lines += [f"| {entry['package']} | {entry['self_s']:.3f} |" for entry in summary["packages"]]
+    lines += ["", "| module | cumulative (s) | self (s) |", "|---|---:|---:|"]
+    lines += [
+        f"| {'  ' * entry['depth']}{entry['module']} | {entry['cumulative_s']:.3f} | {entry['self_s']:.3f} |"
+        for entry in summary["slowest_modules"]
+    ]
+    return "\n".join(lines)
+
+
+def _render_comparison(summaries: List[dict], previous: dict) -> str:
+    before = {summary["config"]: summary for summary in previous["results"]}
+    lines = ["| config | import before (s) | after (s) | change | RSS before (MB) | after (MB) |", "|---|---:|---:|---:|---:|---:|"]
+    for summary in summaries:
+        old = before.get(summary["config"])
+        if old is None:
+            continue
+        change = (summary["import_s"] - old["import_s"]) / old["import_s"] if old["import_s"] else 0.0
+        lines.append(
+            f"| {summary['config']} | {old['import_s']:.2f} | {summary['import_s']:.2f} | {change:+.0%} "
+            f"| {old['rss_mb']:.0f} | {summary['rss_mb']:.0f} |"
+        )
+    return "\n".join(lines)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(args):
+    # Caches and job databases the app creates at import land in a throwaway directory
+    workdir = tempfile.mkdtemp(prefix="profile_startup_")
+    summaries = []
+    for config in args.configs:
+        runs = [run_once(config, workdir) for _ in range(args.repeat)]
+        summary = summarize(config, runs, args.top)
+        summaries.append(summary)
+        print(f"{config:<24} import={summary['import_s']:.2f}s  rss={summary['rss_mb']:.0f}MB  modules={summary['modules']}", flush=True)
+
+    baseline = next((summary for summary in summaries if summary["config"] == "all"), None)
+    report = {
+        "benchmark": "profile_startup",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": summaries,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    sections = [f"# Startup profile {report['created_at']} ({report['git_commit']})", _render_table(summaries, baseline)]
+    if args.compare:
+        sections += [f"## Compared with {args.compare}", _render_comparison(summaries, json.loads(Path(args.compare).read_text()))]
+    print("\n" + "\n\n".join(sections[1:]))
+    sections += ["## Import time breakdown"] + [_render_breakdown(summary) for summary in summaries]
+    output.with_suffix(".md").write_text("\n\n".join(sections) + "\n")
+    print(f"\nReport written to {output} and {output.with_suffix('.md')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--configs", nargs="+", default=DEFAULT_CONFIGS,
+        help="ENABLED_FEATURES values, with ':lazy' for FEATURE_LOADING=lazy (e.g. scraper resumes,documents all:lazy)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per configuration (the median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="packages and modules listed per configuration")
+    parser.add_argument("--output", default="bench_output/startup_profile.json")
+    parser.add_argument("--compare", default=None, help="previous JSON report to compare against")
+    main(parser.parse_args())
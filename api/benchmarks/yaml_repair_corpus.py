@@ -0,0 +1,107 @@
+"""
+Regression corpus for modules.yaml_repair.
+
+Replays every malformed YAML output recorded in yaml_parsing_errors.log, plus
+the checked-in fixtures under benchmarks/fixtures/yaml_repair/, through the
+repair pass and reports which ones are repaired locally and which would still
+need a new generation. Exits non-zero when a checked-in fixture regresses.
+
+Usage (from the api/ directory):
+    python -m benchmarks.yaml_repair_corpus
+    python -m benchmarks.yaml_repair_corpus --log /path/to/yaml_parsing_errors.log --save
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+import time
+
+import yaml
+
+from modules.yaml_repair import repair_yaml
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "yaml_repair")
+
+# One log record per timestamped line; the content sits between the --- markers
+_RECORD_START = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3} - ", re.MULTILINE)
+
+
+def load_log_corpus(path: str):
+    """Yields (name, content) for every failed or repaired parse in the log."""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    starts = [match.start() for match in _RECORD_START.finditer(text)] + [len(text)]
+    for start, end in zip(starts, starts[1:]):
+        record = text[start:end]
+        head, marker, rest = record.partition("Content:\n---\n")
+        if not marker:
+            continue
+        content = rest.rstrip("\n")
+        if content.endswith("\n---"):
+            content = content[: -len("\n---")]
+        elif content == "---":
+            content = ""
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+        yield f"log:{digest}", content
+
+
+def load_fixtures():
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.yaml"))):
+        with open(path, encoding="utf-8") as f:
+            yield f"fixture:{os.path.basename(path)}", f.read()
+
+
+def check(name: str, content: str):
+    started = time.perf_counter()
+    try:
+        repaired, fixes = repair_yaml(content)
+        parsed = yaml.safe_load(repaired)
+        ok = isinstance(parsed, (dict, list))
+        detail = ", ".join(fixes) or "already valid"
+    except yaml.YAMLError as e:
+        ok, detail = False, str(e)
+    return ok, detail, (time.perf_counter() - started) * 1000
+
+
+def main(log_path: str, save: bool) -> int:
+    corpus = list(load_fixtures()) + list(load_log_corpus(log_path))
+    if not corpus:
+        print("No corpus entries found")
+        return 0
+
+    repaired = failed = regressions = 0
+    seen = set()
+    for name, content in corpus:
+        if content in seen:
+            continue
+        seen.add(content)
+        ok, detail, elapsed = check(name, content)
+        repaired += ok
+        failed += not ok
+        if not ok and name.startswith("fixture:"):
+            regressions += 1
+        print(f"{'REPAIRED' if ok else 'RE-ASK  '}  {elapsed:7.2f}ms  {name:<40} {detail}")
+        if save and name.startswith("log:"):
+            path = os.path.join(FIXTURES_DIR, f"{name[4:]}.yaml")
+            if ok and not os.path.exists(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+    total = repaired + failed
+    print(f"\n{total} unique outputs: {repaired} repaired locally, {failed} would be re-asked "
+          f"({repaired / total:.0%} repair rate)")
+    if regressions:
+        print(f"{regressions} checked-in fixtures no longer repair")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--log", default="yaml_parsing_errors.log")
+    parser.add_argument("--save", action="store_true", help="add repaired log entries to the fixtures")
+    args = parser.parse_args()
+    sys.exit(main(args.log, args.save))
@@ -1,5 +1,39 @@
-from modules.base_chains import BaseChain
-from modules.utils import clean_yaml_parser
+from modules.chain_registry import chain_registry
+from .prompts import (
+    create_resume_prompt,
+    job_desc_resume_prompt,
+    ats_checker_prompt,
+    ats_checker_no_job_desc_prompt,
+)
+from .website_prompts import (
+    create_resume_website_bloks_prompt,
+    edit_website_block_prompt,
+)
 
 
-chain_instance = BaseChain(output_parser=clean_yaml_parser)
+# Chains served by the langserve routes
+create_resume_chain = chain_registry.register(
+    "creator.create_resume", create_resume_prompt,
+    inputs=("input_text", "language", "ats_result"),
+)
+job_desc_resume_chain = chain_registry.register(
+    "creator.job_desc_resume", job_desc_resume_prompt,
+    inputs=("input_text", "job_description", "language", "ats_result"),
+)
+# Always fresh: a regeneration is expected to produce a new design
+create_resume_website_bloks_chain = chain_registry.register(
+    "creator.create_website_bloks", create_resume_website_bloks_prompt,
+    inputs=("resume_yaml", "preferences"), model="gemini-2.5-flash", cache=False,
+)
+edit_website_block_chain = chain_registry.register(
+    "creator.edit_website_block", edit_website_block_prompt,
+    inputs=("current_name", "current_html", "current_css", "current_js", "prompt", "artifacts"),
+)
+ats_checker_chain = chain_registry.register(
+    "creator.ats_checker", ats_checker_prompt,
+    inputs=("input_text", "job_description", "language", "user_input_role"),
+)
+ats_checker_no_job_desc_chain = chain_registry.register(
+    "creator.ats_checker_no_job_desc", ats_checker_no_job_desc_prompt,
+    inputs=("input_text", "language", "user_input_role"),
+)
@@ -1,22 +1,12 @@
 from fastapi import APIRouter
 from langserve.server import add_routes
-from .chains import chain_instance
-from .prompts import (
-    create_resume_prompt,
-    job_desc_resume_prompt,
-    ats_checker_prompt,
-    ats_checker_no_job_desc_prompt,
-)
-
-from .website_prompts import (
-    create_resume_website_bloks_prompt,
-    edit_website_block_prompt,
-)
-from .docs_prompts import (
-    cover_letter_prompt,
-    recommendation_letter_prompt,
-    motivation_letter_prompt,
-    edit_docs_section_prompt,
+from .chains import (
+    create_resume_chain,
+    job_desc_resume_chain,
+    create_resume_website_bloks_chain,
+    edit_website_block_chain,
+    ats_checker_chain,
+    ats_checker_no_job_desc_chain,
 )
 
 router = APIRouter()
@@ -24,7 +14,7 @@ router = APIRouter()
 
 add_routes(
     router,
-    chain_instance.build_chain(create_resume_prompt),
+    create_resume_chain,
     path="/genereate_from_input",
     disabled_endpoints=[
         "stream_events",
@@ -43,7 +33,7 @@ add_routes(
 
 add_routes(
     router,
-    chain_instance.build_chain(job_desc_resume_prompt),
+    job_desc_resume_chain,
     path="/genereate_from_job_desc",
     disabled_endpoints=[
         "stream_events",
@@ -61,9 +51,7 @@ add_routes(
 
 add_routes(
     router,
-    chain_instance.build_chain(
-        create_resume_website_bloks_prompt, model="gemini-2.5-flash"
-    ),
+    create_resume_website_bloks_chain,
     path="/create_resume_website_bloks",
     disabled_endpoints=[
         "stream_events",
@@ -80,7 +68,7 @@ add_routes(
 
 add_routes(
     router,
-    chain_instance.build_chain(edit_website_block_prompt),
+    edit_website_block_chain,
     path="/edit_block",
     disabled_endpoints=[
         "stream_events",
@@ -98,7 +86,7 @@ add_routes(
 
 add_routes(
     router,
-    chain_instance.build_chain(ats_checker_prompt),
+    ats_checker_chain,
     path="/ats_checker",
     disabled_endpoints=[
         "stream_events",
@@ -114,7 +102,7 @@ add_routes(
 )
 add_routes(
     router,
-    chain_instance.build_chain(ats_checker_no_job_desc_prompt),
+    ats_checker_no_job_desc_chain,
     path="/ats_checker_no_job_desc",
     disabled_endpoints=[
         "stream_events",
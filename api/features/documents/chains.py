@@ -1,6 +1,28 @@
-# Import chain_instance from the resumes chains module
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from modules.chain_registry import chain_registry
+from modules.utils import is_valid_yaml
+from .prompts import (
+    cover_letter_prompt,
+    recommendation_letter_prompt,
+    motivation_letter_prompt,
+    edit_docs_section_prompt,
+)
 
-from resumes.chains import chain_instance
+_DOCUMENT_INPUTS = ("personal_info", "about_candidate", "other_info", "language")
+
+# One prebuilt chain per document type
+document_chains = {
+    document_type: chain_registry.register(
+        f"documents.{document_type}", prompt, inputs=_DOCUMENT_INPUTS, cache_validator=is_valid_yaml,
+        latency_budget=10,
+    )
+    for document_type, prompt in (
+        ("cover_letter", cover_letter_prompt),
+        ("recommendation_letter", recommendation_letter_prompt),
+        ("motivation_letter", motivation_letter_prompt),
+    )
+}
+
+edit_docs_section_chain = chain_registry.register(
+    "documents.edit_section", edit_docs_section_prompt,
+    inputs=("document_type", "section_yaml", "prompt"), cache_validator=is_valid_yaml, latency_budget=6,
+)
@@ -6,15 +6,8 @@ from .utils import (
     verify_document_edit,
     save_document_to_django,
 )
-from .chains import chain_instance
-from .prompts import (
-   cover_letter_prompt,
-    recommendation_letter_prompt,
-    motivation_letter_prompt,
-    edit_docs_section_prompt
-)
-
-
+from .chains import document_chains, edit_docs_section_chain
+from modules.utils import asafe_load_yaml_with_logging
 import yaml
 
 
@@ -55,23 +48,15 @@ async def generate_document(
         about_candidate = request.other_info.get("about_candidate", "")
         additional_context = request.other_info.get("additional_context", "")
         
-        # Step 2: Select the appropriate prompt based on document type
-        prompt_mapping = {
-            "cover_letter": cover_letter_prompt,
-            "recommendation_letter": recommendation_letter_prompt,
-            "motivation_letter": motivation_letter_prompt,
-        }
-        
-        
-        selected_prompt = prompt_mapping.get(request.document_type)
-        if not selected_prompt:
+        # Step 2: Select the prebuilt chain for the document type
+        chain = document_chains.get(request.document_type)
+        if chain is None:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Unsupported document type: {request.document_type}"
             )
         
-        # Step 3: Create prompt and call chain
-        chain = chain_instance.build_chain(selected_prompt)
+        # Step 3: Call the chain
         result = await chain.ainvoke(
             {
                 "personal_info": yaml.dump(personal_info),
@@ -82,7 +67,7 @@ async def generate_document(
         )
 
         # Step 4: Parse result
-        document_data = yaml.safe_load(result)
+        document_data = await asafe_load_yaml_with_logging(result)
         
         # Step 5: Save to Django via API call
         saved_document = await save_document_to_django(
@@ -106,6 +91,8 @@ async def generate_document(
             "remaining_uses": auth_data["remaining_uses"] - 1,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate document: {str(e)}")
 
@@ -126,9 +113,8 @@ async def edit_document_section(
     """
     
     try:
-        # Step 1: Create prompt and call chain
-        chain = chain_instance.build_chain(edit_docs_section_prompt)
-        result = await chain.ainvoke(
+        # Step 1: Call the prebuilt chain
+        result = await edit_docs_section_chain.ainvoke(
             {
                 "document_type": request.document_type,
                 "section_yaml": yaml.dump(request.section_data),
@@ -137,9 +123,11 @@ async def edit_document_section(
         )
 
         # Step 2: Parse result
-        section_data = yaml.safe_load(result)
+        section_data = await asafe_load_yaml_with_logging(result)
 
         return section_data
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to edit document section: {str(e)}")
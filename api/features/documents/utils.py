@@ -1,21 +1,21 @@
 from modules.utils import create_auth_dependency
+from modules.http_client import get_django_client
+from modules.metrics import stage
 from fastapi import HTTPException, Header
 from typing import Optional
 import httpx
 import os
 
-# Django service URL
-DJANGO_API_URL = os.getenv("DJANGO_API_URL", "http://django:8000")
-
 
 
 async def save_document_to_django(resume_id: int, document_data: dict, document_type: str,
  authorization: str):
     """Save document data via Django API"""
-    async with httpx.AsyncClient() as client:
-        try:
+    client = get_django_client()
+    try:
+        with stage("django_save"):
             response = await client.post(
-                f"{DJANGO_API_URL}/api/resumes/document/create/",
+                "/api/resumes/document/create/",
                 headers={"Authorization": authorization},
                 json={
                     "resume_id": resume_id,
@@ -23,12 +23,12 @@ async def save_document_to_django(resume_id: int, document_data: dict, document_
                     "document_type": document_type
                 },
             )
-            if response.status_code == 201:
-                return response.json()
-            else:
-                return None
-        except httpx.RequestError:
+        if response.status_code == 201:
+            return response.json()
+        else:
             return None
+    except httpx.RequestError:
+        return None
 
  
 
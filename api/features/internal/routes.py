@@ -0,0 +1,173 @@
+import sys
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel
+from typing import Any, Optional
+from modules.entitlements import entitlement_cache
+from modules.yaml_repair import yaml_repair_stats
+from modules.job_queue import job_queue
+from modules.metrics import metrics
+from modules.usage import token_usage
+from modules.file_extraction import extraction_stats, text_cache
+from .utils import verify_internal_request
+
+
+def _loaded(module: str, name: str) -> Any:
+    """
+    ``module.name`` if a loaded feature has imported ``module``, else None.
+    The internal API never imports the LLM stack or the scraper itself, so a
+    deployment serving only some features (ENABLED_FEATURES) stays lean.
+    """
+    return getattr(sys.modules.get(module), name, None)
+
+
+def _stats(module: str, name: str):
+    """Stats of a component that may not be loaded, for /metrics (None is skipped)."""
+    def stats():
+        component = _loaded(module, name)
+        return component.stats() if component is not None else None
+    return stats
+
+
+class InvalidateEntitlementsRequest(BaseModel):
+    user_id: Optional[int] = None  # None drops every cached entitlement
+    feature: Optional[str] = None
+
+
+router = APIRouter(dependencies=[Depends(verify_internal_request)])
+
+
+@router.post("/entitlements/invalidate")
+async def invalidate_entitlements(request: InvalidateEntitlementsRequest):
+    """
+    Called by Django whenever usage, a subscription or a plan limit changes.
+    """
+    removed = entitlement_cache.invalidate(request.user_id, request.feature)
+    return {"invalidated": removed}
+
+
+@router.get("/entitlements/stats")
+async def entitlement_stats():
+    return entitlement_cache.stats()
+
+
+@router.get("/llm-cache/stats")
+async def llm_cache_stats():
+    llm_cache = _loaded("modules.llm_cache", "llm_cache")
+    if llm_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
+
+
+@router.post("/llm-cache/clear")
+async def clear_llm_cache():
+    llm_cache = _loaded("modules.llm_cache", "llm_cache")
+    if llm_cache is not None:
+        llm_cache.backend.clear()
+    return {"cleared": llm_cache is not None}
+
+
+@router.get("/llm-admission/stats")
+async def llm_admission_stats():
+    admission_controller = _loaded("modules.llm", "admission_controller")
+    if admission_controller is None:
+        return {"enabled": False}
+    return admission_controller.stats()
+
+
+@router.get("/llm-hedging/stats")
+async def llm_hedging_stats():
+    hedge_stats = _loaded("modules.hedging", "hedge_stats")
+    if hedge_stats is None:
+        return {"enabled": False}
+    return hedge_stats.stats()
+
+
+@router.get("/llm-coalescing/stats")
+async def llm_coalescing_stats():
+    llm_flights = _loaded("modules.llm_coalescing", "llm_flights")
+    if llm_flights is None:
+        return {"enabled": False}
+    return {"enabled": _loaded("modules.llm_coalescing", "LLM_COALESCE_ENABLED"), **llm_flights.stats()}
+
+
+@router.get("/yaml-repair/stats")
+async def yaml_repair_stats_view():
+    return yaml_repair_stats.stats()
+
+
+@router.get("/file-extraction/stats")
+async def file_extraction_stats():
+    return extraction_stats.stats()
+
+
+@router.post("/file-extraction/cache/clear")
+async def clear_file_text_cache():
+    if text_cache is not None:
+        text_cache.clear()
+    return {"cleared": text_cache is not None}
+
+
+@router.get("/scrape-cache/stats")
+async def scrape_cache_stats():
+    job_search_cache = _loaded("features.scraper.utils", "job_search_cache")
+    if job_search_cache is None:
+        return {"enabled": False}
+    return job_search_cache.stats()
+
+
+@router.post("/scrape-cache/clear")
+async def clear_scrape_cache():
+    job_search_cache = _loaded("features.scraper.utils", "job_search_cache")
+    backend = job_search_cache.backend if job_search_cache is not None else None
+    if backend is not None:
+        backend.clear()
+    return {"cleared": backend is not None}
+
+
+@router.get("/job-index/stats")
+async def job_index_stats():
+    job_index = _loaded("features.scraper.job_index", "job_index")
+    if job_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **job_index.stats()}
+
+
+@router.get("/llm-usage/stats")
+async def llm_usage_stats():
+    return token_usage.stats()
+
+
+@router.post("/llm-usage/report")
+async def report_llm_usage():
+    """Sends the pending per-user token totals to Django now."""
+    return {"reported": await token_usage.report()}
+
+
+@router.get("/features/stats")
+async def feature_stats(request: Request):
+    """Which features this deployment serves and how long each took to load."""
+    return request.app.state.feature_routers.stats()
+
+
+@router.get("/jobs/stats")
+async def job_stats(request: Request):
+    worker = getattr(request.app.state, "job_worker", None)
+    return {
+        "queue": job_queue.stats(),
+        "embedded_worker": worker.stats() if worker is not None else None,
+    }
+
+
+# Every stats view above is also exported on /metrics as gauges
+metrics.register_stats("entitlement_cache", entitlement_cache.stats)
+metrics.register_stats("llm_cache", _stats("modules.llm_cache", "llm_cache"))
+metrics.register_stats("llm_admission", _stats("modules.llm", "admission_controller"), label="model")
+metrics.register_stats("llm_hedging", _stats("modules.hedging", "hedge_stats"), label="chain")
+metrics.register_stats("llm_coalescing", _stats("modules.llm_coalescing", "llm_flights"))
+metrics.register_stats("llm_usage", token_usage.stats)
+metrics.register_stats("yaml_repair", yaml_repair_stats.stats)
+metrics.register_stats("file_extraction", extraction_stats.stats)
+metrics.register_stats("scrape_cache", _stats("features.scraper.utils", "job_search_cache"))
+metrics.register_stats("job_index", _stats("features.scraper.job_index", "job_index"))
+# Queue depth: queued / running / done / failed jobs per job type
+metrics.register_stats("job_queue", job_queue.stats, label="job_type")
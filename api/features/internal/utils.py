@@ -0,0 +1,15 @@
+from fastapi import HTTPException, Header
+from typing import Optional
+import hmac
+import os
+
+# Shared secret Django sends with service-to-service calls
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+
+async def verify_internal_request(x_internal_token: Optional[str] = Header(None)):
+    """Only allow callers that present the shared internal API key."""
+    if not INTERNAL_API_KEY:
+        raise HTTPException(status_code=403, detail="Internal API is disabled")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_KEY):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
@@ -0,0 +1,253 @@
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# How many job description keywords are checked against the resume
+ATS_PRESCORE_MAX_KEYWORDS = int(os.getenv("ATS_PRESCORE_MAX_KEYWORDS", "30"))
+
+_WORD = re.compile(r"\.?\w[\w+#]*(?:\.\w[\w+#]*)*")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_PHONE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_URL = re.compile(r"(?:https?://|www\.|linkedin\.com/|github\.com/)\S+", re.IGNORECASE)
+_YEAR = re.compile(r"\b(?:19[7-9]\d|20[0-4]\d)\b")
+_BULLET = re.compile(r"^\s*(?:[-•*▪◦‣●–]|\d+[.)])\s+", re.MULTILINE)
+_QUANTIFIED = re.compile(r"\d+(?:[.,]\d+)?\s*(?:%|\+|k\b|m\b|x\b)|[$€£]\s?\d", re.IGNORECASE)
+_FIRST_PERSON = re.compile(r"\b(?:i|me|my|mine)\b", re.IGNORECASE)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or our the to we with you your will this that who "
+    "have has their they them us can able must should would may more most other such than then there these "
+    "those what when where which while within work working job role position candidate candidates team teams "
+    "company join looking including include includes etc also well new strong good excellent plus years year "
+    "experience required requirements preferred responsibilities skills knowledge ability need needs want "
+    "seeking ideal ideally using use across help make based"
+    .split()
+)
+
+# Headings an ATS looks for, by section (English plus the common French/Spanish/German/Turkish forms)
+SECTION_HEADINGS = {
+    "summary": r"summary|profile|about me|objective|professional summary|résumé|perfil|profil|özet",
+    "experience": r"experience|work experience|employment|work history|professional experience|expérience|experiencia|berufserfahrung|deneyim|iş deneyimi",
+    "education": r"education|academic background|qualifications|formation|educación|ausbildung|eğitim",
+    "skills": r"skills|technical skills|competencies|technologies|compétences|habilidades|kenntnisse|yetenekler|beceriler",
+    "projects": r"projects|portfolio|projets|proyectos|projekte|projeler",
+    "certifications": r"certifications?|licenses|courses|certificats|certificaciones|zertifikate|sertifikalar",
+}
+_SECTION_PATTERNS = {
+    name: re.compile(rf"^\W{{0,3}}(?:{headings})\b[^\n]{{0,30}}$", re.IGNORECASE | re.MULTILINE)
+    for name, headings in SECTION_HEADINGS.items()
+}
+
+# Terms that count as skills when they appear in a job description
+SKILL_TERMS = frozenset(
+    """
+    python java javascript typescript c c++ c# .net go golang rust ruby php kotlin swift scala r matlab sql nosql
+    html css react angular vue node.js next.js django flask fastapi spring laravel rails express graphql rest api
+    microservices docker kubernetes aws azure gcp terraform ansible linux git jenkins devops
+    postgresql mysql mongodb redis elasticsearch kafka spark hadoop airflow snowflake bigquery tableau excel
+    pandas numpy tensorflow pytorch nlp statistics etl analytics figma photoshop illustrator ui ux seo sem crm salesforce sap erp jira
+    agile scrum kanban testing automation selenium cypress security networking cloud mobile android ios
+    accounting finance budgeting forecasting marketing sales negotiation recruitment payroll procurement logistics
+    communication leadership teamwork management presentation writing research english arabic french german spanish turkish
+    """.split()
+) | frozenset([
+    "machine learning", "deep learning", "computer vision", "data analysis", "data science", "power bi",
+    "project management", "product management", "stakeholder management", "problem solving", "customer service",
+])
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _terms(words: List[str]) -> Counter:
+    """Unigram and bigram counts without stopwords (bigrams catch "machine learning", "power bi")."""
+    bigrams = [
+        f"{first} {second}" for first, second in zip(words, words[1:])
+        if f"{first} {second}" in SKILL_TERMS
+    ]
+    # "machine" and "learning" are not keywords of their own once "machine learning" is one
+    parts = {part for bigram in bigrams for part in bigram.split()} - SKILL_TERMS
+    unigrams = [word for word in words if word not in _STOPWORDS and word not in parts and not word.isdigit()]
+    return Counter(unigrams + bigrams)
+
+
+def job_keywords(job_description: str, limit: int = ATS_PRESCORE_MAX_KEYWORDS) -> Tuple[np.ndarray, np.ndarray]:
+    """The job description's most important terms and their weights (frequency, doubled for known skills)."""
+    counts = _terms(_words(job_description))
+    if not counts:
+        return np.array([], dtype=object), np.array([])
+    terms = np.array(list(counts), dtype=object)
+    weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    weights *= np.where(np.isin(terms, list(SKILL_TERMS)), 2.0, 1.0)
+    top = np.argsort(-weights, kind="stable")[:limit]
+    return terms[top], weights[top]
+
+
+def _coverage(terms: np.ndarray, weights: np.ndarray, resume_terms: set) -> Tuple[float, List[str], List[str]]:
+    """Weighted share of ``terms`` found in the resume, with the matched and missing ones."""
+    if not len(terms):
+        return 0.0, [], []
+    found = np.isin(terms, list(resume_terms))
+    return float(weights[found].sum() / weights.sum()), terms[found].tolist(), terms[~found].tolist()
+
+
+def detect_sections(text: str) -> Dict[str, bool]:
+    return {name: bool(pattern.search(text)) for name, pattern in _SECTION_PATTERNS.items()}
+
+
+def _dominant_script(text: str) -> Optional[str]:
+    letters = [char for char in text[:5000] if char.isalpha()]
+    if not letters:
+        return None
+    codepoints = np.fromiter(map(ord, letters), dtype=np.int64, count=len(letters))
+    scripts = {
+        "latin": np.count_nonzero(codepoints < 0x0250),
+        "cyrillic": np.count_nonzero((codepoints >= 0x0400) & (codepoints < 0x0530)),
+        "arabic": np.count_nonzero((codepoints >= 0x0600) & (codepoints < 0x0780)),
+        "cjk": np.count_nonzero(codepoints >= 0x3000),
+    }
+    return max(scripts, key=scripts.get)
+
+
+def formatting_red_flags(text: str, words: List[str]) -> List[str]:
+    """Problems an ATS parser commonly trips over, judged from the extracted text."""
+    flags = []
+    lines = [line for line in text.splitlines() if line.strip()]
+    line_lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    if len(words) < 150:
+        flags.append("Very little text could be extracted (image-based or scanned resume?)")
+    elif len(words) > 1500:
+        flags.append("Resume is long (over ~3 pages of text)")
+    if not _EMAIL.search(text):
+        flags.append("No email address found")
+    if not _PHONE.search(text):
+        flags.append("No phone number found")
+    if "�" in text or text.count("(cid:") > 3:
+        flags.append("Unreadable characters in the extracted text (unusual fonts or symbols)")
+    if len(lines) >= 10:
+        short_share = np.count_nonzero(line_lengths <= 3) / len(lines)
+        columns_share = sum(1 for line in lines if "\t" in line.strip() or "|" in line or "   " in line.strip()) / len(lines)
+        if short_share > 0.25:
+            flags.append("Many fragmented lines (multi-column layout or text boxes)")
+        if columns_share > 0.2:
+            flags.append("Table or column layout detected")
+        if np.count_nonzero(line_lengths > 400) and not _BULLET.search(text):
+            flags.append("Long paragraphs without bullet points")
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) > 200 and sum(char.isupper() for char in letters) / len(letters) > 0.4:
+        flags.append("Excessive use of capital letters")
+    if words and len(_FIRST_PERSON.findall(text)) / len(words) > 0.02:
+        flags.append("Frequent first-person pronouns")
+    return flags
+
+
+def _scaled(fraction: float, maximum: int) -> int:
+    return int(round(max(0.0, min(1.0, fraction)) * maximum))
+
+
+def prescore_resume(resume_text: str, job_description: str = "", target_role: str = "") -> dict:
+    """
+    Scores a resume without the LLM, in milliseconds: keyword and skill
+    coverage of the job description, section coverage and formatting red
+    flags. Components mirror the LLM checker's, with or without a job
+    description, so the result can stand in for it.
+
+    Returns {"overall_score", "components": [{"name", "score", "max"}],
+    "matched_keywords", "missing_keywords", "sections", "red_flags",
+    "elapsed_ms"}.
+    """
+    started = time.perf_counter()
+    text = resume_text or ""
+    words = _words(text)
+    resume_terms = set(_terms(words))
+    sections = detect_sections(text)
+    red_flags = formatting_red_flags(text, words)
+    contact = sum((bool(_EMAIL.search(text)), bool(_PHONE.search(text)), bool(_URL.search(text))))
+    has_dates = len(_YEAR.findall(text)) >= 2
+    bullets = len(_BULLET.findall(text))
+    quantified = len(_QUANTIFIED.findall(text))
+    role_terms, role_weights = job_keywords(target_role, limit=10)
+    role_match, _, _ = _coverage(role_terms, role_weights, resume_terms)
+    formatting = 1.0 - 0.2 * len([flag for flag in red_flags if not flag.startswith("No ")])
+
+    if job_description.strip():
+        keywords, weights = job_keywords(job_description)
+        keyword_match, matched, missing = _coverage(keywords, weights, resume_terms)
+        is_skill = np.isin(keywords, list(SKILL_TERMS))
+        skills_match, _, _ = _coverage(keywords[is_skill], weights[is_skill], resume_terms) if is_skill.any() else (keyword_match, [], [])
+        same_script = _dominant_script(text) == _dominant_script(job_description)
+        components = [
+            ("Skills Match", _scaled(skills_match, 40), 40),
+            ("Experience Relevance", _scaled(0.4 * sections["experience"] + 0.3 * has_dates + 0.3 * max(role_match, keyword_match), 20), 20),
+            ("Education Fit", _scaled(0.7 * sections["education"] + 0.3 * bool(_YEAR.search(text)), 10), 10),
+            ("Contact Info & Formatting", _scaled(0.5 * contact / 3 + 0.5 * formatting, 10), 10),
+            ("Keyword Match", _scaled(keyword_match, 10), 10),
+            ("Overall Language Relevance", 10 if same_script else 3, 10),
+        ]
+    else:
+        matched = sorted(term for term in resume_terms if term in SKILL_TERMS)
+        missing = []
+        components = [
+            ("Skills Relevance", _scaled(0.5 * min(len(matched), 12) / 12 + 0.3 * sections["skills"] + 0.2 * (role_match if target_role else 1.0), 30), 30),
+            ("Experience Quality & Clarity", _scaled(0.4 * sections["experience"] + 0.2 * has_dates + 0.2 * min(bullets, 10) / 10 + 0.2 * min(quantified, 5) / 5, 20), 20),
+            ("Education & Certifications", _scaled(0.7 * sections["education"] + 0.3 * sections["certifications"], 10), 10),
+            ("Formatting & Readability", _scaled(formatting, 20), 20),
+            ("ATS-Friendliness", _scaled(0.5 * contact / 3 + 0.5 * sum(sections.values()) / len(sections), 10), 10),
+            ("Clarity of Career Direction", _scaled(0.5 * sections["summary"] + 0.5 * (role_match if target_role else sections["summary"]), 10), 10),
+        ]
+
+    return {
+        "overall_score": sum(score for _, score, _ in components),
+        "components": [{"name": name, "score": score, "max": maximum} for name, score, maximum in components],
+        "matched_keywords": matched,
+        "missing_keywords": missing,
+        "sections": sections,
+        "red_flags": red_flags,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def format_prescore(result: dict) -> str:
+    """The pre-score in the LLM checker's markdown layout, for when the LLM result is unavailable (English only)."""
+    found = [name for name, present in result["sections"].items() if present]
+    absent = [name for name, present in result["sections"].items() if not present and name in ("experience", "education", "skills")]
+    strengths = []
+    if result["matched_keywords"]:
+        strengths.append(f"Covers: {', '.join(result['matched_keywords'][:10])}")
+    if found:
+        strengths.append(f"Clear sections: {', '.join(found)}")
+    weaknesses = list(result["red_flags"])
+    if result["missing_keywords"]:
+        weaknesses.insert(0, f"Missing keywords: {', '.join(result['missing_keywords'][:10])}")
+    if absent:
+        weaknesses.append(f"No {', '.join(absent)} section found")
+    advice = []
+    if result["missing_keywords"]:
+        advice.append("Work the missing keywords into your skills and experience where they are true for you")
+    if absent or result["red_flags"]:
+        advice.append("Use a single-column layout with standard section headings and your contact details at the top")
+    advice.append("Quantify achievements (numbers, percentages) under each role")
+
+    lines = [
+        "---",
+        f"🏆 OVERALL SCORE: {result['overall_score']}/100",
+        "",
+        "🧩 COMPONENT SCORES:",
+        *(f"- {component['name']}: {component['score']}/{component['max']}" for component in result["components"]),
+        "",
+        "🛠️ STRENGTHS:",
+        *(f"- {item}" for item in strengths or ["No clear strengths detected automatically"]),
+        "",
+        "⚠️ WEAKNESSES:",
+        *(f"- {item}" for item in weaknesses or ["No major issues detected automatically"]),
+        "",
+        "💡 ADVICE:",
+        *(f"- {item}" for item in advice),
+        "---",
+    ]
+    return "\n".join(lines)
@@ -1,13 +1,47 @@
-from modules.base_chains import BaseChain
-from modules.utils import clean_yaml_parser
-from .prompts import ats_create_resume_prompt, ats_job_desc_resume_prompt, edit_resume_section_prompt, ats_checker_prompt, ats_checker_no_job_desc_prompt
-
-chain_instance = BaseChain(output_parser=clean_yaml_parser)
+from langchain_core.runnables import RunnableBranch
+from modules.chain_registry import chain_registry
+from modules.utils import is_valid_yaml
+from .prompts import (
+    ats_create_resume_prompt,
+    ats_job_desc_resume_prompt,
+    create_resume_prompt,
+    edit_resume_section_prompt,
+    ats_checker_prompt,
+    ats_checker_no_job_desc_prompt,
+)
 
 
 # chains
-ats_create_resume_chain = chain_instance.build_chain(ats_create_resume_prompt)
-ats_job_desc_resume_chain = chain_instance.build_chain(ats_job_desc_resume_prompt)
-edit_resume_section_chain = chain_instance.build_chain(edit_resume_section_prompt)
-ats_checker_chain = chain_instance.build_chain(ats_checker_prompt)
-ats_checker_no_job_desc_chain = chain_instance.build_chain(ats_checker_no_job_desc_prompt)
+# latency_budget: seconds to the first token before a hedged request goes to the
+# fallback model (modules/hedging.py); background-only chains get looser budgets
+ats_create_resume_chain = chain_registry.register(
+    "resumes.ats_create_resume", ats_create_resume_prompt,
+    inputs=("input_text", "language", "ats_result"), cache_validator=is_valid_yaml, latency_budget=20,
+)
+ats_job_desc_resume_chain = chain_registry.register(
+    "resumes.ats_job_desc_resume", ats_job_desc_resume_prompt,
+    inputs=("input_text", "job_description", "language", "ats_result"), cache_validator=is_valid_yaml, latency_budget=20,
+)
+create_resume_chain = chain_registry.register(
+    "resumes.create_resume", create_resume_prompt,
+    inputs=("input_text", "language", "job_description", "instructions"), cache_validator=is_valid_yaml,
+    latency_budget=10,
+)
+edit_resume_section_chain = chain_registry.register(
+    "resumes.edit_section", edit_resume_section_prompt,
+    inputs=("section_title", "section_yaml", "prompt"), cache_validator=is_valid_yaml, latency_budget=6,
+)
+ats_checker_chain = chain_registry.register(
+    "resumes.ats_checker", ats_checker_prompt,
+    inputs=("input_text", "job_description", "language", "user_input_role"), latency_budget=8,
+)
+ats_checker_no_job_desc_chain = chain_registry.register(
+    "resumes.ats_checker_no_job_desc", ats_checker_no_job_desc_prompt,
+    inputs=("input_text", "language", "user_input_role"), latency_budget=8,
+)
+
+# Picks the right ATS prompt per input, so mixed batches can share one abatch call
+ats_checker_any_chain = RunnableBranch(
+    (lambda x: bool(x.get("job_description")), ats_checker_chain),
+    ats_checker_no_job_desc_chain,
+)
@@ -1,24 +1,43 @@
-from fastapi import APIRouter, HTTPException, Depends, Header ,BackgroundTasks, File, Form, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, Header, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Optional, Tuple
 from .utils import (
     save_resume_to_django,
     verify_resume_generation,
     verify_resume_section_edit,
     extract_text_from_file,
-    generate_resume_and_update_django,
+    resume_section_parser,
+    verify_ats_checker,
 )
-from .chains import chain_instance,ats_checker_chain, ats_checker_no_job_desc_chain
-from .prompts import (
-    create_resume_prompt,
-    edit_resume_section_prompt
+from .ats_prescore import prescore_resume, format_prescore
+from .chains import (
+    create_resume_chain,
+    edit_resume_section_chain,
+    ats_checker_chain,
+    ats_checker_no_job_desc_chain,
+    ats_checker_any_chain,
 )
-from modules.utils import safe_load_yaml_with_logging
+from modules.utils import asafe_load_yaml_with_logging
+from modules.http_client import get_django_client
+from modules.streaming import format_sse, STREAMING_HEADERS
+from modules.job_queue import job_queue
 import httpx
 import yaml
 from io import StringIO
+import asyncio
 import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+
+# Limits for /ats_checker_batch
+ATS_BATCH_MAX_ITEMS = int(os.getenv("ATS_BATCH_MAX_ITEMS", "50"))
+ATS_BATCH_MAX_CONCURRENCY = int(os.getenv("ATS_BATCH_MAX_CONCURRENCY", "8"))
+# How long ats_checker_and_generate waits for the LLM check before answering with the local pre-score
+ATS_LLM_TIMEOUT = float(os.getenv("ATS_LLM_TIMEOUT", "60"))
 
 
 class ResumeRequest(BaseModel):
@@ -39,6 +58,67 @@ class ResumeSectionRequest(BaseModel):
 router = APIRouter()
 
 
+def _edit_section_inputs(request: ResumeSectionRequest) -> dict:
+    return {
+        "section_title": request.sectionTitle,
+        "section_yaml": yaml.dump(request.sectionData),
+        "prompt": request.prompt,
+    }
+
+
+def _create_resume_inputs(request: ResumeRequest) -> dict:
+    return {
+        "input_text": request.input_text,
+        "language": request.language,
+        "job_description": request.job_description or "the user did not provide a job description",
+        "instructions": request.instructions or "the user did not provide any extra instructions",
+    }
+
+
+async def _save_created_resume(result: str, auth_data: dict) -> dict:
+    """Parses the generated YAML, saves it to Django and builds the endpoint response."""
+    # Parse the full result to extract metadata and the resume object
+    parsed_data = await asafe_load_yaml_with_logging(result) 
+
+    # The 'resume' part from the YAML
+    resume_content_obj = parsed_data.get("resume", {})
+
+    # Convert the ordered resume object back to a YAML string for storage, preserving key order
+    string_stream = StringIO()
+    yaml.dump(resume_content_obj, string_stream, sort_keys=False, default_flow_style=False)
+    resume_yaml_string = string_stream.getvalue()
+
+    # Prepare the payload for the Django API call
+    django_payload = {
+        "title": parsed_data.get("title", "Generated Resume"),
+        "description": parsed_data.get("description", ""),
+        "about_candidate": parsed_data.get("about_candidate", ""),
+        "job_search_keywords": parsed_data.get("job_search_keywords", ""),
+        "fontawesome_icon": parsed_data.get("fontawesome_icon", ""),
+        "resume": resume_yaml_string # Send the raw, order-preserved YAML string
+    }
+    logger.debug(f"Prepared Django payload: {django_payload['resume'][:100]}...")  # First 100 chars of the resume
+    # Save to Django via API call
+    saved_resume = await save_resume_to_django(
+        auth_data["user_id"], django_payload, auth_data["authorization"]
+    )
+
+    if not saved_resume:
+        # If saving fails, still return the generated content (as a parsed object)
+        return {
+            "success": True,
+            "content": parsed_data,
+            "warning": "Resume generated but not saved to database",
+        }
+
+    return {
+        "success": True,
+        "resume_id": saved_resume["id"],
+        "resume": saved_resume,
+        "remaining_uses": auth_data["remaining_uses"] - 1,
+    }
+
+
 @router.post("/edit_section")
 async def edit_section(
     request: ResumeSectionRequest,
@@ -47,28 +127,47 @@ async def edit_section(
     """
     Edits a specific section of a resume.
     """
-    try:                                                                                                                                                                                                                                                        
-        # Create prompt and call chain
-        chain = chain_instance.build_chain(edit_resume_section_prompt)
-        result = await chain.ainvoke(
-            {
-                "section_title": request.sectionTitle,
-                "section_yaml": yaml.dump(request.sectionData),
-                "prompt": request.prompt,
-            }
-        )
+    try:
+        # Call the prebuilt chain
+        result = await edit_resume_section_chain.ainvoke(_edit_section_inputs(request))
 
         # Parse result
-        section_data = yaml.safe_load(result)
+        section_data = await asafe_load_yaml_with_logging(result)
 
         return section_data
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to edit section: {str(e)}"
         )
 
 
+@router.post("/edit_section/stream")
+async def edit_section_stream(
+    request: ResumeSectionRequest,
+    auth_data: dict = Depends(verify_resume_section_edit),
+):
+    """
+    Streaming variant of edit_section (server-sent events).
+
+    Emits `token` events with the raw YAML as it is generated, then a terminal
+    `result` event with the parsed section, or an `error` event.
+    """
+    async def event_stream():
+        chunks = []
+        try:
+            async for chunk in edit_resume_section_chain.astream(_edit_section_inputs(request)):
+                chunks.append(chunk)
+                yield format_sse("token", {"text": chunk})
+            yield format_sse("result", await asafe_load_yaml_with_logging("".join(chunks)))
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Failed to edit section: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=STREAMING_HEADERS)
+
+
 @router.post("/create_resume")
 async def create_resume(
     request: ResumeRequest,
@@ -85,129 +184,245 @@ async def create_resume(
     """
 
     try:
-        # Step 1: Create prompt and call chain (FastAPI handles this well)
-        chain = chain_instance.build_chain(create_resume_prompt)
-        result = await chain.ainvoke(
-            {
-                "input_text": request.input_text,
-                "language": request.language,
-                "job_description": request.job_description or "the user did not provide a job description",
-                "instructions": request.instructions or "the user did not provide any extra instructions",
-            }
-        )
+        # Step 1: Call the prebuilt chain
+        result = await create_resume_chain.ainvoke(_create_resume_inputs(request))
 
-        # Step 2: Parse the full result to extract metadata and the resume object
-        parsed_data = safe_load_yaml_with_logging(result) 
-
-        # The 'resume' part from the YAML
-        resume_content_obj = parsed_data.get("resume", {})
-
-        # Convert the ordered resume object back to a YAML string for storage, preserving key order
-        string_stream = StringIO()
-        yaml.dump(resume_content_obj, string_stream, sort_keys=False, default_flow_style=False)
-        resume_yaml_string = string_stream.getvalue()
-
-        # Prepare the payload for the Django API call
-        django_payload = {
-            "title": parsed_data.get("title", "Generated Resume"),
-            "description": parsed_data.get("description", ""),
-            "about_candidate": parsed_data.get("about_candidate", ""),
-            "job_search_keywords": parsed_data.get("job_search_keywords", ""),
-            "fontawesome_icon": parsed_data.get("fontawesome_icon", ""),
-            "resume": resume_yaml_string # Send the raw, order-preserved YAML string
-        }
-        print(f"Prepared Django payload: {django_payload['resume'][:100]}...")  # Log first 100 chars of resume for debugging
-        # Step 3: Save to Django via API call
-        saved_resume = await save_resume_to_django(
-            auth_data["user_id"], django_payload, auth_data["authorization"]
-        )
-
-        if not saved_resume:
-            # If saving fails, still return the generated content (as a parsed object)
-            return {
-                "success": True,
-                "content": parsed_data,
-                "warning": "Resume generated but not saved to database",
-            }
-
-        return {
-            "success": True,
-            "resume_id": saved_resume["id"],
-            "resume": saved_resume,
-            "remaining_uses": auth_data["remaining_uses"] - 1,
-        }
+        # Step 2: Parse, save to Django and build the response
+        return await _save_created_resume(result, auth_data)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 
+@router.post("/create_resume/stream")
+async def create_resume_stream(
+    request: ResumeRequest,
+    auth_data: dict = Depends(verify_resume_generation),
+):
+    """
+    Streaming variant of create_resume (server-sent events).
+
+    Emits `token` events as Gemini produces the YAML and a `section` event as
+    each resume section completes, then a terminal `result` event carrying the
+    same payload create_resume returns (after the resume is saved to Django),
+    or an `error` event. A malformed section stops the generation right away.
+    """
+    async def event_stream():
+        chunks = []
+        parser = resume_section_parser()
+        try:
+            async for chunk in create_resume_chain.astream(_create_resume_inputs(request)):
+                chunks.append(chunk)
+                yield format_sse("token", {"text": chunk})
+                for section in await parser.afeed(chunk):
+                    yield format_sse("section", {"path": section.path, "data": section.value})
+            for section in await parser.aclose():
+                yield format_sse("section", {"path": section.path, "data": section.value})
+            yield format_sse("result", await _save_created_resume("".join(chunks), auth_data))
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Processing failed: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=STREAMING_HEADERS)
+
+
+
+
+
+def _ats_inputs(text: str, job_description: str, target_role: str, language: str) -> dict:
+    return {
+        "input_text": text,
+        "job_description": job_description,
+        "target_role": target_role,
+        "language": language,
+        "user_input_role": target_role,
+    }
+
+
+async def _ats_request(resume: Optional[UploadFile], resume_text: Optional[str], formData: str) -> dict:
+    """Resume text and the ATS form fields of an ats_checker_and_generate request."""
+    # Pass the UploadFile object directly to the utility and await it
+    if resume:
+        text = await extract_text_from_file(resume)
+    else:
+        text = resume_text
+    form_data = json.loads(formData)
+    return {
+        "text": text or "",
+        "job_description": form_data.get("description", ""),
+        "language": form_data.get("targetLanguage", "en"),
+        "target_role": form_data.get("targetRole", ""),
+        "generate_new_resume": form_data.get("generate_new_resume", True),
+    }
+
 
+async def _llm_ats_result(request: dict, prescore: dict) -> Tuple[str, bool]:
+    """
+    The LLM ATS evaluation, or the pre-score in the same layout when Gemini
+    fails or takes longer than ATS_LLM_TIMEOUT. Returns (ats_result, degraded).
+    """
+    ats_chain = ats_checker_chain if request["job_description"] else ats_checker_no_job_desc_chain
+    inputs = _ats_inputs(request["text"], request["job_description"], request["target_role"], request["language"])
+    try:
+        return await asyncio.wait_for(ats_chain.ainvoke(inputs), ATS_LLM_TIMEOUT), False
+    except asyncio.TimeoutError:
+        logger.warning(f"ATS check took longer than {ATS_LLM_TIMEOUT:g}s, answering with the local pre-score")
+    except Exception as e:
+        logger.warning(f"ATS check failed, answering with the local pre-score: {e!r}")
+    return format_prescore(prescore), True
+
+
+async def _enqueue_generation(client: httpx.AsyncClient, request: dict, ats_result: str) -> Optional[str]:
+    """Creates the Django task and queues the full resume generation; None when not requested."""
+    if not request["generate_new_resume"]:
+        return None
+    # --- Create Task Record in Django ---
+    response = await client.post("/api/create-task/")
+    response.raise_for_status()
+    generation_task_id = response.json()["task_id"]
+
+    logger.info(f"Created task {generation_task_id} in Django.")
+
+    # --- Enqueue the generation job ---
+    await job_queue.aenqueue("resume_generation", {
+        "task_id": generation_task_id,
+        "resume_text": request["text"],
+        "job_desc": request["job_description"],
+        "language": request["language"],
+        "ats_result": ats_result,
+    })
+    logger.info(f"Enqueued generation job for task {generation_task_id}.")
+    return generation_task_id
 
 
 @router.post("/ats_checker_and_generate")
 async def ats_checker_and_generate(
-    background_tasks: BackgroundTasks,
     # make resume optional, if not provided, use form data
     resume: UploadFile = File(None),
     resume_text: str = Form(None),
     formData: str = Form(...),
+    client: httpx.AsyncClient = Depends(get_django_client),
 ):
     """
     New primary endpoint for the ATS checker.
     1. Receives file and form data directly from the frontend.
-    2. Performs synchronous ATS check.
+    2. Scores the resume locally (ats_prescore), then performs the LLM ATS check.
     3. Triggers asynchronous full resume generation.
+
+    When the LLM check fails or times out, `ats_result` is the local
+    pre-score in the same format and `degraded` is true.
     """
     # --- 1. Process Inputs ---
-    # Pass the UploadFile object directly to the utility and await it
-    if resume:
-        text = await extract_text_from_file(resume)
-    else:
-        text = resume_text
-    # The rest of your logic remains the same
-    form_data = json.loads(formData)
-    
-    job_description = form_data.get("description", "")
-    language = form_data.get("targetLanguage", "en")
-    target_role = form_data.get("targetRole", "")
-    generate_new_resume_flag = form_data.get("generate_new_resume", True)
+    request = await _ats_request(resume, resume_text, formData)
 
-    # --- 2. Synchronous ATS Check ---
-    ats_chain = ats_checker_chain if job_description else ats_checker_no_job_desc_chain
-    ats_result = await ats_chain.ainvoke({
-        "input_text": text,
-        "job_description": job_description,
-        "target_role": target_role,
-        "language": language,
-        "user_input_role": target_role,
-    })
+    # --- 2. Local pre-score, then the LLM check ---
+    prescore = prescore_resume(request["text"], request["job_description"], request["target_role"])
+    ats_result, degraded = await _llm_ats_result(request, prescore)
 
+    # --- 3. Queue the full generation ---
+    generation_task_id = await _enqueue_generation(client, request, ats_result)
 
-    generation_task_id = None
-    if generate_new_resume_flag:
-        # --- 3. Create Task Record in Django ---
-        create_task_url = f"{os.environ.get('DJANGO_API_URL', 'http://django:8000')}/api/create-task/"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(create_task_url)
-            response.raise_for_status()
-            generation_task_id = response.json()["task_id"]
-        
-        print(f"Created task {generation_task_id} in Django.")
-
-        # --- 4. Add Background Task ---
-        background_tasks.add_task(
-            generate_resume_and_update_django,
-            generation_task_id,
-            text,
-            job_description,
-            language,
-            ats_result
-        )
-        print(f"Enqueued background generation for task {generation_task_id}.")
-
-    # --- 5. Return Immediate Response ---
+    # --- 4. Return Immediate Response ---
     return {
         "ats_result": ats_result,
+        "ats_prescore": prescore,
+        "degraded": degraded,
         "generation_task_id": generation_task_id
     }
 
+
+@router.post("/ats_checker_and_generate/stream")
+async def ats_checker_and_generate_stream(
+    resume: UploadFile = File(None),
+    resume_text: str = Form(None),
+    formData: str = Form(...),
+    client: httpx.AsyncClient = Depends(get_django_client),
+):
+    """
+    Streaming variant of ats_checker_and_generate (server-sent events).
+
+    Emits a `prescore` event with the local score as soon as the text is
+    extracted, then a terminal `result` event with the same payload
+    ats_checker_and_generate returns once the LLM check is done, or an
+    `error` event.
+    """
+    request = await _ats_request(resume, resume_text, formData)
+
+    async def event_stream():
+        try:
+            prescore = prescore_resume(request["text"], request["job_description"], request["target_role"])
+            yield format_sse("prescore", prescore)
+            ats_result, degraded = await _llm_ats_result(request, prescore)
+            generation_task_id = await _enqueue_generation(client, request, ats_result)
+            yield format_sse("result", {
+                "ats_result": ats_result,
+                "ats_prescore": prescore,
+                "degraded": degraded,
+                "generation_task_id": generation_task_id,
+            })
+        except Exception as e:
+            yield format_sse("error", {"detail": f"ATS check failed: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=STREAMING_HEADERS)
+
+
+@router.post("/ats_checker_batch")
+async def ats_checker_batch(
+    resume: UploadFile = File(None),
+    resume_text: str = Form(None),
+    formData: str = Form(...),
+    auth_data: dict = Depends(verify_ats_checker),
+):
+    """
+    Scores one resume against many job descriptions in a single request.
+
+    formData (JSON):
+        jobs: [{"id": ..., "description": ..., "targetRole": ...}, ...]
+        targetLanguage: output language (default "en")
+        max_concurrency: parallel LLM calls (capped by ATS_BATCH_MAX_CONCURRENCY)
+        stream: if true, respond with NDJSON, one line per job as soon as it finishes
+
+    Each item is {"index", "id", "ats_result"} or {"index", "id", "error"}.
+    """
+    if resume:
+        text = await extract_text_from_file(resume)
+    else:
+        text = resume_text
+    if not text:
+        raise HTTPException(status_code=400, detail="A resume file or resume_text is required")
+
+    form_data = json.loads(formData)
+    jobs = form_data.get("jobs") or []
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No jobs to check")
+    if len(jobs) > ATS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {ATS_BATCH_MAX_ITEMS} jobs per batch")
+
+    language = form_data.get("targetLanguage", "en")
+    max_concurrency = max(1, min(int(form_data.get("max_concurrency") or ATS_BATCH_MAX_CONCURRENCY), ATS_BATCH_MAX_CONCURRENCY))
+    config = {"max_concurrency": max_concurrency}
+    inputs = [
+        _ats_inputs(text, job.get("description", ""), job.get("targetRole", ""), language)
+        for job in jobs
+    ]
+
+    def batch_item(index: int, output) -> dict:
+        item = {"index": index, "id": jobs[index].get("id")}
+        if isinstance(output, Exception):
+            item["error"] = str(output)
+        else:
+            item["ats_result"] = output
+        return item
+
+    if form_data.get("stream"):
+        async def ndjson_stream():
+            async for index, output in ats_checker_any_chain.abatch_as_completed(
+                inputs, config, return_exceptions=True
+            ):
+                yield json.dumps(batch_item(index, output)) + "\n"
+
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", headers=STREAMING_HEADERS)
+
+    outputs = await ats_checker_any_chain.abatch(inputs, config, return_exceptions=True)
+    return {"results": [batch_item(index, output) for index, output in enumerate(outputs)]}
@@ -1,29 +1,61 @@
-from modules.utils import create_auth_dependency
+from modules.utils import create_auth_dependency, report_task_failure
+from modules.job_queue import job_handler
+from modules.http_client import get_django_client
+from modules.file_extraction import extract_upload_text
+from modules.metrics import stage
 from fastapi import HTTPException, Header, UploadFile
-from PyPDF2 import PdfReader
-from docx import Document
 from typing import Optional
 import httpx
 from .chains import ats_create_resume_chain, ats_job_desc_resume_chain
+from .prompts import yaml_template
 import os
-import io
-from modules.utils import safe_load_yaml_with_logging
+import time
+from modules.utils import asafe_load_yaml_with_logging
+from modules.yaml_sections import IncrementalYamlSectionParser
+from modules.yaml_repair import yaml_repair_stats
 from io import StringIO
 import yaml
+import logging
 
+logger = logging.getLogger(__name__)
 
 
-# Django service URL
-DJANGO_API_URL = os.getenv("DJANGO_API_URL", "http://django:8000")
+# Push partial sections of background generations to Django at most this often (seconds)
+RESUME_PARTIAL_UPDATE_INTERVAL = float(os.getenv("RESUME_PARTIAL_UPDATE_INTERVAL", "2"))
+RESUME_PARTIAL_UPDATES = os.getenv("RESUME_PARTIAL_UPDATES", "1") == "1"
+
+
+def _resume_section_validators() -> dict:
+    """Expected type of every section, derived from the resume.yaml template."""
+    scalar = (str, int, float)
+    template = yaml.safe_load(yaml_template)
+    validators = {}
+    for key, value in template.items():
+        if isinstance(value, str):
+            validators[key] = scalar
+    validators["job_search_keywords"] = (str, list)
+    for key, value in (template.get("resume") or {}).items():
+        validators[f"resume.{key}"] = scalar if isinstance(value, str) else type(value)
+    return validators
+
+
+RESUME_SECTION_VALIDATORS = _resume_section_validators()
+
+
+def resume_section_parser() -> IncrementalYamlSectionParser:
+    """Incremental parser for the generated resume document (sections under `resume:`)."""
+    return IncrementalYamlSectionParser(nested_under=("resume",), validators=RESUME_SECTION_VALIDATORS)
+
 
 async def save_resume_to_django(user_id: int, data: dict, authorization: str):
     """Save resume via Django API"""
-    async with httpx.AsyncClient() as client:
-        try:
+    client = get_django_client()
+    try:
+        with stage("django_save"):
             response = await client.post(
-                f"{DJANGO_API_URL}/api/resumes/",
+                "/api/resumes/",
                 headers={"Authorization": authorization},
-                
+
                 json={
                     "resume": data.get("resume", ""),  # The main resume YAML string
                     "title": data.get("title", "Generated Resume"),
@@ -35,113 +67,125 @@ async def save_resume_to_django(user_id: int, data: dict, authorization: str):
                 },
             )
 
-            if response.status_code == 201:
-                return response.json()
-            else:
-                return None
-
-        except httpx.RequestError:
-            return None
-
-# This is the background function
-async def generate_resume_and_update_django(task_id: str, resume_text: str, job_desc: str, language: str,ats_result:str):
-    update_url = f"{DJANGO_API_URL}/api/update-task/"
-    generated_resume = None
-    try:
-        # 1. Run the slow AI generation chain
-        if job_desc and job_desc.strip():
-            generated_resume = await ats_job_desc_resume_chain.ainvoke({
-                "input_text": resume_text,
-                "job_description": job_desc,
-                "language": language,
-                "ats_result": ats_result,
-            })
+        if response.status_code == 201:
+            return response.json()
         else:
-            generated_resume = await ats_create_resume_chain.ainvoke({
-                "input_text": resume_text,
-                "language": language,
-                "ats_result": ats_result,
-            })
-
-        # Add a check to ensure the AI returned a valid string
-        if not generated_resume or not isinstance(generated_resume, str):
-            raise ValueError("AI chain failed to return a valid resume string.")
-
-        # Parse the YAML to extract metadata
-        parsed_data = safe_load_yaml_with_logging(generated_resume)
-        
-        # The 'resume' part from the YAML
-        resume_content_obj = parsed_data.get("resume", {})
-
-        # Convert the ordered resume object back to a string for storage
-        string_stream = StringIO()
-        yaml.dump(resume_content_obj, string_stream, sort_keys=False, default_flow_style=False)
-        resume_yaml_string = string_stream.getvalue()
-
-        # Prepare the result payload
-        result_payload = {
-            "title": parsed_data.get("title", "Generated Resume"),
-            "description": parsed_data.get("description", ""),
-            "about_candidate": parsed_data.get("about_candidate", ""),
-            "job_search_keywords": parsed_data.get("job_search_keywords", ""),
-            "fontawesome_icon": parsed_data.get("fontawesome_icon", ""),
-            "resume_yaml_string": resume_yaml_string # The raw, order-preserved YAML string
-        }
+            return None
 
-        # 2. Update the task in Django with the result
-        payload = {"task_id": task_id, "status": "SUCCESS", "result": result_payload}
-        async with httpx.AsyncClient() as client:
-            await client.post(update_url, json=payload)
+    except httpx.RequestError:
+        return None
 
-    except Exception as e:
-        # 3. If anything fails, update the task with an error
-        print(f"Error occurred while generating resume: {e}")
-        error_payload = {"task_id": task_id, "status": "FAILURE", "error": str(e)}
-        async with httpx.AsyncClient() as client:
-            await client.post(update_url, json=error_payload)
+@job_handler("resume_generation", on_failure=report_task_failure)
+async def resume_generation_job(payload: dict):
+    try:
+        await generate_resume_and_update_django(**payload)
+    except yaml.YAMLError:
+        # Beyond local repair: the job queue retries with a fresh generation
+        yaml_repair_stats.reasked += 1
+        raise
 
 
-# --- MODIFIED FUNCTION ---
-async def extract_text_from_file(uploaded_file: UploadFile):
+async def generate_resume_and_update_django(task_id: str, resume_text: str, job_desc: str, language: str,ats_result:str):
     """
-    Asynchronously reads an UploadFile and extracts its text content.
+    Generates the resume and reports SUCCESS to Django. Raises on failure so
+    the job queue can retry; the final FAILURE is posted by report_task_failure.
     """
-    try:
-        content_type = uploaded_file.content_type
-        # Read the file content asynchronously ONCE.
-        file_content = await uploaded_file.read()
-        text = ""
-
-        if content_type == "application/pdf":
-            pdf_reader = PdfReader(io.BytesIO(file_content))
-            text = "\n".join([page.extract_text() for page in pdf_reader.pages])
-
-        elif content_type in [
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "application/msword",
-        ]:
-            doc = Document(io.BytesIO(file_content))
-            text = "\n".join([para.text for para in doc.paragraphs])
-
-        elif content_type == "text/plain":
-            text = file_content.decode("utf-8")
+    update_url = "/api/update-task/"
+    client = get_django_client()
+
+    # 1. Run the slow AI generation chain
+    if job_desc and job_desc.strip():
+        chain = ats_job_desc_resume_chain
+        inputs = {
+            "input_text": resume_text,
+            "job_description": job_desc,
+            "language": language,
+            "ats_result": ats_result,
+        }
+    else:
+        chain = ats_create_resume_chain
+        inputs = {
+            "input_text": resume_text,
+            "language": language,
+            "ats_result": ats_result,
+        }
+    generated_resume = await _stream_resume_generation(chain, inputs, task_id, client)
+
+    # Add a check to ensure the AI returned a valid string
+    if not generated_resume or not isinstance(generated_resume, str):
+        raise ValueError("AI chain failed to return a valid resume string.")
+
+    # Parse the YAML to extract metadata
+    parsed_data = await asafe_load_yaml_with_logging(generated_resume)
+    
+    # The 'resume' part from the YAML
+    resume_content_obj = parsed_data.get("resume", {})
+
+    # Convert the ordered resume object back to a string for storage
+    string_stream = StringIO()
+    yaml.dump(resume_content_obj, string_stream, sort_keys=False, default_flow_style=False)
+    resume_yaml_string = string_stream.getvalue()
+
+    # Prepare the result payload
+    result_payload = {
+        "title": parsed_data.get("title", "Generated Resume"),
+        "description": parsed_data.get("description", ""),
+        "about_candidate": parsed_data.get("about_candidate", ""),
+        "job_search_keywords": parsed_data.get("job_search_keywords", ""),
+        "fontawesome_icon": parsed_data.get("fontawesome_icon", ""),
+        "resume_yaml_string": resume_yaml_string # The raw, order-preserved YAML string
+    }
+
+    # 2. Update the task in Django with the result
+    payload = {"task_id": task_id, "status": "SUCCESS", "result": result_payload}
+    with stage("django_save"):
+        response = await client.post(update_url, json=payload)
+    response.raise_for_status()
+
+
+async def _stream_resume_generation(chain, inputs: dict, task_id: str, client: httpx.AsyncClient) -> str:
+    """
+    Streams the generation through the incremental section parser. Completed
+    sections are pushed to the PENDING task as partial results, and the first
+    malformed section aborts the generation instead of waiting for the end.
+    """
+    parser = resume_section_parser()
+    chunks = []
+    last_update = time.monotonic()
+    async for chunk in chain.astream(inputs):
+        chunks.append(chunk)
+        if await parser.afeed(chunk) and RESUME_PARTIAL_UPDATES and time.monotonic() - last_update >= RESUME_PARTIAL_UPDATE_INTERVAL:
+            last_update = time.monotonic()
+            partial_payload = {
+                "task_id": task_id,
+                "status": "PENDING",
+                "result": {"partial": True, "sections": parser.document},
+            }
+            try:
+                await client.post("/api/update-task/", json=partial_payload)
+            except httpx.RequestError as e:
+                logger.warning(f"Could not push partial result for task {task_id}: {e}")
+    await parser.aclose()
+    return "".join(chunks)
 
-        else:
-            # It's good practice to seek back to the start in case of retry logic
-            await uploaded_file.seek(0)
-            raise ValueError(f"Unsupported file type: {content_type}")
 
-        return text
+async def extract_text_from_file(uploaded_file: UploadFile):
+    """
+    Extracts the text of an uploaded resume (PDF, DOCX or plain text).
 
-    except Exception as e:
-        print(f"Error extracting text from file: {e}")
-        raise
+    Parsing runs in the shared process pool (modules.file_extraction), so a
+    long PDF does not stall the event loop; size, page and time limits are
+    enforced there and surface as HTTP errors.
+    """
+    with stage("text_extraction"):
+        return await extract_upload_text(uploaded_file)
 
 
 # Create specific dependencies for different features
 verify_resume_generation = create_auth_dependency("resume_generation")
 verify_resume_section_edit = create_auth_dependency("resume_section_edit")
 verify_pdf_generation = create_auth_dependency("pdf_generation")
+verify_ats_checker = create_auth_dependency("ats_checker")
 
 
 
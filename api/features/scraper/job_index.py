@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOB_INDEX_ENABLED = os.getenv("JOB_INDEX_ENABLED", "1") == "1"
+# Shares the data/ volume with the job queue so postings survive restarts
+JOB_INDEX_PATH = os.getenv("JOB_INDEX_PATH", "data/job_index.sqlite3")
+# A query's index results are re-scraped in the background once they are this old
+JOB_INDEX_STALE_AFTER = float(os.getenv("JOB_INDEX_STALE_AFTER", str(6 * 3600)))
+# Postings not seen in a scrape for this long are no longer returned, then purged
+JOB_INDEX_MAX_AGE = float(os.getenv("JOB_INDEX_MAX_AGE", str(14 * 24 * 3600)))
+JOB_INDEX_RETENTION = float(os.getenv("JOB_INDEX_RETENTION", str(30 * 24 * 3600)))
+JOB_INDEX_PURGE_INTERVAL = 3600
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Legal-form suffixes that differ between boards for the same employer
+_COMPANY_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "gmbh", "ag", "co", "corp", "corporation",
+    "plc", "sa", "sas", "srl", "bv", "nv", "kg", "se", "oy", "ab", "as", "pty", "company",
+}
+
+
+def _words(value: Optional[str]) -> List[str]:
+    return _WORD.findall((value or "").casefold())
+
+
+def posting_fingerprint(job: Dict[str, Any]) -> str:
+    """
+    Identity of a posting across boards: normalized title, company without its
+    legal form, and the city (first part of the location).
+    """
+    title = " ".join(_words(job.get("title")))
+    company = " ".join(word for word in _words(job.get("company")) if word not in _COMPANY_SUFFIXES)
+    city = " ".join(_words((job.get("location") or "").split(",")[0]))
+    return hashlib.sha1(f"{title}|{company}|{city}".encode("utf-8")).hexdigest()
+
+
+def query_key(query: Tuple) -> str:
+    return hashlib.sha256(json.dumps(list(query)).encode("utf-8")).hexdigest()
+
+
+def _fts5_available(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class JobIndex:
+    """
+    Scraped postings in SQLite, de-duplicated across sites by fingerprint and
+    searchable through an FTS5 index over title, company, location and
+    description (plain LIKE matching when SQLite lacks FTS5).
+
+    Also records when each normalized query was last scraped, so searches can
+    tell whether the index is fresh for that query.
+    """
+
+    def __init__(self, path: str = JOB_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.added = 0
+        self.merged = 0  # postings already in the index (same site again, or another site)
+        self.searches = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.fts = _fts5_available(self._conn)
+        self._create_schema()
+
+    def _create_schema(self):
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS postings (
+                id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL UNIQUE,
+                title TEXT, company TEXT, location TEXT, is_remote INTEGER,
+                description TEXT, date_posted TEXT,
+                job_url TEXT,
+                urls TEXT NOT NULL,          -- {site: job_url}
+                data TEXT NOT NULL,          -- first scraped record (all jobspy fields)
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS postings_last_seen ON postings (last_seen);
+            CREATE TABLE IF NOT EXISTS indexed_queries (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            """
+        )
+        if self.fts:
+            self._conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS postings_fts USING fts5(
+                    title, company, location, description,
+                    content='postings', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS postings_ai AFTER INSERT ON postings BEGIN
+                    INSERT INTO postings_fts (rowid, title, company, location, description)
+                    VALUES (new.id, new.title, new.company, new.location, new.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS postings_ad AFTER DELETE ON postings BEGIN
+                    INSERT INTO postings_fts (postings_fts, rowid, title, company, location, description)
+                    VALUES ('delete', old.id, old.title, old.company, old.location, old.description);
+                END;
+                CREATE TRIGGER IF NOT EXISTS postings_au AFTER UPDATE ON postings BEGIN
+                    INSERT INTO postings_fts (postings_fts, rowid, title, company, location, description)
+                    VALUES ('delete', old.id, old.title, old.company, old.location, old.description);
+                    INSERT INTO postings_fts (rowid, title, company, location, description)
+                    VALUES (new.id, new.title, new.company, new.location, new.description);
+                END;
+                """
+            )
+        else:
+            logger.warning("SQLite has no FTS5, the job index falls back to LIKE matching")
+
+    # --- Writes ---
+
+    def add(self, jobs: Iterable[Dict[str, Any]]) -> int:
+        """Upserts scraped postings, merging duplicates."""
+        now = time.time()
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for job in jobs:
+                    if not job.get("title"):
+                        continue
+                    added += self._upsert(job, now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if now - self._last_purge > JOB_INDEX_PURGE_INTERVAL:
+                self._purge(now)
+        return added
+
+    def _upsert(self, job: Dict[str, Any], now: float) -> int:
+        fingerprint = posting_fingerprint(job)
+        site, job_url = job.get("site"), job.get("job_url")
+        row = self._conn.execute(
+            "SELECT id, urls, description FROM postings WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        if row is None:
+            self._conn.execute(
+                "INSERT INTO postings (fingerprint, title, company, location, is_remote, description, date_posted, "
+                "job_url, urls, data, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    fingerprint, job.get("title"), job.get("company"), job.get("location"),
+                    job.get("is_remote"), job.get("description"), job.get("date_posted"),
+                    job_url, json.dumps({site: job_url} if site and job_url else {}),
+                    json.dumps(job, default=str), now, now,
+                ),
+            )
+            self.added += 1
+            return 1
+
+        posting_id, urls, description = row
+        urls = json.loads(urls)
+        if site and job_url:
+            urls.setdefault(site, job_url)
+        # Boards truncate descriptions differently; keep the most complete one
+        new_description = job.get("description")
+        if not new_description or (description and len(description) >= len(new_description)):
+            new_description = description
+        self._conn.execute(
+            "UPDATE postings SET urls = ?, description = ?, last_seen = ?, "
+            "is_remote = COALESCE(?, is_remote), date_posted = COALESCE(?, date_posted) WHERE id = ?",
+            (json.dumps(urls), new_description, now, job.get("is_remote"), job.get("date_posted"), posting_id),
+        )
+        self.merged += 1
+        return 0
+
+    def _purge(self, now: float):
+        self._last_purge = now
+        deleted = self._conn.execute(
+            "DELETE FROM postings WHERE last_seen < ?", (now - JOB_INDEX_RETENTION,)
+        ).rowcount
+        self._conn.execute("DELETE FROM indexed_queries WHERE indexed_at < ?", (now - JOB_INDEX_RETENTION,))
+        if deleted:
+            logger.info(f"Purged {deleted} job postings not seen for {JOB_INDEX_RETENTION / 86400:g} days")
+
+    async def aadd(self, jobs: List[Dict[str, Any]]) -> int:
+        return await asyncio.to_thread(self.add, jobs)
+
+    def mark_indexed(self, query: Tuple):
+        """Records that every site's postings for ``query`` are in the index as of now."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_queries (key, query, indexed_at) VALUES (?, ?, ?)",
+                (query_key(query), json.dumps(list(query)), time.time()),
+            )
+
+    async def amark_indexed(self, query: Tuple):
+        await asyncio.to_thread(self.mark_indexed, query)
+
+    # --- Reads ---
+
+    def indexed_at(self, query: Tuple) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT indexed_at FROM indexed_queries WHERE key = ?", (query_key(query),)
+            ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _match_expression(search_term: Optional[str], location: Optional[str]) -> Optional[str]:
+        # Every search word must appear (as a prefix) somewhere; location words in the location column
+        terms = [f'"{word}"*' for word in _words(search_term)]
+        terms += [f'location : "{word}"*' for word in _words(location)]
+        return " AND ".join(terms) or None
+
+    def search(self, search_term: Optional[str], location: Optional[str] = None,
+               limit: int = 50, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """(postings, total matches), best text match first, among postings seen within JOB_INDEX_MAX_AGE."""
+        since = time.time() - JOB_INDEX_MAX_AGE
+        columns = "p.id, p.title, p.company, p.location, p.is_remote, p.description, p.job_url, p.urls, p.data, p.first_seen, p.last_seen"
+        if self.fts and (search_term or location) and self._match_expression(search_term, location):
+            match = self._match_expression(search_term, location)
+            base = ("FROM postings_fts JOIN postings p ON p.id = postings_fts.rowid "
+                    "WHERE postings_fts MATCH ? AND p.last_seen >= ?")
+            params = [match, since]
+            # Title matches count most, then company, location and description
+            order = "ORDER BY bm25(postings_fts, 8.0, 3.0, 1.0, 1.0), p.last_seen DESC"
+        else:
+            conditions, params = ["p.last_seen >= ?"], [since]
+            for word in _words(search_term):
+                conditions.append("(p.title LIKE ? OR p.company LIKE ? OR p.description LIKE ?)")
+                params += [f"%{word}%"] * 3
+            for word in _words(location):
+                conditions.append("p.location LIKE ?")
+                params.append(f"%{word}%")
+            base = f"FROM postings p WHERE {' AND '.join(conditions)}"
+            order = "ORDER BY p.last_seen DESC"
+
+        with self._lock:
+            self.searches += 1
+            total = self._conn.execute(f"SELECT COUNT(*) {base}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {columns} {base} {order} LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+
+        postings = []
+        for posting_id, title, company, location_, is_remote, description, job_url, urls, data, first_seen, last_seen in rows:
+            urls = json.loads(urls)
+            postings.append({
+                **json.loads(data),
+                "id": str(posting_id),
+                "title": title,
+                "company": company,
+                "location": location_,
+                "is_remote": bool(is_remote) if is_remote is not None else None,
+                "description": description,
+                "job_url": job_url,
+                "sites": sorted(urls),
+                "urls": urls,
+                "first_seen": first_seen,
+                "last_seen": last_seen,
+            })
+        return postings, total
+
+    async def asearch(self, *args, **kwargs):
+        return await asyncio.to_thread(self.search, *args, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            postings = self._conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+            queries = self._conn.execute("SELECT COUNT(*) FROM indexed_queries").fetchone()[0]
+        return {
+            "postings": postings,
+            "indexed_queries": queries,
+            "added": self.added,
+            "merged_duplicates": self.merged,
+            "searches": self.searches,
+            "fts5": self.fts,
+        }
+
+
+def _build_job_index() -> Optional[JobIndex]:
+    if not JOB_INDEX_ENABLED:
+        return None
+    try:
+        return JobIndex(JOB_INDEX_PATH)
+    except Exception as e:
+        logger.warning(f"Job index unavailable: {e}")
+        return None
+
+
+job_index = _build_job_index()
@@ -0,0 +1,129 @@
+import os
+import re
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# BM25 parameters, and how much a match in the title counts against one in the description
+JOB_RANK_K1 = float(os.getenv("JOB_RANK_K1", "1.2"))
+JOB_RANK_B = float(os.getenv("JOB_RANK_B", "0.75"))
+JOB_RANK_TITLE_WEIGHT = float(os.getenv("JOB_RANK_TITLE_WEIGHT", "3.0"))
+# /jobs/search re-ranks at most this many full-text matches against the resume
+JOB_RANK_CANDIDATES = int(os.getenv("JOB_RANK_CANDIDATES", "500"))
+
+# Weight of a resume term by where it comes from; a term found in several places adds up
+TERM_WEIGHTS = {
+    "job_search_keywords": 3.0,
+    "target_title": 3.0,
+    "skills": 2.0,
+    "experience_titles": 2.0,
+    "technologies": 1.5,
+    "experience_text": 0.3,
+}
+
+# Keeps "c++", "c#", "node.js" and ".net" as single tokens, without a sentence's trailing dot
+_TOKEN = re.compile(r"\.?\w[\w+#]*(?:\.\w[\w+#]*)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or our the to we with you your "
+    "will this that who have has our their they them us".split()
+)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    # Stopwords stay in postings: they never match a query term but count towards the length
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def _query_tokens(text: str) -> List[str]:
+    return [token for token in tokenize(text) if token not in _STOPWORDS]
+
+
+def _texts(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _texts(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _texts(item)
+
+
+def resume_query_terms(resume: Optional[Dict[str, Any]] = None, keywords: Sequence[str] = (),
+                       target_title: Optional[str] = None) -> Dict[str, float]:
+    """
+    Weighted query terms from a parsed resume: its job_search_keywords,
+    skills (names and keywords), experience titles and technologies, and a
+    small weight for the rest of the experience text.
+
+    Accepts the generated document ({"job_search_keywords", "resume": {...}})
+    or just its "resume" part.
+    """
+    resume = resume or {}
+    body = resume.get("resume") if isinstance(resume.get("resume"), dict) else resume
+    sources = {
+        "job_search_keywords": [resume.get("job_search_keywords"), *keywords],
+        "target_title": [target_title],
+        "skills": [[skill.get("name"), skill.get("keywords")] for skill in body.get("skills") or [] if isinstance(skill, dict)],
+        "experience_titles": [job.get("title") for job in body.get("experience") or [] if isinstance(job, dict)],
+        "technologies": [job.get("technologies") for job in body.get("experience") or [] if isinstance(job, dict)],
+        "experience_text": [job.get("description") for job in body.get("experience") or [] if isinstance(job, dict)],
+    }
+    weights: Dict[str, float] = {}
+    for source, values in sources.items():
+        for term in {token for text in _texts(values) for token in _query_tokens(text)}:
+            weights[term] = weights.get(term, 0.0) + TERM_WEIGHTS[source]
+    return weights
+
+
+def _term_frequencies(docs: Sequence[List[str]], vocabulary: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(docs x terms) counts of the vocabulary terms, and every document's length in tokens."""
+    lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+    # Tokens that are not query terms all land in one extra column, dropped below
+    width = len(vocabulary) + 1
+    term_ids = np.fromiter(
+        map(vocabulary.get, chain.from_iterable(docs), repeat(width - 1)), dtype=np.int64, count=int(lengths.sum())
+    )
+    doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+    counts = np.bincount(doc_ids * width + term_ids, minlength=len(docs) * width)
+    return counts.reshape(len(docs), width)[:, :-1].astype(np.float64), lengths.astype(np.float64)
+
+
+def bm25_scores(titles: Sequence[List[str]], bodies: Sequence[List[str]], query: Dict[str, float],
+                k1: float = JOB_RANK_K1, b: float = JOB_RANK_B, title_weight: float = JOB_RANK_TITLE_WEIGHT) -> np.ndarray:
+    """
+    Weighted BM25 of every document against the query terms, in one pass.
+
+    Title tokens count ``title_weight`` times (BM25F-style field weighting);
+    only query terms are counted, so the matrices stay documents x query terms.
+    """
+    if not titles or not query:
+        return np.zeros(len(titles))
+    vocabulary = {term: index for index, term in enumerate(query)}
+    query_weights = np.fromiter(query.values(), dtype=np.float64, count=len(query))
+
+    title_tf, title_len = _term_frequencies(titles, vocabulary)
+    body_tf, body_len = _term_frequencies(bodies, vocabulary)
+    tf = title_weight * title_tf + body_tf
+    lengths = title_weight * title_len + body_len
+
+    n_docs = len(titles)
+    document_frequency = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = lengths.mean() or 1.0
+    norm = k1 * (1.0 - b + b * lengths / average_length)
+    saturated = tf * (k1 + 1.0) / (tf + norm[:, None])
+    return saturated @ (idf * query_weights)
+
+
+def rank_jobs(jobs: List[Dict[str, Any]], query: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Jobs sorted by BM25 score against the resume terms (best first), each with a "score"."""
+    if not jobs:
+        return []
+    titles = [tokenize(job.get("title")) for job in jobs]
+    bodies = [tokenize(f"{job.get('company') or ''} {job.get('description') or ''}") for job in jobs]
+    scores = bm25_scores(titles, bodies, query)
+    # Stable: equal scores keep the scrape / index order
+    order = np.argsort(-scores, kind="stable")
+    return [{**jobs[index], "score": round(float(scores[index]), 4)} for index in order]
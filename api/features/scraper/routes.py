@@ -1,9 +1,19 @@
 import asyncio
-import functools  # Import functools
-from fastapi import APIRouter, HTTPException, Query
+import json
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional, Dict, Any
-from jobspy import scrape_jobs  # Assuming jobspy is installed and importable
+from typing import Any, Dict, List, Optional
+from modules.streaming import STREAMING_HEADERS
+from .ranking import JOB_RANK_CANDIDATES, rank_jobs, resume_query_terms
+from .utils import (
+    SCRAPE_POPULAR_REFRESH_INTERVAL,
+    job_search_cache,
+    normalize_query,
+    search_indexed_jobs,
+    shutdown_scrape_pool,
+)
 
 
 # --- Pydantic Models for Request and Response ---
@@ -18,6 +28,17 @@ class JobSourcingParams(BaseModel):
         default=None,
         description="Country for the job search (e.g., 'USA', 'UK', 'Egypt', 'Türkiye').",
     )
+    resume: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Parsed resume (with job_search_keywords, skills, experience); when given, jobs are sorted by how well they match it.",
+    )
+    keywords: List[str] = Field(
+        default=[], description="Extra keywords to rank jobs by, on top of (or instead of) the resume's."
+    )
+
+    def ranking_terms(self) -> Dict[str, float]:
+        """Weighted resume terms to rank by; empty when neither a resume nor keywords were sent."""
+        return resume_query_terms(self.resume, self.keywords, target_title=self.search_term) if self.resume or self.keywords else {}
 
 
 class ScrapedJob(BaseModel):
@@ -28,49 +49,81 @@ class ScrapedJob(BaseModel):
     company: Optional[str] = None
     location: Optional[str] = None
     is_remote: Optional[bool] = None
+    score: Optional[float] = None  # match against the resume, only when one was sent
     # Add other fields you want to return
     # job_url_direct: Optional[HttpUrl] = None
     # date_posted: Optional[str] = None # Or use datetime if you parse it
     # job_type: Optional[str] = None
 
 
+def to_scraped_job(job_dict: dict) -> ScrapedJob:
+    # Ensure HttpUrl conversion if job_url is present and not None
+    job_url_value = job_dict.get("job_url")
+    return ScrapedJob(
+        id=job_dict.get("id"),
+        site=job_dict.get("site"),
+        job_url=HttpUrl(job_url_value) if job_url_value else None,
+        title=job_dict.get("title"),
+        company=job_dict.get("company"),
+        location=job_dict.get("location"),
+        is_remote=job_dict.get("is_remote"),
+        score=job_dict.get("score"),
+    )
+
+
+class JobSearchParams(JobSourcingParams):
+    limit: int = Field(default=50, ge=1, le=200)
+    offset: int = Field(default=0, ge=0)
+
+
+class IndexedJob(ScrapedJob):
+    sites: List[str] = []
+    first_seen: Optional[float] = None
+    last_seen: Optional[float] = None
+
+
+class JobSearchResponse(BaseModel):
+    jobs: List[IndexedJob]
+    total: int
+    source: str
+    indexed_at: Optional[float] = None
+
+
 # --- APIRouter ---
 router = APIRouter()
 
 
-# --- Helper function to run blocking scrape_jobs in a thread ---
-async def run_scrape_jobs_async(params: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """
-    Runs the synchronous scrape_jobs function in a separate thread
-    to avoid blocking the asyncio event loop.
-    """
-    loop = asyncio.get_event_loop()
-    try:
-        # Use functools.partial to pass keyword arguments to scrape_jobs
-        func_with_kwargs = functools.partial(scrape_jobs, **params)
-        df_jobs = await loop.run_in_executor(None, func_with_kwargs)
-
-        if df_jobs is not None and not df_jobs.empty:
-            return df_jobs.to_dict(orient="records")
-        return []
-    except Exception as e:
-        # Log the exception e
-        print(f"Error during job scraping: {e}")  # Replace with proper logging
-        raise HTTPException(
-            status_code=500, detail=f"An error occurred while scraping jobs: {str(e)}"
-        )
+@asynccontextmanager
+async def lifespan(app):
+    """Entered by the app (modules/features.py) once the scraper feature is loaded."""
+    # Keeps the most requested job searches warm in the scrape cache
+    refresher = None
+    if SCRAPE_POPULAR_REFRESH_INTERVAL > 0 and job_search_cache.backend is not None:
+        refresher = asyncio.create_task(job_search_cache.run_refresher())
+    yield
+    if refresher is not None:
+        refresher.cancel()
+    shutdown_scrape_pool()
 
 
 # --- API Endpoint ---
 @router.post("/scrape-jobs/", response_model=List[ScrapedJob])
 async def get_and_scrape_jobs(
     frontend_params: JobSourcingParams,  # Renamed for clarity
+    response: Response,
 ):
     """
     Asynchronously scrapes job data from specified sites based on input parameters
     sent from the frontend (`search_term`, `location`, `google_search_term`, `country`).
     Other scraping parameters are set with backend defaults.
 
+    Each site is scraped separately; if some fail, the others' jobs are
+    returned and the failed sites are listed in X-Scrape-Failed-Sites.
+
+    Results are cached per normalized (search_term, location, country) and site: fresh
+    entries are returned directly, stale ones are returned while a background
+    scrape refreshes them, and concurrent identical requests share one scrape.
+
     Returns a list of jobs with selected fields:
     - **id**: Unique identifier for the job listing.
     - **site**: The job board site (e.g., 'google', 'linkedin').
@@ -79,61 +132,88 @@ async def get_and_scrape_jobs(
     - **company**: Company name.
     - **location**: Job location.
     - **is_remote**: Boolean indicating if the job is remote.
+    - **score**: How well the job matches `resume` / `keywords`, when sent; jobs are then sorted best match first.
     """
-    # Use backend defaults for parameters not sent by frontend
-    scraping_params = {
-        "site_name": [
-            "google",
-            "indeed",
-            "linkedin",
-        ],  # "zip_recruiter"], # Default sites
-        "search_term": frontend_params.search_term,
-        "location": frontend_params.location,
-        "results_wanted": 20,  # Default results
-        "hours_old": 72,  # Default hours_old (1 week)
-        "country_indeed": (
-            frontend_params.country if frontend_params.country else "USA"
-        ),  # Default for Indeed if country not specified
-        "google_search_term": f"{frontend_params.search_term} jobs near {frontend_params.location} since few days",
-        "country": frontend_params.country,
-        "country_aware": True,  # Default country_aware
-        # Add any other parameters from JobSourcingParams that scrape_jobs accepts
-    }
-    # Filter out None values because scrape_jobs might not expect them for all args
-    # or might have its own internal defaults for None.
-    # It's generally safer to only pass arguments that have actual values.
-    final_scraping_params = {k: v for k, v in scraping_params.items() if v is not None}
-
-    scraped_data = await run_scrape_jobs_async(final_scraping_params)
-
-    processed_jobs: List[ScrapedJob] = []
-    for job_dict in scraped_data:
-        # Ensure HttpUrl conversion if job_url is present and not None
-        job_url_value = job_dict.get("job_url")
-
-        processed_jobs.append(
-            ScrapedJob(
-                id=job_dict.get("id"),
-                site=job_dict.get("site"),
-                job_url=HttpUrl(job_url_value) if job_url_value else None,
-                title=job_dict.get("title"),
-                company=job_dict.get("company"),
-                location=job_dict.get("location"),
-                is_remote=job_dict.get("is_remote"),
-                verbose=True,  # suming verbose is a field in the job_dict
-            )
-        )
+    # Served from the scrape cache when possible; X-Cache tells which path answered
+    query = normalize_query(frontend_params.search_term, frontend_params.location, frontend_params.country)
+    scraped_data, cache_status, errors = await job_search_cache.get_jobs(query)
+    response.headers["X-Cache"] = cache_status
+
+    if errors:
+        # Partial results: the sites that failed are named, the others are returned
+        response.headers["X-Scrape-Failed-Sites"] = ",".join(errors)
+
+    ranking_terms = frontend_params.ranking_terms()
+    if ranking_terms:
+        scraped_data = await asyncio.to_thread(rank_jobs, scraped_data, ranking_terms)
 
-    if not processed_jobs and not scraped_data:  # Check if scraped_data was also empty
-        # You might want to return an empty list or a specific message
-        # If no jobs are found, it's often better to return an empty list (HTTP 200)
-        # than a 404, unless the query itself was invalid.
-        # raise HTTPException(status_code=404, detail="No jobs found matching your criteria.")
-        pass
+    processed_jobs: List[ScrapedJob] = [to_scraped_job(job_dict) for job_dict in scraped_data]
 
+    # If no jobs are found, an empty list (HTTP 200) is returned rather than a 404
     return processed_jobs
 
 
+@router.post("/scrape-jobs/stream")
+async def stream_scraped_jobs(frontend_params: JobSourcingParams):
+    """
+    Same search as /scrape-jobs/, streamed as NDJSON: one line per site as
+    soon as that site is done, so a slow site does not hold back the others.
+
+    Lines are {"site", "cache", "jobs": [ScrapedJob, ...]} or {"site", "error"},
+    followed by {"done": true, "total": <number of jobs>}. With a resume,
+    each site's jobs are sorted by score (scores are relative to that site's batch).
+    """
+    query = normalize_query(frontend_params.search_term, frontend_params.location, frontend_params.country)
+    ranking_terms = frontend_params.ranking_terms()
+
+    async def ndjson_stream():
+        total = 0
+        async for result in job_search_cache.iter_sites(query):
+            if "jobs" in result:
+                site_jobs = await asyncio.to_thread(rank_jobs, result["jobs"], ranking_terms) if ranking_terms else result["jobs"]
+                jobs = [to_scraped_job(job_dict).model_dump(mode="json") for job_dict in site_jobs]
+                result = {**result, "jobs": jobs}
+                total += len(jobs)
+            yield json.dumps(result) + "\n"
+        yield json.dumps({"done": True, "total": total}) + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", headers=STREAMING_HEADERS)
+
+
+@router.post("/jobs/search", response_model=JobSearchResponse)
+async def search_jobs(params: JobSearchParams):
+    """
+    Searches the local job index (postings from every past scrape, merged
+    across sites) instead of scraping. The index is full-text searched on
+    `search_term` and filtered on `location`; jobspy is only called when the
+    index has never seen this query, or in the background once it is stale.
+
+    `source` is "index", "stale" (answered from the index, refresh started)
+    or "scrape" (the query was scraped and indexed first).
+
+    With `resume` / `keywords`, the best JOB_RANK_CANDIDATES full-text matches
+    are re-ranked against the resume and paged in that order.
+    """
+    query = normalize_query(params.search_term, params.location, params.country)
+    ranking_terms = params.ranking_terms()
+    if ranking_terms:
+        result = await search_indexed_jobs(query, limit=JOB_RANK_CANDIDATES, offset=0)
+        ranked = await asyncio.to_thread(rank_jobs, result["jobs"], ranking_terms)
+        result = {**result, "jobs": ranked[params.offset:params.offset + params.limit]}
+    else:
+        result = await search_indexed_jobs(query, limit=params.limit, offset=params.offset)
+    jobs = [
+        IndexedJob(
+            **to_scraped_job(job_dict).model_dump(),
+            sites=job_dict.get("sites") or ([job_dict["site"]] if job_dict.get("site") else []),
+            first_seen=job_dict.get("first_seen"),
+            last_seen=job_dict.get("last_seen"),
+        )
+        for job_dict in result["jobs"]
+    ]
+    return JobSearchResponse(jobs=jobs, total=result["total"], source=result["source"], indexed_at=result["indexed_at"])
+
+
 # Example of how to include this router in your main FastAPI app:
 # from fastapi import FastAPI
 # from api.features.scraper.routes import router as scraper_router # Adjust import path as needed
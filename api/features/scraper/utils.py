@@ -0,0 +1,403 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from modules.cache import MemoryLRUCache, SQLiteCache, TieredCache
+from modules.singleflight import SingleFlight
+from .job_index import JOB_INDEX_STALE_AFTER, job_index
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_SITES = [site.strip() for site in os.getenv("SCRAPE_SITES", "google,indeed,linkedin").split(",") if site.strip()]
+SCRAPE_RESULTS_WANTED = int(os.getenv("SCRAPE_RESULTS_WANTED", "20"))
+SCRAPE_HOURS_OLD = int(os.getenv("SCRAPE_HOURS_OLD", "72"))
+# Dedicated threads for the blocking jobspy calls (one site per call) and the per-site time limit
+SCRAPE_THREAD_POOL_SIZE = int(os.getenv("SCRAPE_THREAD_POOL_SIZE", "6"))
+SCRAPE_SITE_TIMEOUT = float(os.getenv("SCRAPE_SITE_TIMEOUT", "45"))
+
+# Results younger than SCRAPE_CACHE_TTL are served as is; older ones, up to
+# SCRAPE_CACHE_STALE_TTL, are served while a background scrape refreshes them
+SCRAPE_CACHE_ENABLED = os.getenv("SCRAPE_CACHE_ENABLED", "1") == "1"
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "1800"))
+SCRAPE_CACHE_STALE_TTL = float(os.getenv("SCRAPE_CACHE_STALE_TTL", str(24 * 3600)))
+SCRAPE_CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_MEMORY_MAX_ENTRIES", "256"))
+SCRAPE_CACHE_MEMORY_MAX_BYTES = int(os.getenv("SCRAPE_CACHE_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+# Empty path disables the disk tier
+SCRAPE_CACHE_SQLITE_PATH = os.getenv("SCRAPE_CACHE_SQLITE_PATH", "cache/scrape_cache.sqlite3")
+SCRAPE_CACHE_SQLITE_MAX_BYTES = int(os.getenv("SCRAPE_CACHE_SQLITE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Scheduled refresh of the most requested queries (0 disables it)
+SCRAPE_POPULAR_REFRESH_INTERVAL = float(os.getenv("SCRAPE_POPULAR_REFRESH_INTERVAL", "900"))
+SCRAPE_POPULAR_TOP_N = int(os.getenv("SCRAPE_POPULAR_TOP_N", "10"))
+SCRAPE_POPULAR_MIN_REQUESTS = int(os.getenv("SCRAPE_POPULAR_MIN_REQUESTS", "3"))
+SCRAPE_POPULAR_WINDOW = float(os.getenv("SCRAPE_POPULAR_WINDOW", str(24 * 3600)))
+SCRAPE_POPULAR_MAX_TRACKED = 1000
+
+
+def normalize_query(search_term: Optional[str], location: Optional[str], country: Optional[str]) -> Tuple:
+    """Case- and whitespace-insensitive (search_term, location, country); empty parts become None."""
+    def clean(value):
+        value = " ".join((value or "").split()).casefold()
+        return value or None
+
+    return clean(search_term), clean(location), clean(country)
+
+
+def build_scraping_params(query: Tuple, site: str) -> Dict[str, Any]:
+    search_term, location, country = query
+    # Use backend defaults for parameters not sent by frontend
+    scraping_params = {
+        "site_name": [site],
+        "search_term": search_term,
+        "location": location,
+        "results_wanted": SCRAPE_RESULTS_WANTED,
+        "hours_old": SCRAPE_HOURS_OLD,
+        "country_indeed": country if country else "USA",  # Default for Indeed if country not specified
+        "google_search_term": f"{search_term} jobs near {location} since few days",
+        "country": country,
+        "country_aware": True,
+    }
+    # Only pass arguments that have actual values; scrape_jobs has its own defaults
+    return {k: v for k, v in scraping_params.items() if v is not None}
+
+
+def scrape_jobs(**params):
+    # jobspy pulls in pandas and its scraping stack (~0.6s); only a scrape needs it
+    from jobspy import scrape_jobs as jobspy_scrape_jobs
+
+    return jobspy_scrape_jobs(**params)
+
+
+def _records(df_jobs) -> List[Dict[str, Any]]:
+    if df_jobs is None or df_jobs.empty:
+        return []
+    # Through JSON so NaN becomes None and dates become ISO strings, as they are cached
+    return json.loads(df_jobs.to_json(orient="records", date_format="iso"))
+
+
+class SiteScrapeError(Exception):
+    """Scraping one site failed or exceeded SCRAPE_SITE_TIMEOUT."""
+
+    def __init__(self, site: str, detail: str):
+        super().__init__(f"{site}: {detail}")
+        self.site = site
+        self.detail = detail
+
+
+_scrape_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_scrape_pool() -> ThreadPoolExecutor:
+    global _scrape_pool
+    if _scrape_pool is None:
+        _scrape_pool = ThreadPoolExecutor(max_workers=SCRAPE_THREAD_POOL_SIZE, thread_name_prefix="scrape")
+    return _scrape_pool
+
+
+def shutdown_scrape_pool():
+    """Drops queued scrapes; running ones finish in their threads. Called on application shutdown."""
+    global _scrape_pool
+    if _scrape_pool is not None:
+        _scrape_pool.shutdown(wait=False, cancel_futures=True)
+        _scrape_pool = None
+
+
+async def run_scrape_jobs_async(params: Dict[str, Any], site: str) -> List[Dict[str, Any]]:
+    """
+    Scrapes one site on the dedicated scrape thread pool, so the blocking
+    jobspy call never runs on the event loop or in the default executor.
+    A failed scrape raises SiteScrapeError.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        df_jobs = await loop.run_in_executor(_get_scrape_pool(), functools.partial(scrape_jobs, **params))
+        return _records(df_jobs)
+    except Exception as e:
+        logger.error(f"Error during job scraping on {site}: {e}")
+        raise SiteScrapeError(site, str(e)) from e
+
+
+class JobSearchCache:
+    """
+    Scrape results per normalized query and site, served stale-while-revalidate.
+
+    Every site is scraped as its own task, so a slow site never holds back
+    the others. Concurrent requests for the same query and site share one
+    scrape, stale entries trigger a single background refresh, and the most
+    requested queries are re-scraped on a schedule so they are rarely stale.
+    """
+
+    def __init__(self, backend: Optional[TieredCache], ttl: float = SCRAPE_CACHE_TTL, sites: Optional[List[str]] = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.sites = list(sites or SCRAPE_SITES)
+        self.flights = SingleFlight("scrape")
+        self._popular: Dict[Tuple, dict] = {}
+        self.fresh = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.scheduled_refreshes = 0
+        self.site_failures = {}
+
+    @staticmethod
+    def key(query: Tuple, site: str) -> str:
+        payload = json.dumps({"site": site, "query": query})
+        return "jobs:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def _scrape(self, query: Tuple, site: str) -> List[Dict[str, Any]]:
+        try:
+            jobs = await run_scrape_jobs_async(build_scraping_params(query, site), site)
+        except SiteScrapeError:
+            self.site_failures[site] = self.site_failures.get(site, 0) + 1
+            raise
+        if self.backend is not None:
+            await self.backend.aset(self.key(query, site), {"jobs": jobs, "scraped_at": time.time()})
+        await _index_jobs(jobs)
+        return jobs
+
+    async def _refresh(self, query: Tuple, site: str):
+        self.refreshes += 1
+        try:
+            await self._scrape(query, site)
+        except Exception:
+            self.refresh_failures += 1
+            raise
+
+    def _track(self, query: Tuple):
+        now = time.time()
+        entry = self._popular.get(query)
+        if entry is None or now - entry["since"] > SCRAPE_POPULAR_WINDOW:
+            entry = self._popular[query] = {"since": now, "requests": 0}
+        entry["requests"] += 1
+        entry["last_seen"] = now
+        if len(self._popular) > SCRAPE_POPULAR_MAX_TRACKED:
+            # Forget the queries nobody asked for the longest
+            for old in sorted(self._popular, key=lambda q: self._popular[q]["last_seen"])[: len(self._popular) // 10]:
+                del self._popular[old]
+
+    async def get_site_jobs(self, query: Tuple, site: str) -> Tuple[List[Dict[str, Any]], str]:
+        """Returns (jobs, "fresh" | "stale" | "miss") for one site; raises SiteScrapeError on a failed miss."""
+        key = self.key(query, site)
+        entry = await self.backend.aget(key) if self.backend is not None else None
+        if entry is not None:
+            if time.time() - entry["scraped_at"] < self.ttl:
+                self.fresh += 1
+                return entry["jobs"], "fresh"
+            self.stale += 1
+            self.flights.start(key, lambda: self._refresh(query, site))
+            return entry["jobs"], "stale"
+
+        self.misses += 1
+        # The time limit applies to this request only. The detached scrape keeps its
+        # single-flight entry until the thread finishes, so a late result still fills
+        # the cache and later requests wait for it instead of starting another thread.
+        try:
+            jobs = await asyncio.wait_for(
+                self.flights.do(key, lambda: self._scrape(query, site), detach=True), timeout=SCRAPE_SITE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            self.site_failures[site] = self.site_failures.get(site, 0) + 1
+            logger.warning(f"Scraping {site} timed out after {SCRAPE_SITE_TIMEOUT:g}s; it keeps running for the cache")
+            raise SiteScrapeError(site, f"timed out after {SCRAPE_SITE_TIMEOUT:g}s") from None
+        return jobs, "miss"
+
+    async def iter_sites(self, query: Tuple) -> AsyncIterator[dict]:
+        """
+        Yields one result per site as soon as that site is done:
+        {"site", "cache", "jobs"} or {"site", "error"}.
+        """
+        self._track(query)
+
+        async def one(site):
+            try:
+                jobs, status = await self.get_site_jobs(query, site)
+                return {"site": site, "cache": status, "jobs": jobs}
+            except SiteScrapeError as e:
+                return {"site": site, "error": e.detail}
+
+        tasks = [asyncio.ensure_future(one(site)) for site in self.sites]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client went away: stop waiting (the scrapes themselves run on)
+            for task in tasks:
+                task.cancel()
+
+    async def site_results(self, query: Tuple) -> Dict[str, dict]:
+        """Every site's result from iter_sites, by site. Raises HTTPException when every site failed."""
+        results = {result["site"]: result async for result in self.iter_sites(query)}
+        errors = {site: result["error"] for site, result in results.items() if "error" in result}
+        if errors and len(errors) == len(self.sites):
+            raise HTTPException(
+                status_code=500,
+                detail=f"An error occurred while scraping jobs: {'; '.join(f'{s}: {e}' for s, e in errors.items())}",
+            )
+        return results
+
+    async def get_jobs(self, query: Tuple) -> Tuple[List[Dict[str, Any]], str, Dict[str, str]]:
+        """
+        All sites' jobs in site order, the overall cache status ("miss" if
+        any site was scraped or failed, else "stale" if any was stale, else
+        "fresh") and the error per failed site. Raises HTTPException when every site failed.
+        """
+        results = await self.site_results(query)
+        errors = {site: result["error"] for site, result in results.items() if "error" in result}
+        # A failed site was a miss too: the answer is not what the cache would have given
+        statuses = {result.get("cache", "miss") for result in results.values()}
+        status = next(s for s in ("miss", "stale", "fresh") if s in statuses)
+        jobs = [job for site in self.sites if "jobs" in results[site] for job in results[site]["jobs"]]
+        return jobs, status, errors
+
+    def popular_queries(self) -> List[Tuple]:
+        cutoff = time.time() - SCRAPE_POPULAR_WINDOW
+        ranked = sorted(
+            (query for query, entry in self._popular.items()
+             if entry["last_seen"] >= cutoff and entry["requests"] >= SCRAPE_POPULAR_MIN_REQUESTS),
+            key=lambda query: self._popular[query]["requests"],
+            reverse=True,
+        )
+        return ranked[:SCRAPE_POPULAR_TOP_N]
+
+    async def refresh_popular(self):
+        """Re-scrapes the popular queries whose entries are close to going stale, one query at a time."""
+        if self.backend is None:
+            return
+        for query in self.popular_queries():
+            due = []
+            for site in self.sites:
+                key = self.key(query, site)
+                entry = await self.backend.aget(key)
+                if entry is None or time.time() - entry["scraped_at"] >= self.ttl - SCRAPE_POPULAR_REFRESH_INTERVAL:
+                    due.append(site)
+            if not due:
+                continue
+            self.scheduled_refreshes += 1
+            results = await asyncio.gather(
+                *(self.flights.do(self.key(query, site), lambda site=site: self._refresh(query, site), detach=True)
+                  for site in due),
+                return_exceptions=True,
+            )
+            for site, result in zip(due, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Scheduled refresh of {query} on {site} failed: {result}")
+
+    async def run_refresher(self, interval: float = SCRAPE_POPULAR_REFRESH_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_popular()
+            except Exception:
+                logger.exception("Popular query refresh failed")
+
+    def stats(self) -> dict:
+        return {
+            "fresh": self.fresh,
+            "stale": self.stale,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "scheduled_refreshes": self.scheduled_refreshes,
+            "site_failures": dict(self.site_failures),
+            "tracked_queries": len(self._popular),
+            "popular": [list(query) for query in self.popular_queries()],
+            "singleflight": self.flights.stats(),
+            "backend": self.backend.stats() if self.backend is not None else None,
+        }
+
+
+async def _index_jobs(jobs: List[Dict[str, Any]]):
+    # Every scrape lands in the job index; a failing index never fails the scrape
+    if job_index is None:
+        return
+    try:
+        await job_index.aadd(jobs)
+    except Exception as e:
+        logger.warning(f"Could not index {len(jobs)} scraped jobs: {e}")
+
+
+_index_flights = SingleFlight("job_index")
+
+
+async def _reindex(query: Tuple):
+    results = await job_search_cache.site_results(query)
+    # Scraped sites were indexed by JobSearchCache._scrape; cached results may predate the index
+    cached = [job for result in results.values() if result.get("cache") in ("fresh", "stale") for job in result["jobs"]]
+    if cached:
+        await _index_jobs(cached)
+    errors = sorted(site for site, result in results.items() if "error" in result)
+    if errors:
+        # Not served as "index" until every site made it in; the next search retries the failed ones
+        logger.info(f"Not marking {query} as indexed, failed sites: {errors}")
+        return
+    try:
+        await job_index.amark_indexed(query)
+    except Exception as e:
+        logger.warning(f"Could not mark {query} as indexed: {e}")
+
+
+async def search_indexed_jobs(query: Tuple, limit: int = 50, offset: int = 0) -> dict:
+    """
+    Answers a job search from the local index. Only a query that was never
+    indexed waits for a scrape; one indexed longer than JOB_INDEX_STALE_AFTER
+    ago is answered from the index while a background scrape refreshes it.
+
+    Returns {"jobs", "total", "source": "index" | "stale" | "scrape", "indexed_at"}.
+    """
+    search_term, location, _ = query
+    if job_index is None:
+        jobs, _, _ = await job_search_cache.get_jobs(query)
+        return {"jobs": jobs[offset:offset + limit], "total": len(jobs), "source": "scrape", "indexed_at": None}
+
+    indexed_at = await asyncio.to_thread(job_index.indexed_at, query)
+    if indexed_at is None:
+        await _index_flights.do(json.dumps(list(query)), lambda: _reindex(query), detach=True)
+        source = "scrape"
+    elif time.time() - indexed_at > JOB_INDEX_STALE_AFTER:
+        _index_flights.start(json.dumps(list(query)), lambda: _reindex(query))
+        source = "stale"
+    else:
+        source = "index"
+
+    jobs, total = await job_index.asearch(search_term, location, limit=limit, offset=offset)
+    return {
+        "jobs": jobs,
+        "total": total,
+        "source": source,
+        "indexed_at": indexed_at if source != "scrape" else await asyncio.to_thread(job_index.indexed_at, query),
+    }
+
+
+def _build_scrape_cache() -> JobSearchCache:
+    if not SCRAPE_CACHE_ENABLED:
+        return JobSearchCache(None)
+    disk_tier = None
+    if SCRAPE_CACHE_SQLITE_PATH:
+        try:
+            disk_tier = SQLiteCache(
+                SCRAPE_CACHE_SQLITE_PATH,
+                max_bytes=SCRAPE_CACHE_SQLITE_MAX_BYTES,
+                ttl=SCRAPE_CACHE_STALE_TTL,
+                table="scrape_results",
+            )
+        except Exception as e:
+            logger.warning(f"Scrape cache disk tier unavailable, using memory only: {e}")
+    memory_tier = MemoryLRUCache(
+        max_entries=SCRAPE_CACHE_MEMORY_MAX_ENTRIES,
+        max_bytes=SCRAPE_CACHE_MEMORY_MAX_BYTES,
+        ttl=SCRAPE_CACHE_STALE_TTL,
+    )
+    return JobSearchCache(TieredCache(memory_tier, disk_tier))
+
+
+job_search_cache = _build_scrape_cache()
@@ -1,12 +1,39 @@
-# Import chain_instance from the resumes chains module
-import sys
+from modules.chain_registry import chain_registry
+from modules.utils import is_valid_yaml
 import os
-from .prompts import create_resume_website_bloks_prompt
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from .prompts import (
+    create_resume_website_bloks_prompt,
+    edit_website_block_prompt,
+    website_plan_prompt,
+    website_section_prompt,
+)
 
-from resumes.chains import chain_instance
+# Models for the section-parallel pipeline: the plan sets the design, the
+# sections are smaller calls that run concurrently
+WEBSITE_PLAN_MODEL = os.getenv("WEBSITE_PLAN_MODEL", "gemini-2.5-pro")
+WEBSITE_SECTION_MODEL = os.getenv("WEBSITE_SECTION_MODEL", "gemini-2.5-flash")
 
 
-create_resume_website_bloks_chain = chain_instance.build_chain(
-    create_resume_website_bloks_prompt, model="gemini-2.5-pro"
-)
\ No newline at end of file
+# Always fresh: a regeneration is expected to produce a new design
+create_resume_website_bloks_chain = chain_registry.register(
+    "websites.create_bloks", create_resume_website_bloks_prompt,
+    inputs=("resume_yaml", "preferences"), model="gemini-2.5-pro", cache=False, latency_budget=45,
+)
+website_plan_chain = chain_registry.register(
+    "websites.plan", website_plan_prompt,
+    inputs=("resume_yaml", "preferences"), model=WEBSITE_PLAN_MODEL, cache=False, latency_budget=30,
+)
+# A retried section must be a fresh generation, so no caching here either
+website_section_chain = chain_registry.register(
+    "websites.section", website_section_prompt,
+    inputs=(
+        "resume_yaml", "preferences", "global_css", "global_js", "section_names",
+        "section_name", "section_description", "section_brief",
+    ),
+    model=WEBSITE_SECTION_MODEL, cache=False, latency_budget=20,
+)
+edit_website_block_chain = chain_registry.register(
+    "websites.edit_block", edit_website_block_prompt,
+    inputs=("current_name", "current_html", "current_css", "current_js", "prompt", "artifacts"),
+    model="gemini-2.5-flash", cache_validator=is_valid_yaml, latency_budget=8,
+)
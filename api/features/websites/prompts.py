@@ -230,6 +230,130 @@ create_resume_website_bloks_prompt = PromptTemplate.from_template(
 )
 
 
+# --- Section-parallel pipeline: a design plan first, then every section concurrently ---
+
+website_plan_template = """You are a professional designer and frontend developer planning a personal portfolio website for a client based on their resume and preferences. Other developers will build each section in parallel from your plan, so the plan must define the whole visual identity.
+
+the resume information is provided below you may summarize or omit some information if it verbose, to make it more visually appealing and creative:
+{resume_yaml}
+
+the client preferences are provided below:
+```
+{preferences}
+```
+
+**REQUIRED Output Format:**
+```
+===HTML===
+<head>
+<!-- BEGIN head -->
+  <!-- meta, title, emoji favicon, fonts -->
+<!-- END head -->
+</head>
+
+<body>
+<!-- BEGIN global -->
+<!-- DESCRIPTION: Global settings, theme toggle, custom cursor, interactive background, loading overlay -->
+<div id="loading-overlay"></div>
+<div id="custom-cursor"></div>
+<button id="theme-toggle" aria-label="Toggle Theme"></button>
+<!-- END global -->
+</body>
+
+===CSS===
+/* BEGIN global */
+/* CSS variables for colors, spacing and typography in light and dark themes (html[data-theme='dark']), base styles, .container, .animate-on-scroll / .is-visible, custom cursor, theme toggle (position: fixed), loading overlay */
+/* END global */
+===JS===
+// BEGIN global
+// loading overlay, theme toggle, custom cursor, interactive background and the single global IntersectionObserver for .animate-on-scroll
+// END global
+===PLAN===
+- name: header_and_navigation
+  description: "<short user-facing description, max 100 characters>"
+  brief: "<content and layout of the section, which global classes and variables it uses>"
+- name: hero
+  description: "..."
+  brief: "..."
+```
+
+STRICT OUTPUT INSTRUCTIONS
+**CREATIVE MANDATE**: Plan a unique, modern and visually memorable website with bold typography and a strong visual identity, following the client's preferences.
+Plan a maximum of 8 sections plus a header_and_navigation section first and a footer section last. Section names are lowercase identifiers with underscores.
+The global CSS must define every shared design token (colors for both themes, fonts, spacing, radii, shadows) as CSS variables so independently built sections look consistent.
+The global JS must check `document.body.dataset.renderContext`: in 'editor' remove the loading overlay immediately and add `.is-visible` to every `.animate-on-scroll` element; in 'live' keep the overlay for at least 1.5 seconds and until the page has loaded, and use one IntersectionObserver for the scroll animations.
+The custom cursor must use `mix-blend-mode: difference;` with a solid color like white so it is visible in both themes.
+Do NOT wrap JavaScript in `DOMContentLoaded` or `window.onload`. Wrap scripts in try-catch. No eval(), document.write(), redirects, infinite loops or uncleared timers.
+Do not use file or image paths, base64 images or verbose SVGs.
+Each brief must be one or two sentences. The PLAN must be valid YAML with double-quoted strings.
+No explanations, apologies, or extra text before or after the output.
+===HTML===, ===CSS===, ===JS=== and ===PLAN=== must each appear exactly once and in this order.
+personal portfolio website plan output"""
+
+website_plan_prompt = PromptTemplate.from_template(website_plan_template)
+
+
+website_section_template = """You are a professional designer and frontend developer building ONE section of a personal portfolio website. The global code and the design plan are already written; your section must use the global CSS variables and classes so it matches the rest of the site.
+
+the resume information is provided below:
+{resume_yaml}
+
+the client preferences are provided below:
+```
+{preferences}
+```
+
+The global CSS (already on the page, do not repeat it):
+```css
+{global_css}
+```
+
+The global JS (already on the page, do not repeat it):
+```javascript
+{global_js}
+```
+
+All sections of the site, in order (use their names as element ids for navigation links):
+{section_names}
+
+Build this section:
+name: {section_name}
+description: {section_description}
+brief: {section_brief}
+
+**REQUIRED Output Format:**
+```
+===HTML===
+<!-- BEGIN SECTION: {section_name} -->
+<!-- DESCRIPTION: {section_description} -->
+<section id="{section_name}">
+  <!-- section content -->
+</section>
+<!-- END SECTION: {section_name} -->
+===CSS===
+/* BEGIN SECTION: {section_name} */
+/* styles for this section only */
+/* END SECTION: {section_name} */
+===JS===
+// BEGIN SECTION: {section_name}
+// scripts for this section only
+// END SECTION: {section_name}
+```
+
+STRICT OUTPUT INSTRUCTIONS
+Output only this one section. The header_and_navigation section uses a <header> element and the footer section a <footer> element instead of <section>.
+The section must work when rendered alone with the global code in an isolated editor iframe, and as part of the full page.
+Scope every CSS selector to #{section_name}. Do not define new global variables or styles.
+Section JS must only contain logic unique to this section (e.g. an accordion, a carousel, a typing animation). Do NOT add scroll animations or IntersectionObservers; add the `.animate-on-scroll` class to elements instead.
+Do NOT wrap JavaScript in `DOMContentLoaded` or `window.onload`. Wrap scripts in try-catch. No eval(), document.write(), redirects, infinite loops or uncleared timers.
+The section must be fully responsive, readable in both light and dark themes, and complete: no placeholders or empty content.
+Do not use file or image paths, base64 images or verbose SVGs. Do not include contact forms or anything requiring a backend.
+No explanations, apologies, or extra text before or after the output.
+section output"""
+
+website_section_prompt = PromptTemplate.from_template(website_section_template)
+
+
 edit_resume_website_block_template = """ You are a professional designer and frontend developer tasked with editing a specific section of a personal portfolio website based on a client prompt.
 You must output just the updated yaml file with the html, css and js code for the personal portfolio website. Do not output anything else. no comments or explanations.
 Do not add any comments in the code. do not use unnecessary tokens in the code.
@@ -1,22 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, Header ,BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Header
 from pydantic import BaseModel
 from typing import Dict
 from .utils import (
     verify_website_edit,
     verify_website_generation,
-    generate_website_and_update_django,
 )
-from .chains import chain_instance
-from .prompts import (
-    edit_website_block_prompt
+from .chains import edit_website_block_chain
+from modules.http_client import get_django_client
+from modules.utils import asafe_load_yaml_with_logging
+from modules.job_queue import job_queue
 
-)
-
-import yaml
 import textwrap
+import logging
 import os
 import httpx
 
+logger = logging.getLogger(__name__)
+
 
 router = APIRouter()
 
@@ -52,9 +52,8 @@ async def edit_website_section(
         dict: The updated section data
     """
     try:
-        # Create prompt and call chain
-        chain = chain_instance.build_chain(edit_website_block_prompt, model="gemini-2.5-flash")
-        result = await chain.ainvoke(
+        # Call the prebuilt chain
+        result = await edit_website_block_chain.ainvoke(
             {
                "current_name": request.block_name,
                 "current_html": textwrap.indent(request.current_html, "  "),
@@ -66,8 +65,10 @@ async def edit_website_section(
 
         )
         # Parse result
-        section_data = yaml.safe_load(result)
+        section_data = await asafe_load_yaml_with_logging(result)
         return section_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to edit section: {str(e)}"
@@ -81,31 +82,26 @@ async def edit_website_section(
 @router.post("/create_resume_website/")
 async def create_resume_website(
     request: CreateResumeWebsiteRequest,
-        background_tasks: BackgroundTasks,
-
     auth_data: dict = Depends(verify_website_generation),
-
+    client: httpx.AsyncClient = Depends(get_django_client),
 ):
     """
     Creates a resume website using the provided details.
     """
     generation_task_id = None
-    create_task_url = f"{os.environ.get('DJANGO_API_URL', 'http://django:8000')}/api/create-task/"
-    async with httpx.AsyncClient() as client:
-        response = await client.post(create_task_url)
-        response.raise_for_status()
-        generation_task_id = response.json()["task_id"]
-
-    # --- 2. Add Background Task ---
-    background_tasks.add_task(
-        generate_website_and_update_django,
-        task_id=generation_task_id,
-        resume_id=request.resumeId,
-        preferences=request.preferences,
-        user_id=auth_data["user_id"],
-        resume_yaml=request.resume
-    )
-    print(f"Enqueued background website generation for task {generation_task_id}.")
+    response = await client.post("/api/create-task/")
+    response.raise_for_status()
+    generation_task_id = response.json()["task_id"]
+
+    # --- 2. Enqueue the generation job ---
+    await job_queue.aenqueue("website_generation", {
+        "task_id": generation_task_id,
+        "resume_id": request.resumeId,
+        "preferences": request.preferences,
+        "user_id": auth_data["user_id"],
+        "resume_yaml": request.resume,
+    })
+    logger.info(f"Enqueued website generation job for task {generation_task_id}.")
 
     # --- 3. Return Immediate Response ---
     return {
@@ -1,10 +1,14 @@
-from modules.utils import create_auth_dependency
-from .chains import create_resume_website_bloks_chain
+from modules.utils import create_auth_dependency, report_task_failure
+from modules.job_queue import job_handler
+from modules.http_client import get_django_client
+from modules.utils import safe_load_yaml_with_logging
+from modules.metrics import stage
+from .chains import create_resume_website_bloks_chain, website_plan_chain, website_section_chain
 from fastapi import HTTPException, Header
 from typing import Optional
-import httpx
 import os
 import re
+import bisect
 import logging
 import asyncio
 
@@ -12,152 +16,321 @@ import asyncio
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Django service URL
-DJANGO_API_URL = os.getenv("DJANGO_API_URL", "http://django:8000")
+# "sections": design plan first, then every section concurrently; "single": one call for the whole site
+WEBSITE_PIPELINE = os.getenv("WEBSITE_PIPELINE", "sections")
+WEBSITE_PLAN_MAX_ATTEMPTS = int(os.getenv("WEBSITE_PLAN_MAX_ATTEMPTS", "2"))
+WEBSITE_SECTION_MAX_ATTEMPTS = int(os.getenv("WEBSITE_SECTION_MAX_ATTEMPTS", "3"))
+WEBSITE_SECTION_CONCURRENCY = int(os.getenv("WEBSITE_SECTION_CONCURRENCY", "8"))
+WEBSITE_MAX_SECTIONS = 12
 
 
 
+# Every BEGIN/END marker of a document is found by one finditer pass; blocks are
+# then sliced out by position instead of re-searching the document per section
+_HTML_MARKER = re.compile(r"<!--\s*(BEGIN|END) (?:SECTION:\s*([\w_]+)|global)\s*-->")
+_CSS_MARKER = re.compile(r"/\*\s*(BEGIN|END) (?:SECTION:\s*([\w_]+)|global)\s*\*/")
+# JS markers are matched by name prefix ("// BEGIN SECTION: hero" also opens
+# "hero_banner"), as the generated sites have always been parsed
+_JS_MARKER = re.compile(r"//\s*(BEGIN|END) (?:SECTION:\s*(\w*)|global)")
+_DESCRIPTION = re.compile(r"<!--\s*DESCRIPTION:\s*(.*?)\s*-->", re.DOTALL)
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _MarkerIndex:
+    """Positions of the BEGIN/END markers in one document, in document order."""
+
+    def __init__(self, pattern, text, prefix_names=False):
+        self.prefix_names = prefix_names
+        self.markers = []  # (kind, name, match); name is None for the global block
+        self.begins = {}
+        for match in pattern.finditer(text):
+            kind, name = match.group(1), match.group(2)
+            self.markers.append((kind, name, match))
+            if kind == "BEGIN":
+                self.begins.setdefault(name, match)
+        self._ends = {}
+
+    def _names_match(self, marker_name, name):
+        if name is None or marker_name is None:
+            return marker_name is name
+        return marker_name.startswith(name) if self.prefix_names else marker_name == name
+
+    def first_begin(self, name):
+        if not self.prefix_names or name is None:
+            return self.begins.get(name)
+        return next(
+            (match for kind, marker_name, match in self.markers
+             if kind == "BEGIN" and self._names_match(marker_name, name)),
+            None,
+        )
+
+    def ends(self, name):
+        """Start offsets and matches of the END markers for ``name``."""
+        if name not in self._ends:
+            matches = [
+                match for kind, marker_name, match in self.markers
+                if kind == "END" and self._names_match(marker_name, name)
+            ]
+            self._ends[name] = ([match.start() for match in matches], matches)
+        return self._ends[name]
+
+    def first_end(self, name, start):
+        starts, matches = self.ends(name)
+        index = bisect.bisect_left(starts, start)
+        return matches[index] if index < len(matches) else None
+
+    def block(self, text, name):
+        """Stripped text between the first BEGIN marker for ``name`` and the next END."""
+        begin = self.first_begin(name)
+        if begin is None:
+            return ""
+        content_start = begin.end()
+        if self.prefix_names and name is not None:
+            # The rest of a longer name belongs to the block
+            content_start = begin.start(2) + len(name)
+        end = self.first_end(name, content_start)
+        return text[content_start:end.start()].strip() if end else ""
+
+
+def _html_block(html, index, begin, name):
+    """(description, html, end offset) for the block opened by ``begin``, or None without an END."""
+    content_start = _WHITESPACE.match(html, begin.end()).end()
+    described = _DESCRIPTION.match(html, content_start)
+    if described:
+        # The DESCRIPTION comment only counts when an END marker follows it
+        end = index.first_end(name, described.end())
+        if end is not None:
+            return described.group(1).strip(), html[described.end():end.start()].strip(), end.end()
+    end = index.first_end(name, content_start)
+    if end is None:
+        return None
+    return "", html[content_start:end.start()].strip(), end.end()
+
+
 def parse_custom_format(site_text):
-    # Extract HTML, CSS, JS blocks
-    html_match = re.search(r"===HTML===\s*(.*?)\s*===CSS===", site_text, re.DOTALL)
-    css_match = re.search(r"===CSS===\s*(.*?)\s*===JS===", site_text, re.DOTALL)
-    js_match = re.search(r"===JS===\s*(.*)", site_text, re.DOTALL)
+    """
+    Splits the model's ===HTML===/===CSS===/===JS=== output into the head,
+    the global block and the per-section code blocks, in HTML order.
+
+    Markers are indexed in a single pass per language, so parsing stays
+    linear in the size of the site however many sections it has.
+    """
+    html_start = site_text.find("===HTML===")
+    html_end = site_text.find("===CSS===", html_start + 10) if html_start != -1 else -1
+    css_start = site_text.find("===CSS===")
+    css_end = site_text.find("===JS===", css_start + 9) if css_start != -1 else -1
+    js_start = site_text.find("===JS===")
 
-    if not html_match or not css_match or not js_match:
+    if html_end == -1 or css_end == -1 or js_start == -1:
         missing = []
-        if not html_match: missing.append("HTML")
-        if not css_match: missing.append("CSS")
-        if not js_match: missing.append("JS")
+        if html_end == -1: missing.append("HTML")
+        if css_end == -1: missing.append("CSS")
+        if js_start == -1: missing.append("JS")
         raise ValueError(f"Parsing failed: Missing required sections: {', '.join(missing)}")
 
-    html = html_match.group(1)
-    css = css_match.group(1)
-    js = js_match.group(1)
+    html = site_text[html_start + 10:html_end].strip()
+    css = site_text[css_start + 9:css_end].strip()
+    js = site_text[js_start + 8:].lstrip()
+
+    html_index = _MarkerIndex(_HTML_MARKER, html)
+    css_index = _MarkerIndex(_CSS_MARKER, css)
+    js_index = _MarkerIndex(_JS_MARKER, js, prefix_names=True)
 
     # Extract <head> content
-    head_match = re.search(r"<head>(.*?)</head>", html, re.DOTALL)
-    head_content = head_match.group(1).strip() if head_match else ""
-
-    # Extract global HTML (DESCRIPTION optional)
-    global_html_match = re.search(
-        r"<!--\s*BEGIN global\s*-->\s*(?:<!--\s*DESCRIPTION:\s*(.*?)\s*-->\s*)?(.*?)<!--\s*END global\s*-->",
-        html,
-        re.DOTALL,
-    )
-    global_description = (
-        global_html_match.group(1).strip()
-        if global_html_match and global_html_match.group(1)
-        else ""
-    )
-    global_html = global_html_match.group(2).strip() if global_html_match else ""
-
-    # Extract global CSS and JS
-    global_css = re.search(
-        r"/\*\s*BEGIN global\s*\*/(.*?)/\*\s*END global\s*\*/", css, re.DOTALL
-    )
-    global_js = re.search(r"//\s*BEGIN global\s*(.*?)//\s*END global", js, re.DOTALL)
+    head_content = ""
+    head_start = html.find("<head>")
+    if head_start != -1:
+        head_end = html.find("</head>", head_start + 6)
+        if head_end != -1:
+            head_content = html[head_start + 6:head_end].strip()
+
+    # Global block (DESCRIPTION optional)
+    global_description = global_html = ""
+    global_begin = html_index.first_begin(None)
+    global_block = _html_block(html, html_index, global_begin, None) if global_begin else None
+    if global_block:
+        global_description, global_html, _ = global_block
 
     result = {
         "head": head_content,
         "global": {
             "name": "global",
             "html": global_html,
-            "css": global_css.group(1).strip() if global_css else "",
-            "js": global_js.group(1).strip() if global_js else "",
+            "css": css_index.block(css, None),
+            "js": js_index.block(js, None),
             "feedback": global_description,
         },
         "code_bloks": [],
     }
 
-    # Extract section blocks, DESCRIPTION optional
-    section_pattern = re.compile(
-        r"<!--\s*BEGIN SECTION:\s*([\w_]+)\s*-->\s*"
-        r"(?:<!--\s*DESCRIPTION:\s*(.*?)\s*-->\s*)?"
-        r"(.*?)"
-        r"<!--\s*END SECTION:\s*\1\s*-->",
-        re.DOTALL,
-    )
-
-    for match in section_pattern.finditer(html):
-        name = match.group(1)
-        description = match.group(2).strip() if match.group(2) else ""
-        html_content = match.group(3).strip()
-
-        css_section = re.search(
-            rf"/\*\s*BEGIN SECTION:\s*{re.escape(name)}\s*\*/(.*?)/\*\s*END SECTION:\s*{re.escape(name)}\s*\*/",
-            css,
-            re.DOTALL,
-        )
-        js_section = re.search(
-            rf"//\s*BEGIN SECTION:\s*{re.escape(name)}\s*(.*?)//\s*END SECTION:\s*{re.escape(name)}",
-            js,
-            re.DOTALL,
-        )
-
-        block = {
+    # Section blocks in HTML order; a BEGIN inside an earlier section is part of its content
+    position = 0
+    for kind, name, begin in html_index.markers:
+        if kind != "BEGIN" or name is None or begin.start() < position:
+            continue
+        block = _html_block(html, html_index, begin, name)
+        if block is None:
+            continue
+        description, html_content, position = block
+        result["code_bloks"].append({
             "name": name,
             "feedback": description,
             "html": html_content,
-            "css": css_section.group(1).strip() if css_section else "",
-            "js": js_section.group(1).strip() if js_section else "",
-        }
-        result["code_bloks"].append(block)
+            "css": css_index.block(css, name),
+            "js": js_index.block(js, name),
+        })
 
     return result
 
 
 
-# This is the background function
-async def generate_website_and_update_django(task_id: str, resume_yaml: str, preferences: dict,
- resume_id:int, user_id:int):
-    update_url = f"{DJANGO_API_URL}/api/update-task/"
-    generated_website_json = None
-    max_retries = 3
-    last_error = None
+def parse_website_plan(plan_text: str) -> dict:
+    """
+    Parses the plan step's output: the head and global block in the custom
+    format, followed by a YAML list of sections after ===PLAN===.
+    """
+    site_text, marker, plan_yaml = plan_text.partition("===PLAN===")
+    if not marker:
+        raise ValueError("Parsing failed: Missing required sections: PLAN")
+    site = parse_custom_format(site_text)
+    if not site["global"]["css"]:
+        raise ValueError("Parsing failed: the plan has no global CSS")
+
+    sections = []
+    for entry in safe_load_yaml_with_logging(plan_yaml) or []:
+        if not isinstance(entry, dict) or not entry.get("name"):
+            continue
+        name = re.sub(r"\W+", "_", str(entry["name"]).strip().lower()).strip("_")
+        if name and name != "global" and name not in {section["name"] for section in sections}:
+            sections.append({
+                "name": name,
+                "description": str(entry.get("description") or ""),
+                "brief": str(entry.get("brief") or ""),
+            })
+    if not sections:
+        raise ValueError("Parsing failed: the plan lists no sections")
+    return {"head": site["head"], "global": site["global"], "sections": sections[:WEBSITE_MAX_SECTIONS]}
 
-    for attempt in range(max_retries):
+
+async def _generate_section(section: dict, context: dict, semaphore: asyncio.Semaphore, task_id: str) -> dict:
+    """Generates one section, retrying only this section when its output is unusable."""
+    name = section["name"]
+    for attempt in range(1, WEBSITE_SECTION_MAX_ATTEMPTS + 1):
         try:
-            logger.info(f"Task {task_id}: Website generation attempt {attempt + 1}/{max_retries}")
-            # 1. Run the slow AI generation chain
-            generated_website = await create_resume_website_bloks_chain.ainvoke({
+            async with semaphore:
+                section_text = await website_section_chain.ainvoke({
+                    **context,
+                    "section_name": name,
+                    "section_description": section["description"],
+                    "section_brief": section["brief"],
+                })
+            if not section_text or not isinstance(section_text, str):
+                raise ValueError("AI chain failed to return a valid section string.")
+
+            bloks = parse_custom_format(section_text)["code_bloks"]
+            block = next((blok for blok in bloks if blok["name"] == name), None)
+            if block is None and len(bloks) == 1:
+                block = bloks[0]  # the model renamed the section
+            if block is None or not block["html"]:
+                raise ValueError(f"Parsing failed: no BEGIN SECTION: {name} block")
+            block["name"] = name
+            block["feedback"] = block["feedback"] or section["description"]
+            return block
+
+        except Exception as e:
+            logger.warning(f"Task {task_id}: section '{name}' attempt {attempt}/{WEBSITE_SECTION_MAX_ATTEMPTS} failed. Error: {e}")
+            if attempt == WEBSITE_SECTION_MAX_ATTEMPTS:
+                raise ValueError(f"Section '{name}' failed after {attempt} attempts: {e}")
+            await asyncio.sleep(min(2 ** (attempt - 1), 8))
+
+
+async def generate_website_sections(resume_yaml: str, preferences, task_id: str = "") -> dict:
+    """
+    Section-parallel website generation: one call plans the design (head,
+    global HTML/CSS/JS and the section list), then every section is generated
+    concurrently against that plan. Returns the structure parse_custom_format
+    produces for a one-shot generation.
+    """
+    plan = None
+    for attempt in range(1, WEBSITE_PLAN_MAX_ATTEMPTS + 1):
+        try:
+            plan_text = await website_plan_chain.ainvoke({
                 "resume_yaml": resume_yaml,
                 "preferences": preferences,
             })
-            
-            # Add a check to ensure the AI returned a valid string
-            if not generated_website or not isinstance(generated_website, str):
-                raise ValueError("AI chain failed to return a valid website string.")
+            if not plan_text or not isinstance(plan_text, str):
+                raise ValueError("AI chain failed to return a valid plan string.")
+            # The plan YAML may need a local repair, which is CPU-bound
+            plan = await asyncio.to_thread(parse_website_plan, plan_text)
+            break
+        except Exception as e:
+            logger.warning(f"Task {task_id}: plan attempt {attempt}/{WEBSITE_PLAN_MAX_ATTEMPTS} failed. Error: {e}")
+            if attempt == WEBSITE_PLAN_MAX_ATTEMPTS:
+                raise
+    logger.info(f"Task {task_id}: planned sections {[section['name'] for section in plan['sections']]}")
+
+    context = {
+        "resume_yaml": resume_yaml,
+        "preferences": preferences,
+        "global_css": plan["global"]["css"],
+        "global_js": plan["global"]["js"],
+        "section_names": ", ".join(section["name"] for section in plan["sections"]),
+    }
+    semaphore = asyncio.Semaphore(WEBSITE_SECTION_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_generate_section(section, context, semaphore, task_id))
+        for section in plan["sections"]
+    ]
+    try:
+        code_bloks = await asyncio.gather(*tasks)
+    except BaseException:
+        # One section is beyond its retries: stop paying for the others
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return {"head": plan["head"], "global": plan["global"], "code_bloks": list(code_bloks)}
 
+
+@job_handler("website_generation", on_failure=report_task_failure)
+async def website_generation_job(payload: dict):
+    await generate_website_and_update_django(**payload)
+
+
+async def generate_website_and_update_django(task_id: str, resume_yaml: str, preferences: dict,
+ resume_id:int, user_id:int):
+    """
+    Generates and parses the website, then reports SUCCESS to Django. Raises
+    on failure so the job queue retries it with backoff; the final FAILURE is
+    posted by report_task_failure.
+    """
+    update_url = "/api/update-task/"
+    client = get_django_client()
+
+    logger.info(f"Task {task_id}: Website generation started ({WEBSITE_PIPELINE} pipeline)")
+    # 1. Run the slow AI generation
+    if WEBSITE_PIPELINE == "sections":
+        generated_website_json = await generate_website_sections(resume_yaml, preferences, task_id)
+    else:
+        generated_website = await create_resume_website_bloks_chain.ainvoke({
+            "resume_yaml": resume_yaml,
+            "preferences": preferences,
+        })
+
+        # Add a check to ensure the AI returned a valid string
+        if not generated_website or not isinstance(generated_website, str):
+            raise ValueError("AI chain failed to return a valid website string.")
+
+        with stage("website_parse"):
             generated_website_json = parse_custom_format(generated_website)
-            
-            logger.info(f"Task {task_id}: Successfully generated and parsed website on attempt {attempt + 1}.")
-            break # Success, exit the retry loop
+    logger.info(f"Task {task_id}: Successfully generated and parsed website.")
 
-        except Exception as e:
-            last_error = e
-            logger.warning(f"Task {task_id}: Attempt {attempt + 1} failed. Error: {e}")
-            if attempt < max_retries - 1:
-                logger.info(f"Task {task_id}: Retrying in 5 seconds...")
-                await asyncio.sleep(5)  # Wait for 5 seconds before the next attempt
-            else:
-                logger.error(f"Task {task_id}: All {max_retries} generation attempts failed.")
-                error_payload = {"task_id": task_id, "status": "FAILURE", "error": str(last_error)}
-                async with httpx.AsyncClient() as client:
-                    await client.post(update_url, json=error_payload)
-                return
-
-    if generated_website_json:
-        # 2. Update the task in Django with the result
-        try:
-            payload = {"task_id": task_id, "status": "SUCCESS", "result": {"website": generated_website_json, "resume_id": resume_id}, "user_id": user_id}
-            async with httpx.AsyncClient() as client:
-                await client.post(update_url, json=payload)
-        except Exception as e:
-            # 3. If the final update fails, update the task with an error
-            logger.error(f"Task {task_id}: Succeeded but failed to update Django. Error: {e}")
-            error_payload = {"task_id": task_id, "status": "FAILURE", "error": f"Failed to save result: {e}"}
-            async with httpx.AsyncClient() as client:
-                await client.post(update_url, json=error_payload)
+    # 2. Update the task in Django with the result
+    payload = {"task_id": task_id, "status": "SUCCESS", "result": {"website": generated_website_json, "resume_id": resume_id}, "user_id": user_id}
+    with stage("django_save"):
+        response = await client.post(update_url, json=payload)
+    response.raise_for_status()
         
 
 # Create specific dependencies for different features
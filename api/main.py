@@ -3,24 +3,74 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware import Middleware
 
+from modules.http_client import open_django_client, close_django_client
+from modules.job_queue import JOB_WORKER_EMBEDDED, JobWorker, job_queue
+from modules.file_extraction import shutdown_extraction_pool
+from modules.metrics import MetricsMiddleware, metrics_endpoint
+from modules.usage import LLM_USAGE_REPORT_INTERVAL, token_usage
+from modules.features import FEATURE_LOADING, FeatureRouters, LazyFeatureMiddleware, enabled_features
+
+
+# routers (the feature routers are mounted by feature_routers below)
+from features.internal.routes import router as internal_router
+
+feature_routers = FeatureRouters(enabled_features())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled, keep-alive client shared by every call to Django
+    await open_django_client()
+    # Generation jobs run here unless a separate worker service (worker.py) handles them;
+    # it polls the job types of each feature as that feature loads
+    worker = JobWorker(job_queue, job_types=[]) if JOB_WORKER_EMBEDDED else None
+    preloads = []
+    if worker is not None:
+        feature_routers.on_load(lambda feature: worker.add_job_types(feature.jobs))
+        worker.start()
+        if FEATURE_LOADING == "lazy":
+            # Jobs already queued for a feature must not wait for its first request
+            preloads = [
+                asyncio.create_task(feature_routers.aload(app, feature.name))
+                for feature in feature_routers.features.values() if feature.jobs
+            ]
+    app.state.job_worker = worker
+    # Feature lifespans, e.g. the scraper's popular-search refresher and thread pool
+    await feature_routers.start(app)
+    # Per-user token totals go to Django's UsageRecord in batches
+    usage_reporter = asyncio.create_task(token_usage.run_reporter()) if LLM_USAGE_REPORT_INTERVAL > 0 else None
+    yield
+    for task in preloads:
+        task.cancel()
+    if worker is not None:
+        await worker.stop()
+    if usage_reporter is not None:
+        # Cancelling sends what is still pending (including the stopped worker's jobs)
+        usage_reporter.cancel()
+        await asyncio.gather(usage_reporter, return_exceptions=True)
+    await feature_routers.stop()
+    shutdown_extraction_pool()
+    await close_django_client()
 
-# routers
-from features.creator.routes import router as creator_router
-from features.scraper.routes import router as scraper_router
-from features.resumes.routes import router as resumes_router
-from features.documents.routes import router as documents_router
-from features.websites.routes import router as websites_router
 
 # create the fastapi app
 
 app = FastAPI(
+    lifespan=lifespan,
     title="Proj0 API Server",
     description=" api server using Langchain's Runnable interfaces",
     middleware=[
+        # Per-route latency, status and in-flight metrics (outermost, so it times everything)
+        Middleware(MetricsMiddleware),
+        # Imports a feature on the first request under its prefix (FEATURE_LOADING=lazy)
+        *([Middleware(LazyFeatureMiddleware, routers=feature_routers)] if FEATURE_LOADING == "lazy" else []),
         # Middleware to add a header to all responses
         Middleware(
             CORSMiddleware,
@@ -35,8 +85,11 @@ app = FastAPI(
 
 # include the routers
 
-app.include_router(creator_router, prefix="/resumes", tags=["resumes"])
-app.include_router(scraper_router, prefix="/scraper", tags=["scraper"])
-app.include_router(resumes_router, prefix="/resumes-v2", tags=["resumes-v2"])
-app.include_router(documents_router, prefix="/documents", tags=["documents"])
-app.include_router(websites_router, prefix="/websites", tags=["websites"])
\ No newline at end of file
+# ENABLED_FEATURES picks the feature routers this deployment serves
+if FEATURE_LOADING == "eager":
+    feature_routers.load_all(app)
+app.state.feature_routers = feature_routers
+app.include_router(internal_router, prefix="/internal", tags=["internal"])
+
+# Prometheus scrape endpoint (METRICS_TOKEN protects it when set)
+app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
\ No newline at end of file
@@ -6,7 +6,10 @@ from langchain_core.runnables import (
 from langchain_core.output_parsers import StrOutputParser
 from operator import itemgetter
 
-from .llm import llm_with_alternatives
+from .llm import llm_with_alternatives, llm_secondary_key, AdmittedModel
+from .hedging import HedgedModel, LLM_HEDGING_ENABLED, hedge_fallbacks
+from .llm_cache import CachedRunnable, llm_cache, prompt_fingerprint
+from .llm_coalescing import CoalescedRunnable, LLM_COALESCE_ENABLED
 
 
 class BaseChain:
@@ -15,7 +18,7 @@ class BaseChain:
     """
 
     def __init__(
-        self, input_chain=RunnablePassthrough(), output_parser=StrOutputParser()
+        self, input_chain=RunnablePassthrough(), output_parser=StrOutputParser(), cache=llm_cache
     ):
         """
         Initializes the BaseChain with the given components, prompt, language model type, and output parser.
@@ -23,18 +26,70 @@ class BaseChain:
         Args:
             input_chain (Runnable, optional): A pre-constructed input chain.
             output_parser (Callable, optional): The output parser to use at the end of the chain (default is StrOutputParser).
+            cache (LLMResponseCache, optional): Response cache used by default for built chains (None disables caching).
         """
         self.input_chain = input_chain
         self.output_parser = output_parser
+        self.cache = cache
         self.chain = None
 
-    def build_chain(self, prompt, model="gemini-2.0-flash"):
+    def build_chain(
+        self, prompt, model="gemini-2.0-flash", cache=None, prompt_version=None, cache_validator=None,
+        latency_budget=None, fallback_model=None, name=None, coalesce=None,
+    ):
         """
         Builds the chain of components, connecting inputs, prompt, language model, and output parser.
 
+        Args:
+            prompt: The prompt template.
+            model (str): The model to configure on the LLM.
+            cache (LLMResponseCache | bool, optional): None uses the instance cache, False opts the
+                chain out (for endpoints that must always be fresh), or a specific cache to use.
+            prompt_version (str, optional): Explicit cache version; defaults to a hash of the prompt.
+            cache_validator (Callable, optional): Only outputs for which this returns True are cached.
+            latency_budget (float, optional): Seconds to wait for the model's first token before a
+                hedged request goes to the fallback model; None disables hedging.
+            fallback_model (str, optional): Model for the hedged request; defaults to the
+                LLM_HEDGE_FALLBACKS entry for ``model``.
+            name (str, optional): Label for the hedging stats; defaults to the model name.
+            coalesce (bool, optional): Share one call between concurrent identical ainvoke calls;
+                defaults to LLM_COALESCE_ENABLED.
+
         Returns:
             Runnable: The constructed chain.
         """
-        llm = llm_with_alternatives.with_config(configurable={"model": model})
-        self.chain = self.input_chain | prompt | llm | self.output_parser
+        # Every model call goes through the per-model admission controller
+        llm = AdmittedModel(llm_with_alternatives.with_config(configurable={"model": model}), model)
+
+        fallback_model = fallback_model or hedge_fallbacks.get(model)
+        if latency_budget and fallback_model and LLM_HEDGING_ENABLED:
+            if llm_secondary_key is not None:
+                fallback = AdmittedModel(
+                    llm_secondary_key.with_config(configurable={"model": fallback_model}),
+                    f"{fallback_model}@secondary",
+                )
+            else:
+                fallback = AdmittedModel(
+                    llm_with_alternatives.with_config(configurable={"model": fallback_model}), fallback_model
+                )
+            llm = HedgedModel(llm, fallback, latency_budget, name or model, model, fallback_model)
+        chain = self.input_chain | prompt | llm | self.output_parser
+
+        prompt_version = prompt_version or prompt_fingerprint(prompt)
+        if cache is None:
+            cache = self.cache
+        if cache:
+            chain = CachedRunnable(
+                chain,
+                cache,
+                prompt_version=prompt_version,
+                model=model,
+                validator=cache_validator,
+            )
+
+        # Outside the cache, so identical concurrent misses also share the lookup and the call
+        if LLM_COALESCE_ENABLED if coalesce is None else coalesce:
+            chain = CoalescedRunnable(chain, prompt_version=prompt_version, model=model)
+
+        self.chain = chain
         return self.chain
@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from langchain_core.runnables import Runnable
+
+from .base_chains import BaseChain
+from .hedging import latency_budgets
+from .utils import clean_yaml_parser
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class ChainRegistryError(ValueError):
+    """A chain was registered twice with different settings, or its prompt does not match its inputs."""
+
+
+class ChainRegistry:
+    """
+    Builds every (prompt, model) chain once, when its feature module is
+    imported at startup, and hands out the ready runnables by name.
+
+    Registration checks the prompt's input variables against the inputs the
+    caller declares it will pass, so a renamed placeholder fails at startup
+    instead of on the first request.
+    """
+
+    def __init__(self, base_chain: Optional[BaseChain] = None):
+        # Every feature chain ends in the YAML fence-stripping parser
+        self.base_chain = base_chain or BaseChain(output_parser=clean_yaml_parser)
+        self._chains: Dict[str, Runnable] = {}
+        self._specs: Dict[str, tuple] = {}
+
+    def register(
+        self,
+        name: str,
+        prompt,
+        inputs: Iterable[str],
+        model: str = DEFAULT_MODEL,
+        cache=None,
+        cache_validator: Optional[Callable[[Any], bool]] = None,
+        latency_budget: Optional[float] = None,
+        fallback_model: Optional[str] = None,
+    ) -> Runnable:
+        """
+        Builds and stores the chain for ``name`` (see BaseChain.build_chain for
+        ``cache``, ``cache_validator`` and the hedging options). LLM_LATENCY_BUDGETS
+        overrides ``latency_budget`` per chain name. Registering the same name
+        again with the same settings returns the existing chain.
+        """
+        latency_budget = latency_budgets.get(name, latency_budget)
+        spec = (
+            id(prompt), model, cache if cache is None or cache is False else id(cache), cache_validator,
+            latency_budget, fallback_model,
+        )
+        if name in self._chains:
+            if self._specs[name] != spec:
+                raise ChainRegistryError(f"Chain '{name}' is already registered with different settings")
+            return self._chains[name]
+
+        self._validate(name, prompt, set(inputs))
+        chain = self.base_chain.build_chain(
+            prompt, model=model, cache=cache, cache_validator=cache_validator,
+            latency_budget=latency_budget, fallback_model=fallback_model, name=name,
+        )
+        self._chains[name] = chain
+        self._specs[name] = spec
+        return chain
+
+    @staticmethod
+    def _validate(name: str, prompt, inputs: set):
+        expected = set(prompt.input_variables)
+        missing = expected - inputs
+        if missing:
+            raise ChainRegistryError(
+                f"Chain '{name}': prompt expects {sorted(missing)} which the caller does not pass"
+            )
+        unused = inputs - expected - set(getattr(prompt, "optional_variables", ()))
+        if unused:
+            logger.warning(f"Chain '{name}': inputs {sorted(unused)} are not used by the prompt")
+
+    def get(self, name: str) -> Runnable:
+        try:
+            return self._chains[name]
+        except KeyError:
+            raise ChainRegistryError(f"No chain registered as '{name}'") from None
+
+    def names(self):
+        return sorted(self._chains)
+
+
+chain_registry = ChainRegistry()
@@ -0,0 +1,108 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Must match Django's SIMPLE_JWT SIGNING_KEY / ALGORITHM. When the key is not
+# set the AI service falls back to asking Django on every request.
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_USER_ID_CLAIM = os.getenv("JWT_USER_ID_CLAIM", "user_id")
+
+ENTITLEMENT_CACHE_TTL = float(os.getenv("ENTITLEMENT_CACHE_TTL", "30"))
+ENTITLEMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENTITLEMENT_CACHE_MAX_ENTRIES", "10000"))
+
+
+def decode_access_token(authorization: str) -> Optional[dict]:
+    """
+    Verifies a SimpleJWT access token locally with the shared signing key.
+
+    Returns the token claims, or None when local verification is disabled.
+    Raises a 401 HTTPException for missing, expired or tampered tokens.
+    """
+    if not JWT_SECRET_KEY:
+        return None
+
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme != "Bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if claims.get("token_type") != "access" or JWT_USER_ID_CLAIM not in claims:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    return claims
+
+
+class EntitlementCache:
+    """
+    Short-TTL, in-process cache of per-user plan limits and usage.
+
+    Entries are the payload returned by Django's verify-and-check-limits
+    endpoint, keyed by (user_id, feature). Django calls the internal
+    invalidation endpoint whenever usage or a subscription changes, so the
+    TTL only bounds staleness when that notification is lost.
+    """
+
+    def __init__(self, ttl: float = ENTITLEMENT_CACHE_TTL, max_entries: int = ENTITLEMENT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id, feature: str) -> Optional[dict]:
+        key = (str(user_id), feature)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, user_id, feature: str, snapshot: dict):
+        key = (str(user_id), feature)
+        self._entries[key] = (time.monotonic() + self.ttl, dict(snapshot))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None, feature: Optional[str] = None) -> int:
+        """Drops entries for a user (optionally one feature), or everything when user_id is None."""
+        if user_id is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            keys = [
+                key for key in self._entries
+                if key[0] == str(user_id) and (feature is None or key[1] == feature)
+            ]
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+        self.invalidations += 1
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+        }
+
+
+entitlement_cache = EntitlementCache()
@@ -0,0 +1,168 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Feature routers this deployment serves, e.g. "scraper" or "resumes,documents"; "all" serves every one
+ENABLED_FEATURES = os.getenv("ENABLED_FEATURES", "all")
+# "eager" imports the enabled features at startup; "lazy" imports each on the first request under its prefix
+FEATURE_LOADING = os.getenv("FEATURE_LOADING", "eager")
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    module: str  # exposes ``router`` and, optionally, a ``lifespan(app)`` async context manager
+    prefix: str
+    tags: Tuple[str, ...]
+    # Background job types the feature enqueues, and the module registering their handlers
+    jobs: Dict[str, str] = field(default_factory=dict)
+
+
+FEATURES: Dict[str, Feature] = {
+    feature.name: feature
+    for feature in (
+        # langserve endpoints
+        Feature("creator", "features.creator.routes", "/resumes", ("resumes",)),
+        Feature("scraper", "features.scraper.routes", "/scraper", ("scraper",)),
+        Feature("resumes", "features.resumes.routes", "/resumes-v2", ("resumes-v2",),
+                jobs={"resume_generation": "features.resumes.utils"}),
+        Feature("documents", "features.documents.routes", "/documents", ("documents",)),
+        Feature("websites", "features.websites.routes", "/websites", ("websites",),
+                jobs={"website_generation": "features.websites.utils"}),
+    )
+}
+
+JOB_MODULES: Dict[str, str] = {job_type: module for feature in FEATURES.values() for job_type, module in feature.jobs.items()}
+
+
+def enabled_features(spec: str = ENABLED_FEATURES) -> List[Feature]:
+    names = [name.strip() for name in spec.split(",") if name.strip()]
+    if not names or "all" in names:
+        return list(FEATURES.values())
+    unknown = sorted(set(names) - set(FEATURES))
+    if unknown:
+        raise ValueError(f"ENABLED_FEATURES: unknown features {unknown}, expected some of {sorted(FEATURES)}")
+    return [FEATURES[name] for name in dict.fromkeys(names)]
+
+
+def import_job_handlers(job_types=None) -> List[str]:
+    """Imports the modules registering the handlers of ``job_types`` (default: every known job type)."""
+    job_types = list(JOB_MODULES) if job_types is None else list(job_types)
+    for job_type in job_types:
+        if job_type not in JOB_MODULES:
+            raise ValueError(f"Unknown job type '{job_type}', expected one of {sorted(JOB_MODULES)}")
+        importlib.import_module(JOB_MODULES[job_type])
+    return job_types
+
+
+class FeatureRouters:
+    """
+    Mounts the routers of the enabled features on the app, either all at
+    startup or each on the first request under its prefix (``LazyFeatureMiddleware``).
+
+    A lazily loaded feature is imported in a thread, so its heavy dependencies
+    (jobspy and pandas, langserve, the Gemini client) and its chain builds do
+    not stall requests to the features already loaded. Its ``lifespan`` is
+    entered as soon as it loads and exited with the app's.
+    """
+
+    def __init__(self, features: List[Feature]):
+        self.features = {feature.name: feature for feature in features}
+        self.loaded: Dict[str, float] = {}  # name -> import seconds
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._stack: Optional[AsyncExitStack] = None
+        self._app = None
+        self._on_load: List[Callable[[Feature], None]] = []
+
+    def on_load(self, callback: Callable[[Feature], None]):
+        """Calls ``callback(feature)`` for every feature once it is mounted (also for those already loaded)."""
+        self._on_load.append(callback)
+        for name in self.loaded:
+            callback(self.features[name])
+
+    def for_path(self, path: str) -> Optional[Feature]:
+        for feature in self.features.values():
+            if path == feature.prefix or path.startswith(feature.prefix + "/"):
+                return feature
+        return None
+
+    def _import(self, feature: Feature):
+        started = time.perf_counter()
+        module = importlib.import_module(feature.module)
+        return module, time.perf_counter() - started
+
+    def _mount(self, app, feature: Feature, module, seconds: float):
+        app.include_router(module.router, prefix=feature.prefix, tags=list(feature.tags))
+        # Late routes must show up in /openapi.json
+        app.openapi_schema = None
+        self.loaded[feature.name] = seconds
+        logger.info(f"Feature '{feature.name}' loaded in {seconds:.2f}s")
+        for callback in self._on_load:
+            callback(feature)
+
+    def load_all(self, app):
+        """Imports and mounts every enabled feature (eager loading, before startup)."""
+        for feature in self.features.values():
+            if feature.name not in self.loaded:
+                self._mount(app, feature, *self._import(feature))
+
+    async def aload(self, app, name: str):
+        """Imports and mounts one feature off the event loop; concurrent first requests share the load."""
+        if name in self.loaded:
+            return
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self.loaded:
+                return
+            feature = self.features[name]
+            module, seconds = await asyncio.to_thread(self._import, feature)
+            self._mount(app, feature, module, seconds)
+            if self._stack is not None:
+                await self._enter(feature, module)
+
+    async def _enter(self, feature: Feature, module):
+        lifespan = getattr(module, "lifespan", None)
+        if lifespan is not None:
+            await self._stack.enter_async_context(lifespan(self._app))
+
+    async def start(self, app):
+        """Enters the lifespans of the features loaded so far (those loaded later enter on load)."""
+        self._app = app
+        self._stack = AsyncExitStack()
+        # Features mounted while these are entered enter through aload()
+        for name in list(self.loaded):
+            await self._enter(self.features[name], importlib.import_module(self.features[name].module))
+
+    async def stop(self):
+        if self._stack is not None:
+            await self._stack.aclose()
+            self._stack = None
+
+    def stats(self) -> dict:
+        return {
+            "loading": FEATURE_LOADING,
+            "enabled": sorted(self.features),
+            "loaded": {name: round(seconds, 3) for name, seconds in self.loaded.items()},
+        }
+
+
+class LazyFeatureMiddleware:
+    """Loads a feature's router before the first request under its prefix is routed."""
+
+    def __init__(self, app, routers: FeatureRouters):
+        self.app = app
+        self.routers = routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            feature = self.routers.for_path(scope["path"])
+            if feature is not None and feature.name not in self.routers.loaded:
+                await self.routers.aload(scope["app"], feature.name)
+        await self.app(scope, receive, send)
@@ -0,0 +1,379 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+from .cache import MemoryLRUCache, SQLiteCache, TieredCache
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for PDF/DOCX parsing, and how many files may be extracted at once
+FILE_EXTRACTION_WORKERS = int(os.getenv("FILE_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+FILE_EXTRACTION_MAX_CONCURRENT_FILES = int(os.getenv("FILE_EXTRACTION_MAX_CONCURRENT_FILES", "8"))
+# Per-file limits: upload size, wall-clock time (including the wait for a worker) and PDF pages
+FILE_MAX_UPLOAD_BYTES = int(os.getenv("FILE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+FILE_EXTRACTION_TIMEOUT = float(os.getenv("FILE_EXTRACTION_TIMEOUT", "20"))
+FILE_PDF_MAX_PAGES = int(os.getenv("FILE_PDF_MAX_PAGES", "100"))
+# PDFs with at least this many pages are split into page ranges extracted in parallel
+FILE_PDF_PARALLEL_MIN_PAGES = int(os.getenv("FILE_PDF_PARALLEL_MIN_PAGES", "8"))
+FILE_PDF_PAGES_PER_TASK = int(os.getenv("FILE_PDF_PAGES_PER_TASK", "4"))
+# Uploads stay in memory up to this size, larger ones are spooled to a temp file
+FILE_SPOOL_MEMORY_BYTES = int(os.getenv("FILE_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+FILE_SPOOL_DIR = os.getenv("FILE_SPOOL_DIR") or None
+# "spawn" keeps the workers free of the event loop's threads and sockets
+FILE_EXTRACTION_START_METHOD = os.getenv("FILE_EXTRACTION_START_METHOD", "spawn")
+
+# Extracted text of PDF/DOCX uploads, keyed by the SHA-256 of the file bytes.
+# Separate limits from the LLM cache so resume uploads never evict generations.
+FILE_TEXT_CACHE_ENABLED = os.getenv("FILE_TEXT_CACHE_ENABLED", "1") == "1"
+FILE_TEXT_CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("FILE_TEXT_CACHE_MEMORY_MAX_ENTRIES", "256"))
+FILE_TEXT_CACHE_MEMORY_MAX_BYTES = int(os.getenv("FILE_TEXT_CACHE_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))
+FILE_TEXT_CACHE_MEMORY_TTL = float(os.getenv("FILE_TEXT_CACHE_MEMORY_TTL", "3600"))
+# Empty path disables the disk tier
+FILE_TEXT_CACHE_SQLITE_PATH = os.getenv("FILE_TEXT_CACHE_SQLITE_PATH", "cache/extracted_text.sqlite3")
+FILE_TEXT_CACHE_SQLITE_MAX_BYTES = int(os.getenv("FILE_TEXT_CACHE_SQLITE_MAX_BYTES", str(128 * 1024 * 1024)))
+FILE_TEXT_CACHE_SQLITE_TTL = float(os.getenv("FILE_TEXT_CACHE_SQLITE_TTL", str(30 * 24 * 3600)))
+
+PDF_TYPES = {"application/pdf"}
+DOCX_TYPES = {
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/msword",
+}
+TEXT_TYPES = {"text/plain"}
+
+_CHUNK_SIZE = 64 * 1024
+
+# Spooled upload handed to the workers: the bytes, or the path of the temp file
+Source = Union[bytes, str]
+
+
+class FileExtractionError(HTTPException):
+    """The upload is too large, of an unsupported type, unreadable, or took too long to extract."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code=status_code, detail=detail)
+
+
+class _ExtractionTimeout(Exception):
+    pass
+
+
+class _PageLimitExceeded(Exception):
+    pass
+
+
+# --- Worker side (runs in the pool processes) ---
+
+def _open(source: Source):
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def _read_pages(reader, start: int, stop: int, deadline: float) -> List[str]:
+    pages = []
+    for page in reader.pages[start:stop]:
+        # Checked between pages so a pathological file gives its worker back
+        if time.time() > deadline:
+            raise _ExtractionTimeout()
+        pages.append(page.extract_text())
+    return pages
+
+
+def _pdf_pages(source: Source, start: int, stop: int, deadline: float) -> List[str]:
+    from PyPDF2 import PdfReader
+
+    with _open(source) as f:
+        return _read_pages(PdfReader(f), start, stop, deadline)
+
+
+def _pdf_open(source: Source, deadline: float, max_pages: int, parallel_min_pages: int):
+    """Page count, plus the text of every page when the PDF is too small to split."""
+    from PyPDF2 import PdfReader
+
+    with _open(source) as f:
+        reader = PdfReader(f)
+        count = len(reader.pages)
+        if count > max_pages:
+            raise _PageLimitExceeded(count)
+        if count >= parallel_min_pages:
+            return count, None
+        return count, _read_pages(reader, 0, count, deadline)
+
+
+def _docx_text(source: Source) -> str:
+    from docx import Document
+
+    with _open(source) as f:
+        return "\n".join(para.text for para in Document(f).paragraphs)
+
+
+def _plain_text(source: Source) -> str:
+    with _open(source) as f:
+        return f.read().decode("utf-8")
+
+
+# --- Pool ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_file_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is not None and _pool._broken:
+        # A worker died (e.g. out of memory on a hostile file); start a fresh pool
+        logger.warning("File extraction pool is broken, restarting it")
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=FILE_EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context(FILE_EXTRACTION_START_METHOD),
+        )
+    return _pool
+
+
+def shutdown_extraction_pool():
+    """Stops the worker processes; called on application shutdown."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class ExtractionStats:
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0  # too large, too many pages or unsupported type
+        self.parallel_pdfs = 0
+        self.bytes_total = 0
+        self.seconds_total = 0.0
+        self.seconds_max = 0.0
+        self.cache_hits = 0
+        self.cache_bytes_served = 0
+        self.cache_seconds_saved = 0.0  # extraction time recorded for the entries served from cache
+
+    def stats(self) -> dict:
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "parallel_pdfs": self.parallel_pdfs,
+            "bytes_total": self.bytes_total,
+            "seconds_total": round(self.seconds_total, 4),
+            "seconds_max": round(self.seconds_max, 4),
+            "workers": FILE_EXTRACTION_WORKERS,
+            "cache": {
+                "hits": self.cache_hits,
+                "bytes_served": self.cache_bytes_served,
+                "seconds_saved": round(self.cache_seconds_saved, 4),
+                "backend": text_cache.stats() if text_cache is not None else None,
+            },
+        }
+
+
+extraction_stats = ExtractionStats()
+
+
+def _build_text_cache() -> Optional[TieredCache]:
+    if not FILE_TEXT_CACHE_ENABLED:
+        return None
+    disk_tier = None
+    if FILE_TEXT_CACHE_SQLITE_PATH:
+        try:
+            disk_tier = SQLiteCache(
+                FILE_TEXT_CACHE_SQLITE_PATH,
+                max_bytes=FILE_TEXT_CACHE_SQLITE_MAX_BYTES,
+                ttl=FILE_TEXT_CACHE_SQLITE_TTL,
+                table="extracted_text",
+            )
+        except Exception as e:
+            logger.warning(f"Extracted text cache disk tier unavailable, using memory only: {e}")
+    memory_tier = MemoryLRUCache(
+        max_entries=FILE_TEXT_CACHE_MEMORY_MAX_ENTRIES,
+        max_bytes=FILE_TEXT_CACHE_MEMORY_MAX_BYTES,
+        ttl=FILE_TEXT_CACHE_MEMORY_TTL,
+    )
+    return TieredCache(memory_tier, disk_tier)
+
+
+text_cache = _build_text_cache()
+
+
+# --- Request side ---
+
+class SpooledUpload:
+    """An upload copied in chunks, in memory while small and to a temp file past FILE_SPOOL_MEMORY_BYTES."""
+
+    def __init__(self):
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def source(self) -> Source:
+        return self._file.name if self._file is not None else bytes(self._buffer)
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > FILE_MAX_UPLOAD_BYTES:
+            raise FileExtractionError(413, f"File is larger than {FILE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+        self._sha256.update(chunk)
+        if self._file is None and self.size > FILE_SPOOL_MEMORY_BYTES:
+            self._file = tempfile.NamedTemporaryFile(prefix="upload-", dir=FILE_SPOOL_DIR, delete=False)
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer.extend(chunk)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except OSError:
+                pass
+            self._file = None
+
+
+async def spool_upload(uploaded_file: UploadFile) -> SpooledUpload:
+    """Copies the upload chunk by chunk, enforcing FILE_MAX_UPLOAD_BYTES as it goes."""
+    spool = SpooledUpload()
+    try:
+        while chunk := await uploaded_file.read(_CHUNK_SIZE):
+            spool.write(chunk)
+        spool.finish()
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def _run(func, *args):
+    return await asyncio.wrap_future(_get_pool().submit(func, *args))
+
+
+async def _extract_pdf(source: Source, deadline: float) -> str:
+    count, pages = await _run(_pdf_open, source, deadline, FILE_PDF_MAX_PAGES, FILE_PDF_PARALLEL_MIN_PAGES)
+    if pages is None:
+        extraction_stats.parallel_pdfs += 1
+        ranges = [
+            (start, min(start + FILE_PDF_PAGES_PER_TASK, count))
+            for start in range(0, count, FILE_PDF_PAGES_PER_TASK)
+        ]
+        tasks = [asyncio.ensure_future(_run(_pdf_pages, source, start, stop, deadline)) for start, stop in ranges]
+        try:
+            results = await asyncio.gather(*tasks)
+        finally:
+            # Ranges still queued behind a failed one are dropped from the pool
+            for task in tasks:
+                task.cancel()
+        pages = [page for chunk in results for page in chunk]
+    return "\n".join(pages)
+
+
+async def _extract(content_type: str, source: Source, deadline: float) -> str:
+    global _file_slots
+    if _file_slots is None:
+        _file_slots = asyncio.Semaphore(FILE_EXTRACTION_MAX_CONCURRENT_FILES)
+    async with _file_slots:
+        if content_type in PDF_TYPES:
+            return await _extract_pdf(source, deadline)
+        if content_type in DOCX_TYPES:
+            return await _run(_docx_text, source)
+        return await _run(_plain_text, source)
+
+
+async def extract_upload_text(uploaded_file: UploadFile) -> str:
+    """
+    Extracts the text of an uploaded PDF, DOCX or plain text file in the
+    worker process pool, so parsing never blocks the event loop.
+
+    PDF and DOCX text is cached under the SHA-256 of the file bytes, so a
+    re-uploaded file is only hashed, never parsed again.
+
+    Raises FileExtractionError: 413 for files over FILE_MAX_UPLOAD_BYTES or
+    FILE_PDF_MAX_PAGES, 415 for unsupported types, 422 for unreadable files
+    or extraction slower than FILE_EXTRACTION_TIMEOUT.
+    """
+    content_type = uploaded_file.content_type
+    if content_type not in PDF_TYPES | DOCX_TYPES | TEXT_TYPES:
+        extraction_stats.rejected += 1
+        raise FileExtractionError(415, f"Unsupported file type: {content_type}")
+
+    started = time.monotonic()
+    deadline = time.time() + FILE_EXTRACTION_TIMEOUT
+    try:
+        spool = await spool_upload(uploaded_file)
+    except FileExtractionError:
+        extraction_stats.rejected += 1
+        raise
+
+    cache_key = None
+    if text_cache is not None and content_type not in TEXT_TYPES:
+        cache_key = f"{'pdf' if content_type in PDF_TYPES else 'docx'}:{spool.sha256}"
+        cached = await text_cache.aget(cache_key)
+        if cached is not None:
+            spool.close()
+            extraction_stats.cache_hits += 1
+            extraction_stats.cache_bytes_served += cached["bytes"]
+            extraction_stats.cache_seconds_saved += cached["extraction_seconds"]
+            return cached["text"]
+
+    try:
+        text = await asyncio.wait_for(
+            _extract(content_type, spool.source, deadline),
+            timeout=max(0.0, deadline - time.time()),
+        )
+    except (asyncio.TimeoutError, _ExtractionTimeout):
+        extraction_stats.timeouts += 1
+        raise FileExtractionError(422, f"File could not be processed within {FILE_EXTRACTION_TIMEOUT:g}s") from None
+    except _PageLimitExceeded as e:
+        extraction_stats.rejected += 1
+        raise FileExtractionError(413, f"PDF has {e.args[0]} pages, the limit is {FILE_PDF_MAX_PAGES}") from None
+    except BrokenProcessPool:
+        # A worker died; the next call starts a fresh pool
+        extraction_stats.failed += 1
+        raise FileExtractionError(503, "File processing is temporarily unavailable, please retry") from None
+    except Exception as e:
+        extraction_stats.failed += 1
+        logger.warning(f"Could not extract text from {uploaded_file.filename!r} ({content_type}): {e!r}")
+        raise FileExtractionError(422, "The file could not be read") from e
+    finally:
+        spool.close()
+
+    elapsed = time.monotonic() - started
+    extraction_stats.files += 1
+    extraction_stats.bytes_total += spool.size
+    extraction_stats.seconds_total += elapsed
+    extraction_stats.seconds_max = max(extraction_stats.seconds_max, elapsed)
+    if cache_key is not None:
+        await text_cache.aset(cache_key, {
+            "text": text,
+            "bytes": spool.size,
+            "extraction_seconds": round(elapsed, 4),
+            "content_type": content_type,
+        })
+    return text
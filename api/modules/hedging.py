@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "1") == "1"
+# Model to hedge each primary model with: a faster tier, e.g. "gemini-2.5-pro=gemini-2.5-flash", or the
+# same model for the fastest tier (a plain duplicate request, on the secondary key when one is set)
+LLM_HEDGE_FALLBACKS = os.getenv(
+    "LLM_HEDGE_FALLBACKS",
+    "gemini-2.5-pro=gemini-2.5-flash,gemini-2.5-flash=gemini-2.0-flash,gemini-2.0-flash=gemini-2.0-flash",
+)
+# Per-chain budget overrides (seconds to the first token), e.g. "websites.create_bloks=30"
+LLM_LATENCY_BUDGETS = os.getenv("LLM_LATENCY_BUDGETS", "")
+
+
+def _parse_mapping(spec: str) -> Dict[str, str]:
+    mapping = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        mapping[key.strip()] = value.strip()
+    return mapping
+
+
+hedge_fallbacks = _parse_mapping(LLM_HEDGE_FALLBACKS)
+latency_budgets = {name: float(value) for name, value in _parse_mapping(LLM_LATENCY_BUDGETS).items()}
+
+
+class HedgeStats:
+    """Which path won, per chain, so latency budgets can be tuned."""
+
+    def __init__(self):
+        self._routes: Dict[str, dict] = {}
+
+    def route(self, name: str, primary: str, fallback: str, budget: float) -> dict:
+        entry = self._routes.get(name)
+        if entry is None:
+            entry = self._routes[name] = {
+                "primary_model": primary,
+                "fallback_model": fallback,
+                "budget_seconds": budget,
+                "calls": 0,
+                "hedged": 0,  # primary missed the budget and the fallback was started
+                "primary_wins": 0,
+                "fallback_wins": 0,
+                "failures": 0,
+                "first_token_seconds_total": 0.0,
+                "first_token_seconds_max": 0.0,
+            }
+        return entry
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                **entry,
+                "first_token_seconds_total": round(entry["first_token_seconds_total"], 4),
+                "first_token_seconds_max": round(entry["first_token_seconds_max"], 4),
+            }
+            for name, entry in self._routes.items()
+        }
+
+
+hedge_stats = HedgeStats()
+
+
+async def _first_chunk(iterator: AsyncIterator[Any]):
+    return await iterator.__anext__()
+
+
+class HedgedModel(Runnable):
+    """
+    Streams from the primary model; if it has not produced its first chunk
+    within ``budget`` seconds, the same input is sent to the fallback model
+    and whichever produces a first chunk first wins. The loser is cancelled.
+
+    ``ainvoke`` races the same way and concatenates the winning stream. Sync
+    calls go straight to the primary.
+    """
+
+    def __init__(self, primary: Runnable, fallback: Runnable, budget: float, name: str,
+                 primary_model: str, fallback_model: str, stats: HedgeStats = hedge_stats):
+        self.primary = primary
+        self.fallback = fallback
+        self.budget = budget
+        self.name = name
+        self.stats = stats.route(name, primary_model, fallback_model, budget)
+
+    @property
+    def InputType(self):
+        return self.primary.InputType
+
+    @property
+    def OutputType(self):
+        return self.primary.OutputType
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        return self.primary.invoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[Any]:
+        yield from self.primary.stream(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        result = None
+        async for chunk in self.astream(input, config, **kwargs):
+            result = chunk if result is None else result + chunk
+        return result
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[Any]:
+        started = time.monotonic()
+        self.stats["calls"] += 1
+        legs = {"primary": self.primary.astream(input, config, **kwargs)}
+        pending = {asyncio.create_task(_first_chunk(legs["primary"])): "primary"}
+        winner = first = None
+        error = None
+
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.budget)
+            if not done:
+                self.stats["hedged"] += 1
+                logger.info(f"{self.name}: no first token within {self.budget}s, hedging to the fallback model")
+                legs["fallback"] = self.fallback.astream(input, config, **kwargs)
+                pending[asyncio.create_task(_first_chunk(legs["fallback"]))] = "fallback"
+
+            while pending and winner is None:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    leg = pending.pop(task)
+                    if task.exception() is None:
+                        if winner is None:
+                            winner, first = leg, task.result()
+                    elif error is None or leg == "primary":
+                        error = task.exception()
+                # A failed primary before the budget: hedge right away
+                if winner is None and not pending and "fallback" not in legs:
+                    self.stats["hedged"] += 1
+                    legs["fallback"] = self.fallback.astream(input, config, **kwargs)
+                    pending[asyncio.create_task(_first_chunk(legs["fallback"]))] = "fallback"
+        finally:
+            # Cancel the loser (or both legs when the caller went away)
+            for task, leg in pending.items():
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for leg, iterator in legs.items():
+                if leg != winner:
+                    await iterator.aclose()
+
+        if winner is None:
+            self.stats["failures"] += 1
+            if isinstance(error, StopAsyncIteration):
+                return
+            raise error
+
+        first_token = time.monotonic() - started
+        self.stats[f"{winner}_wins"] += 1
+        self.stats["first_token_seconds_total"] += first_token
+        self.stats["first_token_seconds_max"] = max(self.stats["first_token_seconds_max"], first_token)
+
+        iterator = legs[winner]
+        try:
+            yield first
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            await iterator.aclose()
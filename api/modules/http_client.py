@@ -0,0 +1,82 @@
+import os
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Django service URL
+DJANGO_API_URL = os.getenv("DJANGO_API_URL", "http://django:8000")
+
+# Pool and timeout settings for the shared Django client
+DJANGO_HTTP_MAX_CONNECTIONS = int(os.getenv("DJANGO_HTTP_MAX_CONNECTIONS", "100"))
+DJANGO_HTTP_MAX_KEEPALIVE = int(os.getenv("DJANGO_HTTP_MAX_KEEPALIVE", "20"))
+DJANGO_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("DJANGO_HTTP_KEEPALIVE_EXPIRY", "30"))
+DJANGO_HTTP_TIMEOUT = float(os.getenv("DJANGO_HTTP_TIMEOUT", "30"))
+DJANGO_HTTP_CONNECT_TIMEOUT = float(os.getenv("DJANGO_HTTP_CONNECT_TIMEOUT", "5"))
+DJANGO_HTTP_POOL_TIMEOUT = float(os.getenv("DJANGO_HTTP_POOL_TIMEOUT", "5"))
+# HTTP/2 is only negotiated over TLS (ALPN); plain http:// stays on HTTP/1.1 keep-alive.
+DJANGO_HTTP2 = os.getenv("DJANGO_HTTP2", "0") == "1"
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_django_client() -> httpx.AsyncClient:
+    """Builds an AsyncClient configured for calls to the Django service."""
+    http2 = DJANGO_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("DJANGO_HTTP2=1 but the 'h2' package is missing, falling back to HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=DJANGO_API_URL,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=DJANGO_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=DJANGO_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=DJANGO_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            DJANGO_HTTP_TIMEOUT,
+            connect=DJANGO_HTTP_CONNECT_TIMEOUT,
+            pool=DJANGO_HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+async def open_django_client() -> httpx.AsyncClient:
+    """Opens the app-scoped Django client. Called from the FastAPI lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_django_client()
+    return _client
+
+
+async def close_django_client():
+    """Closes the app-scoped Django client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_django_client() -> httpx.AsyncClient:
+    """
+    Returns the shared Django client.
+
+    Usable both as a FastAPI dependency and from background jobs. If the
+    lifespan has not run (scripts, workers), the client is created lazily.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_django_client()
+    return _client
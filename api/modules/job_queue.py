@@ -0,0 +1,401 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from .metrics import current_route, job_duration
+from .usage import usage_owner
+
+logger = logging.getLogger(__name__)
+
+# Shared by the API (producer) and every worker process; on one host a shared
+# volume is enough for several worker containers.
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/job_queue.sqlite3")
+# A claimed job is invisible to other workers this long; the running worker
+# renews the lease, so it only expires when that worker dies.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "300"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_DEFAULT_CONCURRENCY = int(os.getenv("JOB_DEFAULT_CONCURRENCY", "4"))
+# Per-job-type overrides, e.g. "resume_generation=4,website_generation=2"
+JOB_CONCURRENCY = os.getenv("JOB_CONCURRENCY", "")
+# Finished jobs are kept this long for inspection (seconds)
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Run a worker inside the API process (handy locally; disable when a
+# separate worker service is deployed)
+JOB_WORKER_EMBEDDED = os.getenv("JOB_WORKER_EMBEDDED", "1") == "1"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Payload key carrying the enqueuing request's usage owner into the job
+USAGE_OWNER_KEY = "_usage_owner"
+
+
+@dataclass
+class Job:
+    id: str
+    job_type: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    last_error: Optional[str] = None
+
+    @property
+    def exhausted(self) -> bool:
+        return self.attempts >= self.max_attempts
+
+
+class JobQueue:
+    """
+    Durable job queue in a single SQLite file.
+
+    ``claim`` leases a job to one worker until ``lease_expires_at``; a job
+    whose lease runs out (the worker crashed or was redeployed) becomes
+    visible again and is redelivered. Failed attempts are retried with
+    exponential backoff until ``max_attempts`` is reached.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, job_type TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "run_after REAL NOT NULL, lease_expires_at REAL, worker_id TEXT, last_error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (job_type, status, run_after)")
+
+    # --- producer side ---
+
+    def enqueue(self, job_type: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS, delay: float = 0) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        owner = usage_owner.get()
+        if owner is not None:
+            payload = {**payload, USAGE_OWNER_KEY: list(owner)}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, job_type, payload, status, max_attempts, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(payload, default=str), QUEUED, max_attempts, now + delay, now, now),
+            )
+        return job_id
+
+    async def aenqueue(self, job_type: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS, delay: float = 0) -> str:
+        return await asyncio.to_thread(self.enqueue, job_type, payload, max_attempts, delay)
+
+    # --- worker side ---
+
+    def claim(self, job_type: str, worker_id: str, lease: float = JOB_LEASE_SECONDS) -> Optional[Job]:
+        """Leases the oldest ready job of this type, including jobs whose lease expired."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts, max_attempts, last_error FROM jobs "
+                    "WHERE job_type = ? AND ((status = ? AND run_after <= ?) OR (status = ? AND lease_expires_at < ?)) "
+                    "ORDER BY run_after LIMIT 1",
+                    (job_type, QUEUED, now, RUNNING, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, payload, attempts, max_attempts, last_error = row
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, "
+                    "worker_id = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, now + lease, worker_id, now, job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return Job(job_id, job_type, json.loads(payload), attempts + 1, max_attempts, last_error)
+
+    def extend_lease(self, job_id: str, worker_id: str, lease: float = JOB_LEASE_SECONDS) -> bool:
+        """Returns False when the job is no longer ours (its lease expired and it was reclaimed)."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + lease, now, job_id, worker_id, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str):
+        self._finish(job_id, DONE, None)
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Records a failed attempt. Returns True when the job was scheduled for
+        a retry, False when it is out of attempts and marked failed.
+        """
+        if job.exhausted:
+            self._finish(job.id, FAILED, error)
+            return False
+        delay = min(JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1), JOB_RETRY_BACKOFF_MAX)
+        delay *= random.uniform(0.8, 1.2)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, lease_expires_at = NULL, worker_id = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (QUEUED, now + delay, error, now, job.id),
+            )
+        return True
+
+    def mark_failed(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, error)
+
+    def release(self, job_id: str):
+        """Hands a job back without counting the attempt (used on shutdown)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), run_after = ?, "
+                "lease_expires_at = NULL, worker_id = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                (QUEUED, now, now, job_id, RUNNING),
+            )
+
+    def _finish(self, job_id: str, status: str, error: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_expires_at = NULL, last_error = ?, updated_at = ? WHERE id = ?",
+                (status, error, now, job_id),
+            )
+
+    def purge(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_type, status, COUNT(*), MIN(CASE WHEN status = ? THEN created_at END) "
+                "FROM jobs GROUP BY job_type, status",
+                (QUEUED,),
+            ).fetchall()
+        stats: Dict[str, dict] = {}
+        for job_type, status, count, oldest_queued in rows:
+            entry = stats.setdefault(job_type, {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0})
+            entry[status] = count
+            if oldest_queued is not None:
+                entry["oldest_queued_seconds"] = round(now - oldest_queued, 1)
+        return stats
+
+
+JobHandler = Callable[[dict], Awaitable[Any]]
+FailureHook = Callable[[dict, str], Awaitable[Any]]
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: JobHandler
+    on_failure: Optional[FailureHook] = None
+    max_attempts: int = JOB_MAX_ATTEMPTS
+
+
+# job type name -> JobType, filled by @job_handler in the feature modules
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def job_handler(name: str, on_failure: Optional[FailureHook] = None, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """
+    Registers an async handler for a job type. The handler receives the job
+    payload and raises to request a retry; ``on_failure`` runs once the last
+    attempt has failed.
+    """
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_TYPES[name] = JobType(name, handler, on_failure, max_attempts)
+        return handler
+    return decorator
+
+
+def _parse_concurrency(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class JobWorker:
+    """
+    Runs registered job handlers with a fixed number of concurrent jobs per
+    job type. Leases are renewed while a handler runs; on shutdown, jobs that
+    are still running are handed back to the queue.
+    """
+
+    def __init__(self, queue: JobQueue, job_types: Optional[Iterable[str]] = None,
+                 concurrency: Optional[Dict[str, int]] = None):
+        self.queue = queue
+        self.job_types = list(job_types) if job_types is not None else list(JOB_TYPES)
+        self.concurrency = {**_parse_concurrency(JOB_CONCURRENCY), **(concurrency or {})}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        for name in self.job_types:
+            if name not in JOB_TYPES:
+                raise ValueError(f"No handler registered for job type '{name}'")
+            slots = self.concurrency.get(name, JOB_DEFAULT_CONCURRENCY)
+            self._tasks.append(asyncio.create_task(self._poll(name, slots)))
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+        logger.info(f"Job worker {self.worker_id} started for {self.job_types}")
+
+    def add_job_types(self, job_types: Iterable[str]):
+        """Starts polling job types whose handlers registered after start() (lazily loaded features)."""
+        for name in job_types:
+            if name in self.job_types:
+                continue
+            if name not in JOB_TYPES:
+                raise ValueError(f"No handler registered for job type '{name}'")
+            self.job_types.append(name)
+            if self._tasks and not self._stopping:
+                slots = self.concurrency.get(name, JOB_DEFAULT_CONCURRENCY)
+                self._tasks.append(asyncio.create_task(self._poll(name, slots)))
+                logger.info(f"Job worker {self.worker_id} now also runs {name}")
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._running.values(), return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self):
+        self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def _poll(self, name: str, slots: int):
+        semaphore = asyncio.Semaphore(slots)
+        while not self._stopping:
+            await semaphore.acquire()
+            try:
+                job = await asyncio.to_thread(self.queue.claim, name, self.worker_id)
+            except Exception as e:
+                logger.error(f"Could not claim a '{name}' job: {e}")
+                job = None
+            if job is None:
+                semaphore.release()
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+            task = asyncio.create_task(self._run(job))
+            self._running[job.id] = task
+            task.add_done_callback(lambda _, job_id=job.id: (self._running.pop(job_id, None), semaphore.release()))
+
+    async def _run(self, job: Job):
+        job_type = JOB_TYPES[job.job_type]
+        # Tokens the job spends are billed to the user whose request enqueued it
+        owner = job.payload.pop(USAGE_OWNER_KEY, None)
+        usage_owner.set(tuple(owner) if owner else None)
+        if job.attempts > job.max_attempts:
+            # Redelivered after its last lease expired: the worker died on the final attempt
+            error = job.last_error or "lease expired"
+            await asyncio.to_thread(self.queue.mark_failed, job.id, error)
+            await self._give_up(job, job_type, error)
+            return
+
+        heartbeat = asyncio.create_task(self._renew_lease(job))
+        # Stage timings inside the handler are labelled with the job type
+        current_route.set(f"job:{job.job_type}")
+        outcome = "error"
+        started = time.perf_counter()
+        try:
+            await job_type.handler(job.payload)
+            outcome = "done"
+        except asyncio.CancelledError:
+            if self._stopping:
+                await asyncio.to_thread(self.queue.release, job.id)
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.warning(f"Job {job.id} ({job.job_type}) attempt {job.attempts}/{job.max_attempts} failed: {error}")
+            if await asyncio.to_thread(self.queue.fail, job, error):
+                self.retried += 1
+            else:
+                await self._give_up(job, job_type, error)
+            return
+        finally:
+            heartbeat.cancel()
+            job_duration.observe(time.perf_counter() - started, job_type=job.job_type, outcome=outcome)
+
+        await asyncio.to_thread(self.queue.complete, job.id)
+        self.processed += 1
+
+    async def _give_up(self, job: Job, job_type: JobType, error: str):
+        self.failed += 1
+        logger.error(f"Job {job.id} ({job.job_type}) failed permanently: {error}")
+        if job_type.on_failure is not None:
+            try:
+                await job_type.on_failure(job.payload, error)
+            except Exception as e:
+                logger.error(f"Failure hook for job {job.id} raised: {e}")
+
+    async def _renew_lease(self, job: Job):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            if not await asyncio.to_thread(self.queue.extend_lease, job.id, self.worker_id):
+                logger.warning(f"Lost the lease on job {job.id}; another worker may run it again")
+                return
+
+    async def _housekeeping(self):
+        while not self._stopping:
+            try:
+                purged = await asyncio.to_thread(self.queue.purge)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            except Exception as e:
+                logger.error(f"Job purge failed: {e}")
+            await asyncio.sleep(3600)
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "job_types": self.job_types,
+            "running": len(self._running),
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+job_queue = JobQueue()
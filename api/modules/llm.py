@@ -1,6 +1,16 @@
 from langchain_core.runnables import ConfigurableField  # for later
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.runnables import ConfigurableField
+from langchain_core.runnables import ConfigurableField, Runnable, RunnableConfig
+from fastapi import HTTPException
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import asyncio
+import math
+import os
+import time
+
+from .metrics import llm_duration, llm_first_token
+from .usage import TokenUsageMeter, token_usage
 
 
 llm_with_alternatives = ChatGoogleGenerativeAI(
@@ -16,3 +26,219 @@ llm_with_alternatives = ChatGoogleGenerativeAI(
     #     description="Controls the randomness of the output. Lower values make the output more deterministic.",
     # ),
 )
+
+# Optional second API key: hedged requests go out on it so they do not share
+# the primary key's quota
+GOOGLE_API_KEY_SECONDARY = os.getenv("GOOGLE_API_KEY_SECONDARY")
+llm_secondary_key = ChatGoogleGenerativeAI(
+    model="gemini-2.0-flash",
+    google_api_key=GOOGLE_API_KEY_SECONDARY,
+).configurable_fields(
+    model=ConfigurableField(
+        id="model",
+        name="model",
+        description="The model to use for the LLM.",
+    ),
+) if GOOGLE_API_KEY_SECONDARY else None
+
+
+# --- Admission control ---
+
+# Defaults for every model: concurrent calls, waiting callers, max wait (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+# Per-model overrides, e.g. "gemini-2.5-pro=2:8:60,gemini-2.0-flash=16:64:20"
+LLM_ADMISSION_LIMITS = os.getenv("LLM_ADMISSION_LIMITS", "gemini-2.5-pro=3:12:60")
+LLM_RETRY_AFTER_DEFAULT = int(os.getenv("LLM_RETRY_AFTER_DEFAULT", "5"))
+
+
+class LLMAdmissionRejected(HTTPException):
+    """The model's wait queue is full, or the wait timed out."""
+
+    def __init__(self, model: str, reason: str, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail=f"Model '{model}' is busy ({reason}), retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.model = model
+        self.reason = reason
+
+
+class _ModelGate:
+    def __init__(self, slots: int, max_queue: int, timeout: float):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(slots)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.service_seconds_total = 0.0
+        self.completed = 0
+
+    def retry_after(self) -> int:
+        # Roughly how long until the queue ahead of a new caller drains
+        if not self.completed:
+            return LLM_RETRY_AFTER_DEFAULT
+        avg_service = self.service_seconds_total / self.completed
+        return max(1, math.ceil(avg_service * (self.waiting + 1) / self.slots))
+
+    def stats(self) -> dict:
+        return {
+            "slots": self.slots,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted_total": self.admitted,
+            "rejected_total": self.rejected,
+            "timeouts_total": self.timeouts,
+            "wait_seconds_total": round(self.wait_seconds_total, 4),
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+            "completed_total": self.completed,
+            "service_seconds_total": round(self.service_seconds_total, 4),
+        }
+
+
+def _parse_limits(spec: str) -> Dict[str, tuple]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        slots, queue, timeout = (values.split(":") + ["", "", ""])[:3]
+        limits[model.strip()] = (
+            int(slots or LLM_MAX_CONCURRENCY),
+            int(queue or LLM_MAX_QUEUE),
+            float(timeout or LLM_QUEUE_TIMEOUT),
+        )
+    return limits
+
+
+class ModelAdmissionController:
+    """
+    Per-model concurrency slots with a bounded wait queue.
+
+    Callers beyond the slot count wait (up to the queue timeout); once the
+    queue is full, new callers are rejected immediately with a 429 and a
+    Retry-After estimate instead of piling onto the provider quota.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, tuple]] = None):
+        self.limits = limits or {}
+        self._gates: Dict[str, _ModelGate] = {}
+
+    def gate(self, model: str) -> _ModelGate:
+        gate = self._gates.get(model)
+        if gate is None:
+            slots, max_queue, timeout = self.limits.get(
+                model, (LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+            )
+            gate = self._gates[model] = _ModelGate(slots, max_queue, timeout)
+        return gate
+
+    @asynccontextmanager
+    async def admit(self, model: str):
+        gate = self.gate(model)
+        if not gate.semaphore.locked():
+            # A slot is free: acquire() returns without suspending
+            await gate.semaphore.acquire()
+        else:
+            if gate.waiting >= gate.max_queue:
+                gate.rejected += 1
+                raise LLMAdmissionRejected(model, "queue full", gate.retry_after())
+
+            gate.waiting += 1
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(gate.semaphore.acquire(), timeout=gate.timeout)
+            except asyncio.TimeoutError:
+                gate.timeouts += 1
+                gate.rejected += 1
+                raise LLMAdmissionRejected(model, "queue wait timed out", gate.retry_after())
+            finally:
+                gate.waiting -= 1
+                waited = time.monotonic() - started
+                gate.wait_seconds_total += waited
+                gate.wait_seconds_max = max(gate.wait_seconds_max, waited)
+
+        gate.admitted += 1
+        gate.in_flight += 1
+        service_started = time.monotonic()
+        try:
+            yield
+        finally:
+            gate.in_flight -= 1
+            gate.completed += 1
+            gate.service_seconds_total += time.monotonic() - service_started
+            gate.semaphore.release()
+
+    def stats(self) -> dict:
+        return {model: gate.stats() for model, gate in self._gates.items()}
+
+
+admission_controller = ModelAdmissionController(_parse_limits(LLM_ADMISSION_LIMITS))
+
+
+class AdmittedModel(Runnable):
+    """
+    Runs a model step through the admission controller. The slot is held for
+    the whole call, including the full duration of a stream. Token usage of
+    async calls is recorded against the current feature and user.
+    """
+
+    def __init__(
+        self, llm: Runnable, model: str, controller: ModelAdmissionController = admission_controller,
+        usage: TokenUsageMeter = token_usage,
+    ):
+        self.llm = llm
+        self.model = model
+        self.controller = controller
+        self.usage = usage
+
+    @property
+    def InputType(self):
+        return self.llm.InputType
+
+    @property
+    def OutputType(self):
+        return self.llm.OutputType
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        # Sync callers bypass admission: slots are asyncio primitives
+        return self.llm.invoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[Any]:
+        yield from self.llm.stream(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        async with self.controller.admit(self.model):
+            with llm_duration.time(model=self.model, mode="invoke"):
+                message = await self.llm.ainvoke(input, config, **kwargs)
+        self.usage.record(self.model, getattr(message, "usage_metadata", None))
+        return message
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[Any]:
+        async with self.controller.admit(self.model):
+            started = time.perf_counter()
+            first = True
+            # Chunks carry per-chunk usage deltas (as AIMessageChunk addition assumes)
+            prompt_tokens = completion_tokens = 0
+            try:
+                async for chunk in self.llm.astream(input, config, **kwargs):
+                    if first:
+                        llm_first_token.observe(time.perf_counter() - started, model=self.model)
+                        first = False
+                    usage = getattr(chunk, "usage_metadata", None)
+                    if usage:
+                        prompt_tokens += usage.get("input_tokens") or 0
+                        completion_tokens += usage.get("output_tokens") or 0
+                    yield chunk
+            finally:
+                llm_duration.observe(time.perf_counter() - started, model=self.model, mode="stream")
+                if prompt_tokens or completion_tokens:
+                    self.usage.record(self.model, {"input_tokens": prompt_tokens, "output_tokens": completion_tokens})
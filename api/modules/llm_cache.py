@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from .cache import MemoryLRUCache, SQLiteCache, TieredCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_MAX_ENTRIES", "512"))
+LLM_CACHE_MEMORY_MAX_BYTES = int(os.getenv("LLM_CACHE_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+LLM_CACHE_MEMORY_TTL = float(os.getenv("LLM_CACHE_MEMORY_TTL", "3600"))
+# Empty path disables the disk tier
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "cache/llm_cache.sqlite3")
+LLM_CACHE_SQLITE_MAX_BYTES = int(os.getenv("LLM_CACHE_SQLITE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_SQLITE_TTL = float(os.getenv("LLM_CACHE_SQLITE_TTL", str(24 * 3600)))
+
+
+def prompt_fingerprint(prompt) -> str:
+    """Stable hash of a prompt's template(s), used as its implicit version."""
+    try:
+        serialized = json.dumps(prompt.to_json(), sort_keys=True, default=str)
+    except Exception:
+        serialized = repr(prompt)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize(value: Any) -> Any:
+    # Line endings and trailing whitespace never change what the model sees in
+    # a meaningful way; indentation does (YAML), so it is kept.
+    if isinstance(value, str):
+        lines = value.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_cache_key(prompt_version: str, model: str, inputs: Any) -> str:
+    """Cache key from the prompt version, model and normalized chain inputs."""
+    payload = json.dumps(
+        {"prompt": prompt_version, "model": model, "inputs": _normalize(inputs)},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache for final chain outputs, on top of a TieredCache.
+    Keeps its own hit/miss counters for the stats endpoint.
+    """
+
+    def __init__(self, backend: TieredCache):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+
+    async def lookup(self, key: str):
+        value = await self.backend.aget(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def lookup_sync(self, key: str):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def update(self, key: str, value: Any, validator: Optional[Callable[[Any], bool]] = None):
+        if value is None or value == "":
+            return
+        # Validators may repair malformed YAML, which is too slow for the event loop
+        if validator is not None and not await asyncio.to_thread(validator, value):
+            self.rejected += 1
+            return
+        await self.backend.aset(key, value)
+        self.stores += 1
+
+    def update_sync(self, key: str, value: Any, validator: Optional[Callable[[Any], bool]] = None):
+        if not self._accept(value, validator):
+            return
+        self.backend.set(key, value)
+        self.stores += 1
+
+    def _accept(self, value, validator) -> bool:
+        if value is None or value == "":
+            return False
+        if validator is not None and not validator(value):
+            # Never pin a broken generation; the next call should re-ask the model
+            self.rejected += 1
+            return False
+        return True
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "stores": self.stores,
+            "rejected": self.rejected,
+            "backend": self.backend.stats(),
+        }
+
+
+class CachedRunnable(Runnable):
+    """
+    Wraps a chain so identical (prompt version, model, inputs) calls are served
+    from an LLMResponseCache. Streaming replays a hit as a single chunk and
+    stores the concatenated stream on a miss.
+
+    Pass ``config={"metadata": {"llm_cache": "refresh"}}`` to skip the lookup
+    for one call (the fresh result is still stored).
+    """
+
+    def __init__(self, chain: Runnable, cache: LLMResponseCache, prompt_version: str, model: str,
+                 validator: Optional[Callable[[Any], bool]] = None):
+        self.chain = chain
+        self.cache = cache
+        self.prompt_version = prompt_version
+        self.model = model
+        self.validator = validator
+
+    @property
+    def InputType(self):
+        return self.chain.InputType
+
+    @property
+    def OutputType(self):
+        return self.chain.OutputType
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None):
+        return self.chain.get_input_schema(config)
+
+    def get_output_schema(self, config: Optional[RunnableConfig] = None):
+        return self.chain.get_output_schema(config)
+
+    def _key(self, input: Any) -> str:
+        return make_cache_key(self.prompt_version, self.model, input)
+
+    @staticmethod
+    def _refresh_requested(config: Optional[RunnableConfig]) -> bool:
+        return bool(config) and (config.get("metadata") or {}).get("llm_cache") == "refresh"
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        key = self._key(input)
+        if not self._refresh_requested(config):
+            cached = self.cache.lookup_sync(key)
+            if cached is not None:
+                return cached
+        result = self.chain.invoke(input, config, **kwargs)
+        self.cache.update_sync(key, result, self.validator)
+        return result
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        key = self._key(input)
+        if not self._refresh_requested(config):
+            cached = await self.cache.lookup(key)
+            if cached is not None:
+                return cached
+        result = await self.chain.ainvoke(input, config, **kwargs)
+        await self.cache.update(key, result, self.validator)
+        return result
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[Any]:
+        key = self._key(input)
+        if not self._refresh_requested(config):
+            cached = self.cache.lookup_sync(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        for chunk in self.chain.stream(input, config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks and all(isinstance(c, str) for c in chunks):
+            self.cache.update_sync(key, "".join(chunks), self.validator)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[Any]:
+        key = self._key(input)
+        if not self._refresh_requested(config):
+            cached = await self.cache.lookup(key)
+            if cached is not None:
+                yield cached
+                return
+        chunks = []
+        async for chunk in self.chain.astream(input, config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        if chunks and all(isinstance(c, str) for c in chunks):
+            await self.cache.update(key, "".join(chunks), self.validator)
+
+
+def _build_default_cache() -> Optional[LLMResponseCache]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    disk_tier = None
+    if LLM_CACHE_SQLITE_PATH:
+        try:
+            disk_tier = SQLiteCache(
+                LLM_CACHE_SQLITE_PATH,
+                max_bytes=LLM_CACHE_SQLITE_MAX_BYTES,
+                ttl=LLM_CACHE_SQLITE_TTL,
+                table="llm_responses",
+            )
+        except Exception as e:
+            logger.warning(f"LLM cache disk tier unavailable, using memory only: {e}")
+    memory_tier = MemoryLRUCache(
+        max_entries=LLM_CACHE_MEMORY_MAX_ENTRIES,
+        max_bytes=LLM_CACHE_MEMORY_MAX_BYTES,
+        ttl=LLM_CACHE_MEMORY_TTL,
+    )
+    return LLMResponseCache(TieredCache(memory_tier, disk_tier))
+
+
+# Shared default cache used by BaseChain
+llm_cache = _build_default_cache()
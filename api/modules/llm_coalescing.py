@@ -0,0 +1,61 @@
+import os
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from .llm_cache import make_cache_key
+from .singleflight import SingleFlight
+
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "1") == "1"
+
+# Shared by every chain: keys already carry the prompt version and model
+llm_flights = SingleFlight("llm")
+
+
+class CoalescedRunnable(Runnable):
+    """
+    Wraps a chain so concurrent ``ainvoke`` calls with the same (prompt
+    version, model, normalized inputs) share one upstream call, e.g. a
+    double-click or a client retry while the first request is still running.
+
+    Unlike the response cache nothing is kept once the call finishes. The
+    shared call runs with the first caller's config, and is cancelled only
+    when every caller waiting on it has gone. Calls asking for
+    ``{"llm_cache": "refresh"}`` and streaming go straight to the chain.
+    """
+
+    def __init__(self, chain: Runnable, prompt_version: str, model: str, flights: SingleFlight = llm_flights):
+        self.chain = chain
+        self.prompt_version = prompt_version
+        self.model = model
+        self.flights = flights
+
+    @property
+    def InputType(self):
+        return self.chain.InputType
+
+    @property
+    def OutputType(self):
+        return self.chain.OutputType
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None):
+        return self.chain.get_input_schema(config)
+
+    def get_output_schema(self, config: Optional[RunnableConfig] = None):
+        return self.chain.get_output_schema(config)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        return self.chain.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        if config and (config.get("metadata") or {}).get("llm_cache") == "refresh":
+            return await self.chain.ainvoke(input, config, **kwargs)
+        key = make_cache_key(self.prompt_version, self.model, input)
+        return await self.flights.do(key, lambda: self.chain.ainvoke(input, config, **kwargs))
+
+    def stream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Iterator[Any]:
+        yield from self.chain.stream(input, config, **kwargs)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> AsyncIterator[Any]:
+        async for chunk in self.chain.astream(input, config, **kwargs):
+            yield chunk
@@ -0,0 +1,322 @@
+import hmac
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from fastapi import HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds; wide enough for multi-minute LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+# What stage timings are labelled with: the request's ASGI scope (resolved to its
+# route template when the stage is recorded) or a name such as "job:<type>"
+current_route: ContextVar[Union[str, dict]] = ContextVar("current_route", default="none")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+def _flatten(stats: dict, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from _flatten(value, name)
+
+
+def _metric_name(*parts: str) -> str:
+    return "_".join("".join(char if char.isalnum() else "_" for char in part) for part in parts if part)
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms rendered in the Prometheus text format,
+    plus the existing ``stats()`` dicts exported as gauges at scrape time.
+    """
+
+    def __init__(self, namespace: str = "ai"):
+        self.namespace = namespace
+        self._metrics: Dict[str, _Metric] = {}
+        self._stats: List[Tuple[str, Callable[[], Optional[dict]], Optional[str]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(_metric_name(self.namespace, name), documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(_metric_name(self.namespace, name), documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(_metric_name(self.namespace, name), documentation, labelnames, buckets))
+
+    def register_stats(self, name: str, stats: Callable[[], Optional[dict]], label: Optional[str] = None):
+        """
+        Exports the numeric values of ``stats()`` as ``<namespace>_<name>_<key>``
+        gauges. With ``label``, stats() is keyed by that label's values
+        (e.g. {model: {...}}) and every entry becomes one labelled series.
+        """
+        self._stats.append((name, stats, label))
+
+    def _render_stats(self) -> List[str]:
+        series: Dict[str, List[str]] = {}
+        for name, stats, label in self._stats:
+            try:
+                values = stats() or {}
+            except Exception as e:
+                logger.warning(f"Metrics: stats for {name} unavailable: {e!r}")
+                continue
+            entries = values.items() if label else [(None, values)]
+            for label_value, entry in entries:
+                if not isinstance(entry, dict):
+                    continue
+                for key, value in _flatten(entry):
+                    metric = _metric_name(self.namespace, name, key)
+                    labels = _labels((label,), (label_value,)) if label else ""
+                    series.setdefault(metric, []).append(f"{metric}{labels} {_format_value(value)}")
+        lines = []
+        for metric, samples in series.items():
+            lines += [f"# TYPE {metric} gauge", *samples]
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        lines += self._render_stats()
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Request latency until the last body byte, by route.", ("method", "route")
+)
+http_in_flight = metrics.gauge("http_requests_in_flight", "Requests being served, by route.", ("route",))
+stage_duration = metrics.histogram(
+    "stage_duration_seconds", "Time spent in each stage of a request or background job.", ("stage", "route")
+)
+stage_errors = metrics.counter("stage_errors_total", "Stages that raised, by stage and route.", ("stage", "route"))
+llm_duration = metrics.histogram("llm_call_duration_seconds", "LLM call duration, admission wait excluded.", ("model", "mode"))
+llm_first_token = metrics.histogram("llm_time_to_first_token_seconds", "Time to the first streamed LLM chunk.", ("model",))
+job_duration = metrics.histogram("job_duration_seconds", "Background job attempt duration.", ("job_type", "outcome"))
+
+
+def route_label() -> str:
+    route = current_route.get()
+    return route if isinstance(route, str) else MetricsMiddleware.template(route)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block as ``name`` under the current route, e.g. ``with stage("yaml_parse"): ...``."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=name, route=route_label())
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - started, stage=name, route=route_label())
+
+
+class MetricsMiddleware:
+    """
+    Records per-route request counts, latency and in-flight gauges. Routes
+    are labelled by their template (/resumes-v2/edit_section), not the raw
+    path; a streaming response is timed until its last chunk is sent.
+    """
+
+    # Raw paths whose template is known, so in-flight gauges can be labelled up front
+    MAX_LEARNED_PATHS = 2048
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Dict[Tuple[str, str], str] = {}
+
+    @staticmethod
+    def _match(scope) -> Optional[str]:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None)
+        return None
+
+    @staticmethod
+    def template(scope) -> str:
+        """The matched route's template, rebuilt from the path parameters the router extracted."""
+        if "endpoint" not in scope:
+            return "unmatched"
+        path = scope["path"]
+        for name, value in (scope.get("path_params") or {}).items():
+            head, sep, tail = path.rpartition(str(value))
+            if sep:
+                path = f"{head}{{{name}}}{tail}"
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        key = (method, scope["path"])
+        route = self._templates.get(key) or self._match(scope) or "unresolved"
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = current_route.set(scope)
+        http_in_flight.inc(route=route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(route=route)
+            template = self.template(scope)
+            if template != "unmatched" and len(self._templates) < self.MAX_LEARNED_PATHS:
+                self._templates[key] = template
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=template)
+            http_requests.inc(method=method, route=template, status=str(status["code"]))
+            current_route.reset(token)
+
+
+async def metrics_endpoint(request: Request):
+    """Prometheus scrape endpoint."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=403, detail="Invalid metrics token")
+    # Some stats read SQLite; keep them off the event loop
+    body = await run_in_threadpool(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters", "joined", "detached")
+
+    def __init__(self, task: asyncio.Task, detached: bool):
+        self.task = task
+        self.waiters = 0
+        self.joined = False  # a caller awaited it, so failures were reported there
+        self.detached = detached
+
+
+class SingleFlight:
+    """
+    Merges concurrent calls for the same key into one execution: the first
+    caller starts ``fn()``, later callers await the same task and get the same
+    result or exception.
+
+    The shared task is cancelled only when every caller waiting on it has been
+    cancelled. Work started with ``start`` (e.g. a background refresh) runs to
+    completion whether or not anyone waits for it.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.shared = 0
+        self.cancelled = 0
+
+    def _join(self, key: Hashable, fn: Callable[[], Awaitable[Any]], detached: bool) -> _Call:
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+            call.detached = call.detached or detached
+            return call
+
+        call = _Call(asyncio.ensure_future(fn()), detached)
+        self._calls[key] = call
+        self.started += 1
+
+        def _done(task: asyncio.Task):
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            if not task.cancelled() and task.exception() is not None and call.detached and not call.joined:
+                logger.warning(f"{self.name}: background call for {key!r} failed: {task.exception()!r}")
+
+        call.task.add_done_callback(_done)
+        return call
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], detach: bool = False) -> Any:
+        """
+        Runs ``fn()`` unless a call for ``key`` is already in flight, and
+        returns its result. With ``detach`` the call keeps running even when
+        every caller has gone, e.g. when its work cannot be interrupted anyway.
+        """
+        call = self._join(key, fn, detached=detach)
+        call.waiters += 1
+        call.joined = True
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.detached and not call.task.done():
+                # Every caller went away; nobody needs the result any more
+                call.task.cancel()
+                self.cancelled += 1
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Starts ``fn()`` in the background unless a call for ``key`` is already in flight."""
+        return self._join(key, fn, detached=True).task
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "shared": self.shared,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,13 @@
+import json
+from typing import Any
+
+# Keep proxies (nginx) from buffering the stream and browsers from caching it
+STREAMING_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .http_client import get_django_client
+from .metrics import metrics, route_label
+
+logger = logging.getLogger(__name__)
+
+# Per-user token totals are reported to Django's UsageRecord this often (seconds); 0 disables reporting
+LLM_USAGE_REPORT_INTERVAL = float(os.getenv("LLM_USAGE_REPORT_INTERVAL", "60"))
+# USD per million prompt:completion tokens, e.g. "gemini-2.5-pro=1.25:10"
+LLM_TOKEN_PRICES = os.getenv(
+    "LLM_TOKEN_PRICES", "gemini-2.0-flash=0.10:0.40,gemini-2.5-flash=0.30:2.50,gemini-2.5-pro=1.25:10"
+)
+# Unreported (user, feature) totals kept while Django is unreachable
+LLM_USAGE_MAX_PENDING = int(os.getenv("LLM_USAGE_MAX_PENDING", "10000"))
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+# Who LLM calls are billed to: (user_id, feature), set by the auth dependency
+# and carried into background jobs by the job queue
+usage_owner: ContextVar[Optional[Tuple[int, str]]] = ContextVar("usage_owner", default=None)
+
+llm_tokens = metrics.counter("llm_tokens_total", "LLM tokens by feature, route, model and kind.", ("feature", "route", "model", "kind"))
+llm_cost = metrics.counter("llm_cost_usd_total", "Estimated LLM spend in USD by feature and model.", ("feature", "model"))
+
+
+def _parse_prices(spec: str) -> Dict[str, Tuple[float, float]]:
+    prices = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        prompt, _, completion = values.partition(":")
+        prices[model.strip()] = (float(prompt or 0), float(completion or 0))
+    return prices
+
+
+class TokenUsageMeter:
+    """
+    Counts the prompt and completion tokens of every model call, exported on
+    /metrics by feature, route and model, and sums them per (user, feature)
+    until the next report to Django. Calls without an owner (no auth, e.g.
+    the langserve playground) only show up in the metrics.
+    """
+
+    def __init__(self, prices: Dict[str, Tuple[float, float]]):
+        self.prices = prices
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[int, str], list] = {}
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.reports = 0
+        self.report_failures = 0
+        self.dropped = 0
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        # Hedged calls on the secondary key are labelled "<model>@secondary"
+        prompt_price, completion_price = self.prices.get(model.partition("@")[0], (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record(self, model: str, usage: Optional[Dict[str, Any]]):
+        """Records the ``usage_metadata`` of one model response (summed over chunks for streams)."""
+        if not usage:
+            return
+        prompt_tokens = int(usage.get("input_tokens") or 0)
+        completion_tokens = int(usage.get("output_tokens") or 0)
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        owner = usage_owner.get()
+        feature = owner[1] if owner else "unattributed"
+        route = route_label()
+
+        llm_tokens.inc(prompt_tokens, feature=feature, route=route, model=model, kind="prompt")
+        llm_tokens.inc(completion_tokens, feature=feature, route=route, model=model, kind="completion")
+        llm_cost.inc(cost, feature=feature, model=model)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            if owner is not None and LLM_USAGE_REPORT_INTERVAL > 0:
+                self._add_pending(owner, [prompt_tokens, completion_tokens, cost, 1])
+
+    def _add_pending(self, owner: Tuple[int, str], values: list):
+        entry = self._pending.get(owner)
+        if entry is None:
+            if len(self._pending) >= LLM_USAGE_MAX_PENDING:
+                self.dropped += 1
+                return
+            self._pending[owner] = list(values)
+        else:
+            for index, value in enumerate(values):
+                entry[index] += value
+
+    async def report(self) -> int:
+        """Sends the pending totals to Django; they are kept for the next report if that fails."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        records = [
+            {
+                "user_id": user_id,
+                "feature": feature,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cost_usd": round(cost, 6),
+                "calls": calls,
+            }
+            for (user_id, feature), (prompt_tokens, completion_tokens, cost, calls) in pending.items()
+        ]
+        try:
+            response = await get_django_client().post(
+                "/api/usage/tokens/",
+                headers={"X-Internal-Token": INTERNAL_API_KEY or ""},
+                json={"records": records},
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not report token usage for {len(records)} users to Django: {e!r}")
+            with self._lock:
+                self.report_failures += 1
+                for owner, values in pending.items():
+                    self._add_pending(owner, values)
+            return 0
+        self.reports += 1
+        return len(records)
+
+    async def run_reporter(self):
+        """Reports on an interval until cancelled, then once more for what is left."""
+        try:
+            while True:
+                await asyncio.sleep(LLM_USAGE_REPORT_INTERVAL)
+                await self.report()
+        except asyncio.CancelledError:
+            await self.report()
+            raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls_total": self.calls,
+                "prompt_tokens_total": self.prompt_tokens,
+                "completion_tokens_total": self.completion_tokens,
+                "cost_usd_total": round(self.cost_usd, 6),
+                "pending_records": len(self._pending),
+                "reports_total": self.reports,
+                "report_failures_total": self.report_failures,
+                "dropped_records_total": self.dropped,
+            }
+
+
+token_usage = TokenUsageMeter(_parse_prices(LLM_TOKEN_PRICES))
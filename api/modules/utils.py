@@ -1,57 +1,155 @@
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableLambda
-from fastapi import HTTPException, Header
-from typing import Optional
+from langchain_core.runnables import RunnableGenerator
+from fastapi import HTTPException, Header, Depends
+from typing import AsyncIterator, Iterator, Optional
 import httpx
 import os
 import logging
 import yaml
-DJANGO_API_URL = os.getenv("DJANGO_API_URL", "http://django:8000")
+from .http_client import get_django_client
+from .entitlements import decode_access_token, entitlement_cache, JWT_USER_ID_CLAIM
+from .yaml_repair import aload_yaml, load_yaml
+from .metrics import stage
+from .usage import usage_owner
 
-clean_yaml_parser = StrOutputParser() | RunnableLambda(
-    lambda x: x.replace("yaml", "").replace("yml", "").replace("```", "").strip()
+def _clean_yaml_text(text: str) -> str:
+    return text.replace("yaml", "").replace("yml", "").replace("```", "")
+
+
+# Longest marker minus one: enough to catch "yaml"/"```" split across chunks
+_YAML_MARKER_HOLDBACK = 3
+
+
+def _clean_yaml_stream_step(buffer: str, started: bool):
+    """Returns (text to emit, new buffer, started) for the fence-stripping stream."""
+    cleaned = _clean_yaml_text(buffer)
+    ready, tail = cleaned[:-_YAML_MARKER_HOLDBACK], cleaned[-_YAML_MARKER_HOLDBACK:]
+    if not started:
+        ready = ready.lstrip()
+    # Hold trailing whitespace back so the end of the stream can still be stripped
+    emit = ready.rstrip()
+    return emit, ready[len(emit):] + tail, started or bool(emit)
+
+
+def _clean_yaml_stream_end(buffer: str, started: bool) -> str:
+    cleaned = _clean_yaml_text(buffer)
+    return cleaned.strip() if not started else cleaned.rstrip()
+
+
+def _clean_yaml_transform(chunks: Iterator[str]) -> Iterator[str]:
+    buffer, started = "", False
+    for chunk in chunks:
+        emit, buffer, started = _clean_yaml_stream_step(buffer + chunk, started)
+        if emit:
+            yield emit
+    last = _clean_yaml_stream_end(buffer, started)
+    if last or not started:
+        yield last
+
+
+async def _aclean_yaml_transform(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    buffer, started = "", False
+    async for chunk in chunks:
+        emit, buffer, started = _clean_yaml_stream_step(buffer + chunk, started)
+        if emit:
+            yield emit
+    last = _clean_yaml_stream_end(buffer, started)
+    if last or not started:
+        yield last
+
+
+# Strips code fences / "yaml" markers; a generator so tokens still stream through it
+clean_yaml_parser = StrOutputParser() | RunnableGenerator(
+    _clean_yaml_transform, _aclean_yaml_transform
 )
 
 
 
 
-async def verify_user_and_limits(feature: str, authorization: Optional[str] = Header(None)):
+async def verify_user_and_limits(
+    feature: str,
+    authorization: Optional[str] = Header(None),
+    client: Optional[httpx.AsyncClient] = None,
+):
     """Call Django service to verify user and check limits for a specific feature"""
     if not authorization:
         raise HTTPException(status_code=401, detail="No authorization header")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Call Django API to verify token and check limits
-            response = await client.get(
-                f"{DJANGO_API_URL}/accounts/verify-and-check-limits/",
-                headers={"Authorization": authorization},
-                params={"feature": feature},
-            )
-
-            if response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            elif response.status_code == 429:
-                raise HTTPException(status_code=429, detail="Feature limit exceeded")
-            elif response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Auth service error")
+    client = client or get_django_client()
+    try:
+        # Call Django API to verify token and check limits
+        response = await client.get(
+            "/accounts/verify-and-check-limits/",
+            headers={"Authorization": authorization},
+            params={"feature": feature},
+        )
+
+        if response.status_code == 401:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        elif response.status_code == 429:
+            raise HTTPException(status_code=429, detail="Feature limit exceeded")
+        elif response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Auth service error")
+
+        return response.json()  # Returns user info and limits
+
+    except httpx.RequestError:
+        raise HTTPException(status_code=500, detail="Cannot reach auth service")
+
+async def get_cached_entitlements(feature: str, authorization: str, client: httpx.AsyncClient):
+    """
+    Verify the access token locally and serve plan limits from the entitlement cache.
 
-            return response.json()  # Returns user info and limits
+    Django is only called on a cache miss (or when local verification is disabled).
+    """
+    claims = decode_access_token(authorization)
+    if claims is None:
+        return await verify_user_and_limits(feature, authorization, client)
 
-        except httpx.RequestError:
-            raise HTTPException(status_code=500, detail="Cannot reach auth service")
+    user_id = claims[JWT_USER_ID_CLAIM]
+    snapshot = entitlement_cache.get(user_id, feature)
+    if snapshot is None:
+        try:
+            snapshot = await verify_user_and_limits(feature, authorization, client)
+        except HTTPException as e:
+            if e.status_code == 429:
+                # Remember exhausted limits too, Django invalidates on plan/usage changes
+                entitlement_cache.set(user_id, feature, {"user_id": user_id, "limit_exceeded": True})
+            raise
+        entitlement_cache.set(user_id, feature, snapshot)
+
+    if snapshot.get("limit_exceeded"):
+        raise HTTPException(status_code=429, detail="Feature limit exceeded")
+    return snapshot
 
 # Dependency factory function
 def create_auth_dependency(feature_name: str):
     """Factory function to create feature-specific auth dependencies"""
-    async def verify_auth(authorization: str = Header(...)):
-        auth_data = await verify_user_and_limits(feature_name, authorization)
+    async def verify_auth(
+        authorization: str = Header(...),
+        client: httpx.AsyncClient = Depends(get_django_client),
+    ):
+        with stage("auth"):
+            auth_data = await get_cached_entitlements(feature_name, authorization, client)
         # Include authorization in the returned data for convenience
         auth_data["authorization"] = authorization
+        # LLM tokens spent serving this request are billed to this user and feature
+        usage_owner.set((auth_data["user_id"], feature_name))
         return auth_data
     return verify_auth
 
 
+async def report_task_failure(payload: dict, error: str):
+    """
+    Job failure hook: marks the Django task of a generation job (payload
+    carries its ``task_id``) as FAILURE once every attempt has failed.
+    """
+    client = get_django_client()
+    await client.post(
+        "/api/update-task/",
+        json={"task_id": payload["task_id"], "status": "FAILURE", "error": error},
+    )
+
 
 # --- Centralized YAML Parser ---
 
@@ -61,27 +159,33 @@ handler = logging.FileHandler('yaml_parsing_errors.log')
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 handler.setFormatter(formatter)
 yaml_error_logger.addHandler(handler)
-yaml_error_logger.setLevel(logging.ERROR)
+# WARNING also keeps locally repaired outputs, the repair regression corpus
+yaml_error_logger.setLevel(logging.WARNING)
 
 
 
 def safe_load_yaml_with_logging(yaml_string: str):
     """
     Cleans and safely loads a YAML string, preserving order.
-    Logs any parsing errors to a file.
+    Malformed output is repaired locally when possible (modules/yaml_repair.py);
+    repairs and failures are logged to a file.
     """
-    if not isinstance(yaml_string, str):
-        raise yaml.YAMLError("Invalid input: Not a string.")
+    # Raises the original parse error to be handled by the caller (e.g., for retries)
+    with stage("yaml_parse"):
+        return load_yaml(yaml_string)
+
 
-    # Clean the string from markdown code blocks
-    cleaned_yaml = yaml_string.strip().replace("```yaml", "").replace("```", "").strip()
-    
+async def asafe_load_yaml_with_logging(yaml_string: str):
+    """``safe_load_yaml_with_logging`` for async handlers and jobs: a repair runs in a thread."""
+    with stage("yaml_parse"):
+        return await aload_yaml(yaml_string)
+
+
+def is_valid_yaml(yaml_string: str) -> bool:
+    """True if the string parses, after local repair, to a YAML mapping or list (used to gate the LLM cache)."""
+    if not isinstance(yaml_string, str):
+        return False
     try:
-        # yaml.safe_load preserves order by default
-        return yaml.safe_load(cleaned_yaml)
-    except yaml.YAMLError as e:
-        # Log the error with the problematic YAML content
-        error_message = f"Failed to parse YAML.\nError: {e}\nContent:\n---\n{cleaned_yaml}\n---"
-        yaml_error_logger.error(error_message)
-        # Re-raise the exception to be handled by the caller (e.g., for retries)
-        raise
+        return isinstance(load_yaml(yaml_string, record=False), (dict, list))
+    except yaml.YAMLError:
+        return False
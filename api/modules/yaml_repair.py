@@ -0,0 +1,318 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import yaml
+
+# Same logger as modules.utils, so repairs land in yaml_parsing_errors.log too
+# and the log keeps serving as the repair regression corpus
+yaml_error_logger = logging.getLogger("yaml_parser")
+
+_FENCE = re.compile(r"^```[\w-]*\s*$")
+_DOC_START = re.compile(r"^(?:[\w\-\"'][^:]*:(?:\s|$)|- |-$|---|#)")
+_KEY_VALUE = re.compile(r"^(?P<lead>\s*(?:- )?)(?P<key>[^\s:#'\"\-][^:#]*?):[ \t]+(?P<value>\S.*?)\s*$")
+_LIST_ITEM = re.compile(r"^(?P<lead>\s*- )(?P<value>\S.*?)\s*$")
+# Markdown / prose lines an LLM wraps around the document
+_PROSE = re.compile(r"^[A-Z][^:]*[.!?]$|^\*\*|^#{1,6} ")
+
+MAX_REPAIR_STEPS = 50
+# Every candidate fix is a full re-parse, so the search is also bounded by time and input size
+YAML_REPAIR_MAX_SECONDS = float(os.getenv("YAML_REPAIR_MAX_SECONDS", "1.0"))
+YAML_REPAIR_MAX_CHARS = int(os.getenv("YAML_REPAIR_MAX_CHARS", "60000"))
+# Repair outcomes remembered per output, so the LLM cache validator and the
+# route or job parsing the same output share one repair
+YAML_REPAIR_MEMO_SIZE = 64
+
+
+class YamlRepairStats:
+    """Counts clean parses, local repairs and the outputs that still had to be re-asked."""
+
+    def __init__(self):
+        self.clean = 0
+        self.repaired = 0
+        self.failed = 0
+        self.reasked = 0
+        self.timeouts = 0
+        self.too_large = 0
+        self.fixes = {}
+
+    def record_repair(self, fixes: List[str]):
+        self.repaired += 1
+        for fix in fixes:
+            self.fixes[fix] = self.fixes.get(fix, 0) + 1
+
+    def stats(self) -> dict:
+        total = self.clean + self.repaired + self.failed
+        return {
+            "clean": self.clean,
+            "repaired": self.repaired,
+            "failed": self.failed,
+            "reasked": self.reasked,
+            "timeouts": self.timeouts,
+            "too_large": self.too_large,
+            "repair_ratio": round(self.repaired / (self.repaired + self.failed), 4) if self.repaired + self.failed else 0.0,
+            "parsed_total": total,
+            "fixes": dict(self.fixes),
+        }
+
+
+yaml_repair_stats = YamlRepairStats()
+
+
+def strip_fences(text: str) -> str:
+    """Removes markdown code fences, a bare 'yaml' label and prose around the document."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    fences = [index for index, line in enumerate(lines) if _FENCE.match(line.strip()) and not line.startswith(" ")]
+    if len(fences) >= 2:
+        lines = lines[fences[0] + 1:fences[-1]]
+    elif len(fences) == 1:
+        index = fences[0]
+        # An opening fence with no closing one, or a stray closing fence
+        lines = lines[index + 1:] if index < len(lines) / 2 else lines[:index]
+
+    while lines and (not lines[0].strip() or lines[0].strip() in ("yaml", "yml")):
+        lines.pop(0)
+    # Leading prose ("Here is the updated section:") before the first key
+    while lines and not lines[0].startswith((" ", "\t")) and not _DOC_START.match(lines[0]):
+        lines.pop(0)
+    return "\n".join(lines).strip("\n")
+
+
+def _error_line(text: str) -> Optional[int]:
+    """Line of the first parse error, or None when the text parses."""
+    try:
+        yaml.safe_load(text)
+        return None
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        return mark.line if mark is not None else 0
+    except yaml.YAMLError:
+        return 0
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _quote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        value = value[1:-1]
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _quote_value(lines: List[str], target: int) -> Optional[List[str]]:
+    """key: value with a colon, '#', a stray quote or a reserved first character -> key: "value"."""
+    match = _KEY_VALUE.match(lines[target])
+    if match is None:
+        return None
+    value = match.group("value")
+    if value[0] in "|>[{&*!" or (value[0] in "\"'" and value.count(value[0]) == 2 and value[-1] == value[0]):
+        return None
+    fixed = f"{match.group('lead')}{match.group('key')}: {_quote(value)}"
+    return lines[:target] + [fixed] + lines[target + 1:]
+
+
+def _quote_list_item(lines: List[str], target: int) -> Optional[List[str]]:
+    match = _LIST_ITEM.match(lines[target])
+    if match is None or match.group("value")[0] in "|>[{":
+        return None
+    fixed = f"{match.group('lead')}{_quote(match.group('value'))}"
+    return lines[:target] + [fixed] + lines[target + 1:]
+
+
+def _reindent(lines: List[str], target: int, indent: int) -> List[str]:
+    """Moves a line, and the lines nested under it, to a new indentation."""
+    current = _indent(lines[target])
+    delta = indent - current
+    end = target + 1
+    while end < len(lines) and (not lines[end].strip() or _indent(lines[end]) > current):
+        end += 1
+    moved = [
+        (" " * max(0, _indent(line) + delta) + line.lstrip(" ")) if line.strip() else line
+        for line in lines[target:end]
+    ]
+    return lines[:target] + moved + lines[end:]
+
+
+def _indent_candidates(lines: List[str], target: int) -> List[int]:
+    current = _indent(lines[target])
+    seen = []
+    for line in reversed(lines[max(0, target - 20):target]):
+        if line.strip():
+            for indent in (_indent(line), _indent(line) + 2):
+                if indent != current and indent not in seen:
+                    seen.append(indent)
+    return sorted(seen, key=lambda indent: abs(indent - current))
+
+
+def _candidates(lines: List[str], error_line: int):
+    for target in (error_line, error_line - 1):
+        # A top-level prose line ("I hope this helps.") is never part of the document
+        if 0 <= target < len(lines) and _indent(lines[target]) == 0 and _PROSE.match(lines[target].strip()):
+            yield "drop_stray_text", lines[:target] + lines[target + 1:]
+    for target in (error_line, error_line - 1):
+        if not 0 <= target < len(lines) or not lines[target].strip():
+            continue
+        for name, fix in (("quote_value", _quote_value), ("quote_list_item", _quote_list_item)):
+            fixed = fix(lines, target)
+            if fixed is not None:
+                yield name, fixed
+    for target in (error_line, error_line - 1):
+        if not 0 <= target < len(lines) or not lines[target].strip():
+            continue
+        for indent in _indent_candidates(lines, target):
+            yield "reindent", _reindent(lines, target, indent)
+
+
+def repair_yaml(text: str) -> Tuple[str, List[str]]:
+    """
+    Deterministically repairs common LLM YAML mistakes: code fences and
+    surrounding prose, tabs, unquoted values containing ': ' or ' #', and
+    lines indented one level off.
+
+    Each step fixes the line the parser reports (or the one above it) and is
+    kept only if it parses or moves the first error further down. Returns the
+    repaired text and the list of fixes applied; raises yaml.YAMLError when
+    the text cannot be repaired within MAX_REPAIR_STEPS, YAML_REPAIR_MAX_SECONDS
+    and YAML_REPAIR_MAX_CHARS.
+    """
+    if len(text) > YAML_REPAIR_MAX_CHARS:
+        yaml_repair_stats.too_large += 1
+        raise yaml.YAMLError(f"Not repairing YAML of {len(text)} characters (YAML_REPAIR_MAX_CHARS={YAML_REPAIR_MAX_CHARS})")
+    deadline = time.monotonic() + YAML_REPAIR_MAX_SECONDS
+    fixes = []
+    cleaned = strip_fences(text)
+    if cleaned != text.strip("\n"):
+        fixes.append("strip_fences")
+    if "\t" in cleaned:
+        detabbed = re.sub(r"^\t+", lambda m: "  " * len(m.group(0)), cleaned, flags=re.MULTILINE)
+        if detabbed != cleaned:
+            cleaned = detabbed
+            fixes.append("tabs")
+
+    lines = cleaned.split("\n")
+    error_line = _error_line(cleaned)
+    for _ in range(MAX_REPAIR_STEPS):
+        if error_line is None:
+            return "\n".join(lines), fixes
+        best = None
+        for name, candidate in _candidates(lines, error_line):
+            if time.monotonic() > deadline:
+                yaml_repair_stats.timeouts += 1
+                raise yaml.YAMLError(f"Could not repair YAML within {YAML_REPAIR_MAX_SECONDS:g}s")
+            candidate_error = _error_line("\n".join(candidate))
+            if candidate_error is None:
+                best = (name, candidate, None)
+                break
+            if candidate_error > error_line and (best is None or candidate_error > best[2]):
+                best = (name, candidate, candidate_error)
+        if best is None:
+            break
+        name, lines, error_line = best
+        fixes.append(name)
+
+    raise yaml.YAMLError(f"Could not repair YAML (first error on line {error_line + 1 if error_line is not None else '?'})")
+
+
+class _RepairMemo:
+    """Bounded LRU of repair outcomes: (parsed, fixes) or the parse error, keyed by the output's hash."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: tuple):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_repair_memo = _RepairMemo(YAML_REPAIR_MEMO_SIZE)
+
+
+def _repair_outcome(text: str) -> tuple:
+    key = hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+    outcome = _repair_memo.get(key)
+    if outcome is None:
+        try:
+            repaired, fixes = repair_yaml(text)
+            outcome = (yaml.safe_load(repaired), fixes, None)
+        except yaml.YAMLError as error:
+            outcome = (None, None, error)
+        _repair_memo.put(key, outcome)
+    return outcome
+
+
+def load_repaired(text: str) -> Tuple[Any, List[str]]:
+    """
+    Repairs and parses malformed ``text``, returning (parsed, fixes); raises
+    yaml.YAMLError when it cannot be repaired. Shares load_yaml's memo and,
+    like it, is CPU-bound (async code runs it in a thread).
+    """
+    parsed, fixes, error = _repair_outcome(text)
+    if error is not None:
+        raise error
+    return copy.deepcopy(parsed), fixes
+
+
+def load_yaml(text: str, record: bool = True) -> Any:
+    """
+    Parses LLM-produced YAML, repairing it locally when it is malformed.
+
+    With ``record`` the outcome is counted in yaml_repair_stats and written to
+    yaml_parsing_errors.log (repairs as warnings, failures as errors). The
+    original parse error is raised when no repair works. Repair outcomes are
+    remembered per text, so validating an output and then parsing it repairs
+    it once. This is CPU-bound: async code calls it through ``aload_yaml``.
+    """
+    if not isinstance(text, str):
+        raise yaml.YAMLError("Invalid input: Not a string.")
+
+    cleaned = text.strip().replace("```yaml", "").replace("```", "").strip()
+    try:
+        result = yaml.safe_load(cleaned)
+        if record:
+            yaml_repair_stats.clean += 1
+        return result
+    except yaml.YAMLError as error:
+        original_error = error
+
+    parsed, fixes, repair_error = _repair_outcome(text)
+    if repair_error is not None:
+        if record:
+            yaml_repair_stats.failed += 1
+            yaml_error_logger.error(
+                f"Failed to parse YAML.\nError: {original_error}\nContent:\n---\n{cleaned}\n---"
+            )
+        raise original_error
+
+    if record:
+        yaml_repair_stats.record_repair(fixes)
+        yaml_error_logger.warning(
+            f"Repaired YAML ({', '.join(fixes)}).\nError: {original_error}\nContent:\n---\n{cleaned}\n---"
+        )
+    # Callers may mutate what they get; the memo keeps its own copy
+    return copy.deepcopy(parsed)
+
+
+async def aload_yaml(text: str, record: bool = True) -> Any:
+    """``load_yaml`` off the event loop (a repair can take up to YAML_REPAIR_MAX_SECONDS)."""
+    return await asyncio.to_thread(load_yaml, text, record)
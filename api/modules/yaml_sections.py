@@ -0,0 +1,186 @@
+import asyncio
+import re
+import textwrap
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type, Union
+
+import yaml
+
+from .utils import yaml_error_logger
+from .yaml_repair import load_repaired, yaml_repair_stats
+
+_KEY_LINE = re.compile(r"^(?P<indent> *)(?P<key>[A-Za-z_][\w\-]*)\s*:(?:\s|$)")
+
+# A section whose text is complete but not parsed yet: (path, key, content)
+_RawSection = Tuple[str, str, str]
+
+
+class YamlSection(NamedTuple):
+    path: str  # "title" or "resume.experience"
+    key: str
+    value: Any
+
+
+class YamlSectionError(yaml.YAMLError):
+    """Raised as soon as one section of a streamed YAML document is malformed."""
+
+    def __init__(self, path: str, message: str, content: str = ""):
+        super().__init__(f"Malformed section '{path}': {message}")
+        self.path = path
+        self.content = content
+
+
+class IncrementalYamlSectionParser:
+    """
+    Parses a YAML mapping while it is still being streamed, emitting each
+    top-level key (and each child of the keys in ``nested_under``) as soon as
+    the next sibling key starts, i.e. as soon as that section is complete.
+
+    Every emitted section is parsed on its own and checked against
+    ``validators`` ({path: expected type(s)}); the first malformed section
+    raises YamlSectionError so callers can stop the generation early.
+
+    A malformed section is repaired locally first, which is CPU-bound: async
+    callers use ``afeed``/``aclose``, which run the repair in a thread.
+    """
+
+    def __init__(self, nested_under: Iterable[str] = (),
+                 validators: Optional[Dict[str, Union[Type, Tuple[Type, ...]]]] = None):
+        self.nested_under = set(nested_under)
+        self.validators = validators or {}
+        self.document: Dict[str, Any] = {}
+        self._pending = ""  # incomplete trailing line
+        self._parent: Optional[str] = None  # current nested parent key
+        self._child_indent: Optional[int] = None
+        self._section_path: Optional[str] = None
+        self._section_key: Optional[str] = None
+        self._section_lines: List[str] = []
+
+    def feed(self, text: str) -> List[YamlSection]:
+        """Adds streamed text and returns the sections it completed."""
+        return [self._complete(raw, self._parse(raw)) for raw in self._fed(text)]
+
+    def close(self) -> List[YamlSection]:
+        """Flushes the remaining text at the end of the stream."""
+        return [self._complete(raw, self._parse(raw)) for raw in self._closed()]
+
+    async def afeed(self, text: str) -> List[YamlSection]:
+        """``feed`` for async streams: a section that needs repair is repaired off the event loop."""
+        return [self._complete(raw, await self._aparse(raw)) for raw in self._fed(text)]
+
+    async def aclose(self) -> List[YamlSection]:
+        """``close`` for async streams."""
+        return [self._complete(raw, await self._aparse(raw)) for raw in self._closed()]
+
+    def _fed(self, text: str) -> List[_RawSection]:
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        return [raw for raw in map(self._consume, lines) if raw is not None]
+
+    def _closed(self) -> List[_RawSection]:
+        completed = []
+        if self._pending:
+            raw = self._consume(self._pending)
+            self._pending = ""
+            if raw is not None:
+                completed.append(raw)
+        raw = self._finish_section()
+        if raw is not None:
+            completed.append(raw)
+        return completed
+
+    def _consume(self, line: str) -> Optional[_RawSection]:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            return None
+
+        match = _KEY_LINE.match(line)
+        if match is None:
+            if self._section_path is not None:
+                self._section_lines.append(line)
+            return None
+
+        indent = len(match.group("indent"))
+        key = match.group("key")
+
+        if indent == 0:
+            completed = self._finish_section()
+            self._parent = None
+            self._child_indent = None
+            if key in self.nested_under and not line[match.end():].strip():
+                # A nested parent: its children become the sections
+                self._parent = key
+                self.document.setdefault(key, {})
+                return completed
+            self._start_section(key, key, line)
+            return completed
+
+        if self._parent is not None and (self._child_indent is None or indent == self._child_indent):
+            completed = self._finish_section()
+            self._child_indent = indent
+            self._start_section(f"{self._parent}.{key}", key, line)
+            return completed
+
+        if self._section_path is not None:
+            self._section_lines.append(line)
+        return None
+
+    def _start_section(self, path: str, key: str, line: str):
+        self._section_path = path
+        self._section_key = key
+        self._section_lines = [line]
+
+    @staticmethod
+    def _repair(path: str, content: str, error: yaml.YAMLError):
+        try:
+            parsed, fixes = load_repaired(content)
+        except yaml.YAMLError:
+            yaml_repair_stats.failed += 1
+            yaml_error_logger.error(f"Failed to parse YAML section '{path}'.\nError: {error}\nContent:\n---\n{content}\n---")
+            raise YamlSectionError(path, str(error), content)
+        yaml_repair_stats.record_repair(fixes)
+        yaml_error_logger.warning(
+            f"Repaired YAML section '{path}' ({', '.join(fixes)}).\nError: {error}\nContent:\n---\n{content}\n---"
+        )
+        return parsed
+
+    def _parse(self, raw: _RawSection) -> Any:
+        path, _, content = raw
+        try:
+            return yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            return self._repair(path, content, e)
+
+    async def _aparse(self, raw: _RawSection) -> Any:
+        path, _, content = raw
+        try:
+            # A clean section parses in well under a millisecond
+            return yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            return await asyncio.to_thread(self._repair, path, content, e)
+
+    def _finish_section(self) -> Optional[_RawSection]:
+        if self._section_path is None:
+            return None
+        raw = (self._section_path, self._section_key, textwrap.dedent("\n".join(self._section_lines) + "\n"))
+        self._section_path = None
+        self._section_lines = []
+        return raw
+
+    def _complete(self, raw: _RawSection, parsed: Any) -> YamlSection:
+        path, key, content = raw
+        if not isinstance(parsed, dict) or key not in parsed:
+            raise YamlSectionError(path, "expected a single 'key: value' mapping", content)
+        value = parsed[key]
+
+        expected = self.validators.get(path)
+        if expected is not None and value is not None and not isinstance(value, expected):
+            names = " or ".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+            raise YamlSectionError(path, f"expected {names}, got {type(value).__name__}", content)
+
+        parent, _, child = path.partition(".")
+        if child:
+            # By now the stream may be past this parent, so it comes from the path
+            self.document[parent][key] = value
+        else:
+            self.document[key] = value
+        return YamlSection(path, key, value)
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from modules import yaml_sections
+from modules.yaml_sections import IncrementalYamlSectionParser, YamlSectionError
+
+# "title: Engineer: Backend" is not valid YAML (a second ': ' in a plain value)
+MALFORMED_RESUME = """resume:
+  summary: Backend engineer
+  experience:
+    - company: Acme
+      title: Engineer: Backend
+      years: 3
+  skills:
+    - python
+"""
+
+
+def _stream(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+async def _parse_async(text):
+    parser = IncrementalYamlSectionParser(nested_under=("resume",), validators={"resume.experience": list})
+    sections = []
+    for chunk in _stream(text):
+        sections += await parser.afeed(chunk)
+    sections += await parser.aclose()
+    return parser, sections
+
+
+def test_async_path_repairs_malformed_section_off_the_event_loop(monkeypatch):
+    repair_threads = []
+    load_repaired = yaml_sections.load_repaired
+
+    def recording_load_repaired(content):
+        repair_threads.append(threading.current_thread())
+        return load_repaired(content)
+
+    monkeypatch.setattr(yaml_sections, "load_repaired", recording_load_repaired)
+    parser, sections = asyncio.run(_parse_async(MALFORMED_RESUME))
+
+    assert [section.path for section in sections] == ["resume.summary", "resume.experience", "resume.skills"]
+    assert parser.document["resume"]["experience"] == [{"company": "Acme", "title": "Engineer: Backend", "years": 3}]
+    assert len(repair_threads) == 1
+    assert repair_threads[0] is not threading.main_thread()
+
+
+def test_async_path_raises_on_unrepairable_section():
+    text = "resume:\n  experience:\n    - company: [Acme\n      title: {Engineer\n  skills:\n    - python\n"
+    with pytest.raises(YamlSectionError) as error:
+        asyncio.run(_parse_async(text))
+    assert error.value.path == "resume.experience"
+
+
+def test_sync_and_async_paths_agree():
+    sync_parser = IncrementalYamlSectionParser(nested_under=("resume",))
+    for chunk in _stream(MALFORMED_RESUME):
+        sync_parser.feed(chunk)
+    sync_parser.close()
+
+    async_parser, _ = asyncio.run(_parse_async(MALFORMED_RESUME))
+    assert async_parser.document == sync_parser.document
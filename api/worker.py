@@ -0,0 +1,56 @@
+"""
+Standalone worker for the durable job queue (modules/job_queue.py).
+
+Runs resume and website generation jobs outside the API process, so a deploy
+of the API does not drop in-flight work and workers can be scaled separately.
+
+Usage (from the api/ directory):
+    python worker.py                                # job types of the ENABLED_FEATURES
+    python worker.py --job-types website_generation # only imports the websites feature
+"""
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from modules.http_client import open_django_client, close_django_client
+from modules.features import JOB_MODULES, enabled_features, import_job_handlers
+from modules.job_queue import JobWorker, job_queue
+from modules.usage import LLM_USAGE_REPORT_INTERVAL, token_usage
+
+
+async def main(job_types):
+    if job_types is None:
+        job_types = [job_type for feature in enabled_features() for job_type in feature.jobs]
+    # Importing the feature modules registers their job handlers; only the ones this worker runs are loaded
+    import_job_handlers(job_types)
+    await open_django_client()
+    worker = JobWorker(job_queue, job_types)
+    worker.start()
+    usage_reporter = asyncio.create_task(token_usage.run_reporter()) if LLM_USAGE_REPORT_INTERVAL > 0 else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    # Running jobs are handed back to the queue for the next worker
+    await worker.stop()
+    if usage_reporter is not None:
+        usage_reporter.cancel()
+        await asyncio.gather(usage_reporter, return_exceptions=True)
+    await close_django_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Job queue worker")
+    parser.add_argument("--job-types", nargs="*", default=None, help=f"default: those of the ENABLED_FEATURES among {sorted(JOB_MODULES)}")
+    args = parser.parse_args()
+    asyncio.run(main(args.job_types))
@@ -190,6 +190,6 @@ class UsageRecordAdmin(admin.ModelAdmin):
     """
     Admin configuration for UsageRecord.
     """
-    list_display = ('user', 'feature', 'count', 'period_start', 'period_end')
+    list_display = ('user', 'feature', 'count', 'prompt_tokens', 'completion_tokens', 'estimated_cost', 'period_start', 'period_end')
     list_filter = ('feature', 'period_start')
     search_fields = ('user__username', 'feature__name')
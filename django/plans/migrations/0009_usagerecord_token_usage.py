@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 12:00
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0008_merge_20250917_0440'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usagerecord',
+            name='completion_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usagerecord',
+            name='estimated_cost',
+            field=models.DecimalField(decimal_places=6, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='usagerecord',
+            name='llm_calls',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usagerecord',
+            name='prompt_tokens',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
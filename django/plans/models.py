@@ -162,6 +162,11 @@ class UsageRecord(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     feature = models.ForeignKey(Feature, on_delete=models.CASCADE)
     count = models.IntegerField(default=0)
+    # LLM spend reported by the AI service for this feature and period
+    prompt_tokens = models.BigIntegerField(default=0)
+    completion_tokens = models.BigIntegerField(default=0)
+    llm_calls = models.IntegerField(default=0)
+    estimated_cost = models.DecimalField(max_digits=12, decimal_places=6, default=Decimal("0"))
     period_start = models.DateTimeField()
     period_end = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
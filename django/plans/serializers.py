@@ -92,4 +92,14 @@ class UsageRecordSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = UsageRecord
-        fields = ["id", "feature", "count", "period_start", "period_end"]
+        fields = [
+            "id",
+            "feature",
+            "count",
+            "prompt_tokens",
+            "completion_tokens",
+            "llm_calls",
+            "estimated_cost",
+            "period_start",
+            "period_end",
+        ]
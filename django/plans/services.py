@@ -191,6 +191,41 @@ class UsageService:
         )
         return True
 
+    @staticmethod
+    def record_token_usage(
+        user_id: int,
+        feature_code: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated_cost: Decimal,
+        llm_calls: int = 1,
+    ) -> bool:
+        """Add LLM token usage reported by the AI service to the current period's record"""
+        try:
+            user = User.objects.get(id=user_id)
+            feature = Feature.objects.get(code=feature_code)
+        except (User.DoesNotExist, Feature.DoesNotExist):
+            return False
+
+        plan = PlanService.get_user_plan(user)
+        billing_period = plan.billing_period if plan else "monthly"
+        start_date, end_date = UsageService.get_current_period_dates(billing_period)
+        usage_record, created = UsageRecord.objects.get_or_create(
+            user=user,
+            feature=feature,
+            period_start=start_date,
+            defaults={"period_end": end_date, "count": 0},
+        )
+
+        # F() expressions: reports from several AI workers may land concurrently
+        UsageRecord.objects.filter(pk=usage_record.pk).update(
+            prompt_tokens=models.F("prompt_tokens") + prompt_tokens,
+            completion_tokens=models.F("completion_tokens") + completion_tokens,
+            llm_calls=models.F("llm_calls") + llm_calls,
+            estimated_cost=models.F("estimated_cost") + estimated_cost,
+        )
+        return True
+
     def __init__(self):
         # Remove the polar_sdk import from here
         pass
@@ -1,8 +1,10 @@
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Plan, UserSubscription
+from .models import Plan, UserSubscription, UsageRecord, PlanFeatureLimit
 import logging
+import requests
 
 logger = logging.getLogger(__name__)
 
@@ -28,3 +30,44 @@ def assign_free_plan_on_user_creation(sender, instance, created, **kwargs):
             )
         except Exception as e:
             logger.error(f"Error assigning free plan to {instance.username}: {e}")
+
+
+def notify_ai_service_entitlements_changed(user_id=None, feature_code=None):
+    """
+    Tells the AI service to drop its cached plan limits/usage.
+    A missing user_id invalidates every cached entry.
+    """
+    if not settings.INTERNAL_API_KEY:
+        return
+
+    def _notify():
+        try:
+            requests.post(
+                f"{settings.AI_SERVICE_INTERNAL_URL}/internal/entitlements/invalidate",
+                json={"user_id": user_id, "feature": feature_code},
+                headers={"X-Internal-Token": settings.INTERNAL_API_KEY},
+                timeout=2,
+            )
+        except requests.RequestException as e:
+            # The AI service cache has a short TTL, so a lost notification only delays the update
+            logger.warning(f"Could not invalidate AI service entitlements for user {user_id}: {e}")
+
+    transaction.on_commit(_notify)
+
+
+@receiver(post_save, sender=UsageRecord)
+@receiver(post_delete, sender=UsageRecord)
+def invalidate_entitlements_on_usage_change(sender, instance, **kwargs):
+    notify_ai_service_entitlements_changed(instance.user_id, instance.feature.code)
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def invalidate_entitlements_on_subscription_change(sender, instance, **kwargs):
+    notify_ai_service_entitlements_changed(instance.user_id)
+
+
+@receiver(post_save, sender=PlanFeatureLimit)
+@receiver(post_delete, sender=PlanFeatureLimit)
+def invalidate_entitlements_on_plan_limit_change(sender, instance, **kwargs):
+    notify_ai_service_entitlements_changed()
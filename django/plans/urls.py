@@ -8,6 +8,7 @@ urlpatterns = [
     path("plans/", views.get_plans, name="api-plans"),
     path("subscription/", views.get_user_subscription, name="user-subscription"),
     path("usage/", views.get_usage_stats, name="usage-stats"),
+    path("usage/tokens/", views.record_token_usage, name="record-token-usage"),
     path("payments/", views.get_payment_history, name="payment-history"),
     path("cancel/", views.cancel_subscription, name="cancel-subscription"),
     path("reactivate/", views.reactivate_subscription, name="reactivate-subscription"),
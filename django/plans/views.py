@@ -4,11 +4,12 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import ListView
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
+import hmac
 import json
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 import polar_sdk
 from polar_sdk import Polar
 from django.conf import settings
@@ -257,8 +258,10 @@ def get_usage_stats(request):
                 user=user, feature=feature, period_start=start_date
             )
             used = usage_record.count
+            tokens = usage_record.prompt_tokens + usage_record.completion_tokens
         except UsageRecord.DoesNotExist:
             used = 0
+            tokens = 0
 
         # Calculate remaining
         if limit == -1:  # Unlimited
@@ -276,6 +279,7 @@ def get_usage_stats(request):
                 "limit": limit,
                 "remaining": remaining,
                 "unlimited": unlimited,
+                "tokens": tokens,
             }
         )
 
@@ -288,6 +292,37 @@ def get_usage_stats(request):
     )
 
 
+@api_view(["POST"])
+@permission_classes([AllowAny])  # Internal access only, checked with X-Internal-Token
+def record_token_usage(request):
+    """Adds LLM token usage batched by the AI service to the users' UsageRecords"""
+    token = request.headers.get("X-Internal-Token", "")
+    if not settings.INTERNAL_API_KEY or not hmac.compare_digest(token, settings.INTERNAL_API_KEY):
+        return Response({"error": "Invalid internal token"}, status=status.HTTP_403_FORBIDDEN)
+
+    recorded = 0
+    skipped = 0
+    for record in request.data.get("records", []):
+        try:
+            success = UsageService.record_token_usage(
+                user_id=int(record["user_id"]),
+                feature_code=record["feature"],
+                prompt_tokens=int(record.get("prompt_tokens", 0)),
+                completion_tokens=int(record.get("completion_tokens", 0)),
+                estimated_cost=Decimal(str(record.get("cost_usd", 0))),
+                llm_calls=int(record.get("calls", 1)),
+            )
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            success = False
+        if success:
+            recorded += 1
+        else:
+            skipped += 1
+            logger.warning(f"Skipped token usage record: {record}")
+
+    return Response({"recorded": recorded, "skipped": skipped})
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_payment_history(request):
@@ -329,5 +329,10 @@ POLAR_API_KEY = os.environ.get("POLAR_API_KEY")
 POLAR_WEBHOOK_SECRET = os.environ.get("POLAR_WEBHOOK_SECRET")
 
 
+# AI service (FastAPI) internal endpoints, used to invalidate its entitlement cache
+AI_SERVICE_INTERNAL_URL = os.getenv("AI_SERVICE_INTERNAL_URL", "http://api:80")
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+
 # Payment settings
 PAYMENT_HOST = os.getenv("PAYMENT_HOST", "localhost:3000")  # Frontend host for redirects